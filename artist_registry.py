@@ -0,0 +1,135 @@
+"""Makes sure every artist page is fetched only once per crawl. Bands of the same scene share a lot of members, so the
+crawler threads (or tasks) regularly want the same artist page at the same time. The registry lets the first requester
+fetch the page while all others wait for its result (single flight) and keeps the results in memory for the rest of
+the crawl.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+
+from settings import CRAWLER_ARTIST_CACHE_SIZE
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+CLAIM_CACHED = 'cached'
+CLAIM_WAIT = 'wait'
+CLAIM_FETCH = 'fetch'
+
+
+class FetchCancelledError(RuntimeError):
+    """Handed to the waiting callers if the fetch they waited for was cancelled. They may claim the page again."""
+
+
+class ArtistRegistry:
+    """A thread-safe registry of the artist fetches in flight and an LRU cache of their results. Failed fetches
+        (`None`) are not cached so that a retry of the band fetches the page again.
+    """
+
+    def __init__(self, cache_size=CRAWLER_ARTIST_CACHE_SIZE):
+        """Creates an empty registry.
+
+        :param cache_size: Maximum number of artist results kept in memory.
+        """
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._results = OrderedDict()
+        self._cache_size = cache_size
+        self.fetches = 0
+        self.waits = 0
+        self.cache_hits = 0
+
+    @property
+    def duplicates_avoided(self):
+        with self._lock:
+            return self.waits + self.cache_hits
+
+    def claim(self, artist_link):
+        """Decides how the caller gets the result of an artist page. The caller must call `complete` or `fail` for a
+            claim of type CLAIM_FETCH; the waiting callers are stuck otherwise.
+
+        :param artist_link: The full link of the artist page.
+        :return: A tuple of the claim type and a value: The result for CLAIM_CACHED, a `Future` for CLAIM_WAIT and
+            CLAIM_FETCH.
+        """
+        with self._lock:
+            if artist_link in self._results:
+                self._results.move_to_end(artist_link)
+                self.cache_hits += 1
+                return CLAIM_CACHED, self._results[artist_link]
+
+            if artist_link in self._in_flight:
+                self.waits += 1
+                return CLAIM_WAIT, self._in_flight[artist_link]
+
+            future = Future()
+            # A running future cannot be cancelled, e.g. by a cancelled asyncio task waiting for it.
+            future.set_running_or_notify_cancel()
+            self._in_flight[artist_link] = future
+            self.fetches += 1
+            return CLAIM_FETCH, future
+
+    def complete(self, artist_link, future: Future, result):
+        """Hands the result of a fetch to all waiting callers and caches it.
+
+        :param artist_link: The full link of the artist page.
+        :param future: The future of the claim.
+        :param result: The result of `metal_crawler.parse_artist_page`.
+        """
+        with self._lock:
+            del self._in_flight[artist_link]
+
+            if result is not None:
+                self._results[artist_link] = result
+
+                if len(self._results) > self._cache_size:
+                    self._results.popitem(last=False)
+
+        future.set_result(result)
+
+    def fail(self, artist_link, future: Future, exception):
+        """Hands an exception of a fetch to all waiting callers.
+
+        :param artist_link: The full link of the artist page.
+        :param future: The future of the claim.
+        :param exception: The exception raised while fetching.
+        """
+        with self._lock:
+            del self._in_flight[artist_link]
+
+        # Cancelling the fetch (e.g. because its band failed) must not cancel the bands waiting for it.
+        if not isinstance(exception, Exception):
+            exception = FetchCancelledError(f'Fetching {artist_link} was cancelled.')
+
+        future.set_exception(exception)
+
+    def get(self, artist_link, fetch):
+        """Gets the result of an artist page for the threaded crawler; fetches it only if nobody else does.
+
+        :param artist_link: The full link of the artist page.
+        :param fetch: The function fetching and parsing the page (called with `artist_link`).
+        :return: The result of `fetch`.
+        """
+        claim_type, value = self.claim(artist_link)
+
+        if claim_type == CLAIM_CACHED:
+            return value
+
+        if claim_type == CLAIM_WAIT:
+            return value.result()
+
+        try:
+            result = fetch(artist_link)
+        except BaseException as e:
+            self.fail(artist_link, value, e)
+            raise
+
+        self.complete(artist_link, value, result)
+        return result
+
+    def __str__(self):
+        with self._lock:
+            return f'{self.fetches} fetched, {self.waits + self.cache_hits} duplicate fetches avoided ' \
+                   f'({self.waits} in flight, {self.cache_hits} from memory)'
@@ -0,0 +1,450 @@
+"""An asyncio based crawl engine as an alternative to the `VisitBandThread`s. Instead of one OS thread per band in
+flight, every band is crawled by a task of one event loop. Concurrency is a budget (the maximum number of requests in
+flight) instead of a thread count, while the process-wide rate limiter still decides how fast requests are sent. The
+parsing and database code is shared with metal_crawler.py, so both engines produce the same `Band` objects and write the
+same data. Pages are parsed by a `ParserPool`; the event loop only waits for the parsed data.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import date
+
+import aiohttp
+import progressbar
+from yarl import URL
+
+import metal_crawler
+from metal_crawler import STATUS_SKIPPED, PAGE_VALID, PAGE_INVALID, ARTIST_KNOWN, PageError, DatabaseWriterThread, \
+    check_page, parse_band_data, parse_artist_data, parse_discography_data, add_artist, \
+    get_band_link, get_band_id, get_discography_link, report_connected_bands, record_crawl_error, prepare_crawl, \
+    print_crawl_report, read_user_input, set_base_url
+from artist_registry import ArtistRegistry, FetchCancelledError, CLAIM_CACHED, CLAIM_WAIT
+from crawl_frontier import CrawlFrontier
+from crawler_session import SessionStats, is_forbidden
+from parser_pool import ParserPool
+from rate_limiter import get_rate_limiter
+from retry_scheduler import RetryScheduler, ERROR_FORBIDDEN, ERROR_TIMEOUT, ERROR_NOT_FOUND, ERROR_PARSE
+from response_cache import get_response_cache
+from snapshot_store import SnapshotStore
+from settings import CRAWLER_ASYNC_CONCURRENCY, CRAWLER_REQUEST_TIMEOUT, CRAWLER_BAND_FANOUT
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+def discard_task(task: asyncio.Task):
+    """Cancels a task whose result is not needed anymore. The exception of a task which failed already is retrieved so
+        that asyncio does not log it.
+    """
+    if task.done() and not task.cancelled():
+        task.exception()
+    else:
+        task.cancel()
+
+
+class AsyncBandCrawler:
+    """Crawls bands with a fixed number of worker tasks which share one `aiohttp.ClientSession`. Database writes are
+        handed to the `DatabaseWriterThread` so that they never block the event loop and never run concurrently.
+    """
+
+    def __init__(self, db_handle, band_errors, visited_entities, progress_bar, concurrency=CRAWLER_ASYNC_CONCURRENCY,
+                 is_detailed=False, is_single_mode=False, frontier=None, parser_pool=None, snapshot_store=None):
+        """Constructs the crawler. See `VisitBandThread` for the shared parameters.
+
+        :param db_handle: The database handle used to add all entities.
+        :param band_errors: The shared status dictionary of the crawl.
+        :param visited_entities: A dictionary with keys 'bands' and 'artists' to quickly check if crawling is needed.
+        :param progress_bar: The progress bar initialized with the number of bands to crawl.
+        :param concurrency: Maximum number of requests in flight (and number of bands crawled at the same time).
+        :param is_detailed: A parameter that is not used and might be useful someday.
+        :param is_single_mode: Indicates if a single band and its immediate connections is crawled.
+        :param frontier: The `CrawlFrontier` recording the state of every band link. An in-memory frontier is used
+            if None is given.
+        :param parser_pool: The `ParserPool` which parses the downloaded pages. Pages are parsed in threads of the
+            event loop if None is given.
+        :param snapshot_store: The `SnapshotStore` receiving the snapshots of all crawled bands; no snapshots are saved
+            if None is given.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self.db_handle = db_handle
+        self.band_errors = band_errors
+        self.visited_entities = visited_entities
+        self.visited_bands = []
+        self.progress_bar = progress_bar
+        self.concurrency = max(concurrency, 1)
+        self.is_detailed = is_detailed
+        self.is_single_mode = is_single_mode
+        self.today = date.today()
+        self.limiter = get_rate_limiter()
+        self.cache = get_response_cache()
+        self.artist_registry = ArtistRegistry()
+        self.retry_scheduler = RetryScheduler()
+        self.frontier = CrawlFrontier(':memory:') if frontier is None else frontier
+        self.parser_pool = parser_pool
+        self.stats = SessionStats()
+        self._http = None
+        self.db_writer = DatabaseWriterThread(db_handle, band_errors, self.frontier, is_detailed,
+                                              snapshot_store=snapshot_store)
+
+    def update_bar(self, band_link):
+        self.visited_bands.append(band_link)
+        self.progress_bar.update(len(self.visited_bands))
+
+    async def _on_connection_created(self, session, context, params):
+        self.stats.connection_opened()
+
+    async def parse(self, function, *args):
+        """Parses downloaded data with one of the `metal_crawler.parse_*_data` functions in the parser pool (or in a
+            thread if there is no pool) without blocking the event loop.
+        """
+        if self.parser_pool is None:
+            return await asyncio.to_thread(function, *args)
+
+        return await asyncio.wrap_future(self.parser_pool.submit(function, *args))
+
+    async def parse_fetched_page(self, link, page_data, function, *args):
+        """The asynchronous counterpart of `metal_crawler.parse_fetched_page`: removes a page which cannot be parsed
+            from the response cache.
+        """
+        try:
+            result = await self.parse(function, page_data, *args)
+        except Exception:
+            await asyncio.to_thread(self.cache.invalidate, link)
+            raise
+
+        if result is None:
+            await asyncio.to_thread(self.cache.invalidate, link)
+
+        return result
+
+    async def fetch_page(self, link, retry_count=5):
+        """The asynchronous counterpart of `metal_crawler.fetch_page`.
+
+        :param link: URL to get the web page from.
+        :param retry_count: Set to any number greater than 0.
+        :return: The raw bytes of the page.
+        :raises PageError: If the page could not be fetched.
+        """
+        retry_count = max(retry_count, 1)
+        self.logger.debug(f"Fetching {link}")
+        # Disk access must not stall the event loop either.
+        cache_entry = await asyncio.to_thread(self.cache.lookup, link)
+
+        if cache_entry is not None and cache_entry.is_fresh:
+            return cache_entry.data
+
+        if self.cache.is_cache_only:
+            self.logger.debug(f"  {link} is not cached.")
+            raise PageError(link, ERROR_NOT_FOUND)
+
+        validators = cache_entry.get_validators() if cache_entry is not None else None
+
+        while retry_count > 0:
+            retry_count -= 1
+            delay = self.limiter.reserve()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self.stats.request_sent()
+
+            try:
+                # The links are already escaped by M-A and must not be quoted a second time.
+                time_start = time.perf_counter()
+
+                async with self._http.get(URL(link, encoded=True), headers=validators) as response:
+                    page_data = await response.read()
+                    status = response.status
+                    headers = response.headers
+
+                self.stats.record_latency(link, time.perf_counter() - time_start)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.exception(e, exc_info=True)
+                self.logger.error("Received no data.")
+                raise PageError(link, ERROR_TIMEOUT)
+
+            if is_forbidden(status, page_data):
+                self.limiter.report_forbidden()
+            else:
+                self.limiter.report_success()
+
+            if status == 304 and cache_entry is not None:
+                await asyncio.to_thread(self.cache.refresh, cache_entry, headers)
+                return cache_entry.data
+
+            page_status = check_page(link, page_data)
+
+            if page_status == PAGE_VALID:
+                await asyncio.to_thread(self.cache.store, link, page_data, headers)
+                return page_data
+            elif page_status == PAGE_INVALID:
+                raise PageError(link, ERROR_NOT_FOUND)
+
+            self.logger.debug(f"  Trying again... ({retry_count} to go)")
+
+        raise PageError(link, ERROR_FORBIDDEN)
+
+    async def crawl_band(self, band_short_link, band_links: asyncio.Queue):
+        """Crawls a band like `VisitBandThread.crawl_band` does.
+
+        :param band_short_link: Short form of the band link (e.g. Darkthrone/146).
+        :param band_links: The queue of the crawl; connected bands are added in single mode.
+        :return: A Band instance or `None` in an error case.
+        :raises PageError: If a page of the band could not be cooked.
+        """
+        if len(band_short_link) == 0:
+            return None
+
+        self.logger.info(f'>>> Crawling [{band_short_link}]')
+        # The discography only needs the ID from the short link; no need to wait for the band page.
+        fan_out = asyncio.Semaphore(CRAWLER_BAND_FANOUT)
+        disco_link = get_discography_link(get_band_id(band_short_link))
+        disco_task = asyncio.create_task(self.fetch_page_bounded(disco_link, fan_out))
+
+        try:
+            band_data_ref, linked_bands = await self._crawl_band_page(band_short_link, fan_out)
+        except BaseException:
+            discard_task(disco_task)
+            raise
+
+        if band_data_ref is None:
+            discard_task(disco_task)
+            return None
+
+        # Happens only for the first band if -s was used as the command line switch.
+        if self.is_single_mode:
+            self.is_single_mode = False
+
+            for band_link in linked_bands:
+                band_links.put_nowait(band_link)
+
+            self.frontier.add_links(linked_bands)
+            report_connected_bands(linked_bands, self.band_errors)
+            self.progress_bar.max_value = band_links.qsize() + 1
+
+        band_data_ref.releases = await self.parse_fetched_page(disco_link, await disco_task, parse_discography_data,
+                                                               disco_link)
+        self.logger.debug(f'<<< Crawling [{band_short_link}]')
+        return band_data_ref
+
+    async def fetch_page_bounded(self, link, fan_out: asyncio.Semaphore):
+        async with fan_out:
+            return await self.fetch_page(link)
+
+    async def fetch_artist(self, artist_link, fan_out: asyncio.Semaphore):
+        """Gets the result of an artist page through the artist registry; fetches the page only if no other task is
+            doing it already.
+        """
+        while True:
+            claim_type, value = self.artist_registry.claim(artist_link)
+
+            if claim_type == CLAIM_CACHED:
+                return value
+
+            if claim_type == CLAIM_WAIT:
+                try:
+                    return await asyncio.wrap_future(value)
+                except FetchCancelledError:
+                    # The band of the fetching task failed; this band still needs the page.
+                    continue
+
+            break
+
+        try:
+            result = await self.parse_fetched_page(
+                artist_link, await self.fetch_page_bounded(artist_link, fan_out), parse_artist_data, artist_link)
+        except BaseException as e:
+            self.artist_registry.fail(artist_link, value, e)
+            raise
+
+        self.artist_registry.complete(artist_link, value, result)
+        return result
+
+    async def _crawl_band_page(self, band_short_link, fan_out: asyncio.Semaphore):
+        """Crawls the band page and all pages of unknown band members in parallel.
+
+        :return: A tuple of the Band (or `None` in an error case) and the short links of the connected bands (only
+            extracted in single mode).
+        """
+        link_band = get_band_link(band_short_link)
+        band_page = await self.fetch_page_bounded(link_band, fan_out)
+        band_data_ref, lineup_entries, linked_bands = await self.parse_fetched_page(
+            link_band, band_page, parse_band_data, band_short_link, self.today, self.is_single_mode)
+
+        if band_data_ref is None:
+            # Not a band page (yet); a retry must not get the same page from the cache.
+            await asyncio.to_thread(self.cache.invalidate, link_band)
+            return None, linked_bands
+        artist_tasks = {}
+
+        for lineup_entry in lineup_entries:
+            # Don't visit known band members.
+            if lineup_entry.link in self.visited_entities['artists']:
+                self.logger.debug(f"      Skipping band member {lineup_entry.link}.")
+            elif lineup_entry.full_link not in artist_tasks:
+                artist_tasks[lineup_entry.full_link] = asyncio.create_task(
+                    self.fetch_artist(lineup_entry.full_link, fan_out))
+
+        try:
+            await asyncio.gather(*artist_tasks.values())
+        except BaseException:
+            for task in artist_tasks.values():
+                task.cancel()
+            raise
+
+        for lineup_entry in lineup_entries:
+            if lineup_entry.full_link in artist_tasks:
+                artist_data = artist_tasks[lineup_entry.full_link].result()
+            else:
+                artist_data = ARTIST_KNOWN
+
+            if artist_data is None:
+                return None, linked_bands
+
+            add_artist(band_data_ref, lineup_entry, artist_data, self.today)
+
+        return band_data_ref, linked_bands
+
+    async def visit_band(self, link_band_temp, band_links: asyncio.Queue):
+        # No need to visit if the band is already in the database.
+        if link_band_temp in self.visited_entities['bands']:
+            self.logger.debug(f"  Skipping {link_band_temp}.")
+            self.update_bar(link_band_temp)
+            self.band_errors[STATUS_SKIPPED][link_band_temp] = ""
+            self.frontier.mark_done(link_band_temp, STATUS_SKIPPED)
+            return
+
+        self.frontier.mark_in_flight(link_band_temp)
+        # A band without a page error failed while parsing.
+        error_class = ERROR_PARSE
+
+        try:
+            crawl_result = await self.crawl_band(link_band_temp, band_links)
+        except PageError as e:
+            crawl_result = None
+            error_class = e.error_class
+        except Exception as e:
+            self.logger.exception('Something bad happened while crawling.')
+            crawl_result = None
+
+        # Error case: the retry scheduler puts the link back into circulation later.
+        if crawl_result is None:
+            if not record_crawl_error(link_band_temp, self.band_errors, error_class, self.retry_scheduler,
+                                      self.frontier):
+                self.update_bar(link_band_temp)
+            return
+
+        self.visited_entities['bands'][link_band_temp] = ''
+        # Waits only if the writer is behind (backpressure).
+        await asyncio.to_thread(self.db_writer.submit, crawl_result)
+        self.update_bar(link_band_temp)
+
+    async def worker(self, band_links: asyncio.Queue):
+        while True:
+            link_band_temp = await band_links.get()
+
+            try:
+                # After a stop request the remaining links are only taken from the queue.
+                if metal_crawler.STOP_CRAWL_USER_INPUT != "Q":
+                    await self.visit_band(link_band_temp, band_links)
+            finally:
+                band_links.task_done()
+
+    def requeue_due_retries(self, band_links: asyncio.Queue):
+        for band_link in self.retry_scheduler.pop_due():
+            band_links.put_nowait(band_link)
+
+    async def feed_retries(self, band_links: asyncio.Queue):
+        """Puts scheduled bands back into the queue as soon as they are due."""
+        while True:
+            delay = self.retry_scheduler.get_delay()
+            # Retries may be scheduled at any time; check at least once per second.
+            await asyncio.sleep(1.0 if delay is None else min(delay, 1.0))
+            self.requeue_due_retries(band_links)
+
+    async def crawl(self, band_links):
+        """Crawls all given bands and returns when the queue is exhausted (or the user stopped the crawl).
+
+        :param band_links: A list of short band links.
+        """
+        band_queue = asyncio.Queue()
+
+        for link in band_links:
+            band_queue.put_nowait(link)
+
+        self.db_writer.start()
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=CRAWLER_REQUEST_TIMEOUT)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         trace_configs=[trace_config]) as self._http:
+            workers = [asyncio.create_task(self.worker(band_queue)) for i in range(self.concurrency)]
+            feeder = asyncio.create_task(self.feed_retries(band_queue))
+
+            # The queue runs dry before all retries are due; the crawl is over when both are empty.
+            while True:
+                await band_queue.join()
+                delay = self.retry_scheduler.get_delay()
+
+                if delay is None or metal_crawler.STOP_CRAWL_USER_INPUT == "Q":
+                    break
+
+                await asyncio.sleep(delay)
+                self.requeue_due_retries(band_queue)
+
+            workers.append(feeder)
+
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        # Flushes all bands which are still waiting to be written.
+        await asyncio.to_thread(self.db_writer.close)
+
+
+def crawl_bands_async(band_links, db_handle, is_detailed=False, is_single_mode=False,
+                      concurrency=CRAWLER_ASYNC_CONCURRENCY, is_resume=False):
+    """Crawls the given bands with the asyncio engine. Behaves like `metal_crawler.crawl_bands`.
+
+    :param band_links: A list of short band links.
+    :param db_handle: The database handle.
+    :param is_detailed: A parameter that is not used and might be useful someday.
+    :param is_single_mode: Indicates if a single band and its immediate connections is crawled.
+    :param concurrency: Maximum number of requests in flight.
+    :param is_resume: Continues the crawl recorded in the crawl frontier; `band_links` is ignored.
+    :return: A tuple of the status dictionary of the crawl (see `make_bands_status`) and the request counters.
+    """
+    logger = logging.getLogger('Crawler Prep')
+    logger.info("Starting asynchronous band crawl. All logging is diverted to file. Prepping database:")
+    frontier, band_links, visited_entities, bands_status, is_single_mode = prepare_crawl(
+        band_links, db_handle, is_single_mode, is_resume)
+    logger.info(f'Crawling {len(band_links)} band(s) with up to {concurrency} requests in flight.')
+    progress_bar = progressbar.ProgressBar(max_value=len(band_links))
+    # The workers must crawl the same site (see `set_base_url`).
+    parser_pool = ParserPool(initializer=set_base_url, initargs=(metal_crawler.EM_LINK_MAIN,))
+    crawler = AsyncBandCrawler(db_handle, bands_status, visited_entities, progress_bar, concurrency, is_detailed,
+                               is_single_mode, frontier, parser_pool, SnapshotStore())
+
+    print("\nPress Q and <ENTER> to stop crawl. All tasks will finish their current work and then stop.\n")
+    user_input = threading.Thread(target=read_user_input)
+    user_input.daemon = True
+    user_input.start()
+
+    try:
+        asyncio.run(crawler.crawl(band_links))
+    finally:
+        parser_pool.close()
+
+    user_input.join(1)
+    progress_bar.finish()
+    frontier.close()
+    print_crawl_report(band_links, bands_status, crawler.stats, crawler.artist_registry, crawler.retry_scheduler,
+                       parser_pool)
+
+    return bands_status, crawler.stats
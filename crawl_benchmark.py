@@ -0,0 +1,147 @@
+"""Measures the end-to-end throughput of a crawl against the local M-A stand-in (see ma_standin.py). The band list is
+fetched through the AJAX country lists and all bands are crawled with the chosen engine like a real crawl. Afterwards
+bands/s, requests/s, the latencies per page type and the time spent writing to the database are printed.
+
+    python crawl_benchmark.py --bands 500 --latency 0.05 --forbidden 0.01 --missing 0.01 --rate 200
+
+Everything a crawl writes (band snapshots, logs, lists of erroneous bands) goes into a temporary directory unless
+--work-dir is given.
+"""
+
+import logging
+import os
+import tempfile
+from time import perf_counter
+
+import metal_crawler
+from async_crawler import crawl_bands_async
+from global_helpers import FOLDERS_MAIN
+from graph.metal_graph_context import init_db
+from ma_standin import make_standin_parser, make_standin
+from metal_crawler import STATUS_ADDED, STATUS_ERROR, STATUS_DB_WRITE_TIME, crawl_country, crawl_bands
+from rate_limiter import AdaptiveRateLimiter, set_rate_limiter
+from response_cache import ENTITY_PATHS, ENTITY_OTHER, set_cache_mode
+from settings import CRAWLER_ASYNC_CONCURRENCY
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+class DiscardingDatabase:
+    """A database handle which accepts all writes of `metal_crawler.apply_to_db` and keeps nothing. It's used to
+        benchmark the crawler without a database.
+    """
+
+    def get_all_links(self) -> dict:
+        return {'bands': {}, 'artists': {}}
+
+    def write_in_transaction(self, write):
+        return write()
+
+    def add_bands(self, band_dicts):
+        pass
+
+    def add_releases(self, release_dicts):
+        pass
+
+    def add_members(self, member_dicts):
+        pass
+
+    def bands_recorded_releases(self, recordings):
+        pass
+
+    def members_played_in_bands(self, stints):
+        pass
+
+
+def make_db_handle(db_name):
+    if db_name == 'none':
+        return DiscardingDatabase()
+
+    return init_db(db_name)
+
+
+def print_benchmark_report(band_count, engine, list_time, crawl_time, bands_status, request_stats, forbidden_count):
+    added_count = len(bands_status[STATUS_ADDED])
+    db_write_time = bands_status[STATUS_DB_WRITE_TIME]
+    print(f'\nBenchmark of {band_count} bands with the {engine} engine')
+    print(f'  Listing bands: {list_time:8.2f} s')
+    print(f'  Crawling:      {crawl_time:8.2f} s')
+    print(f'  Bands added:   {added_count:8d} ({added_count / crawl_time:.1f} bands/s, '
+          f'{len(bands_status[STATUS_ERROR])} with errors)')
+    print(f'  Requests:      {request_stats.requests:8d} ({request_stats.requests / crawl_time:.1f} requests/s, '
+          f'{forbidden_count} forbidden by the stand-in)')
+    print(f'  DB writes:     {db_write_time:8.2f} s ({db_write_time * 1000 / max(added_count, 1):.2f} ms per band)')
+    print(f'  {"Latency":<14}{"requests":>9}{"p50 ms":>10}{"p99 ms":>10}')
+
+    for page_type in dict.fromkeys([entity_type for path, entity_type in ENTITY_PATHS] + [ENTITY_OTHER]):
+        latencies = request_stats.latencies.get(page_type, [])
+
+        if len(latencies) == 0:
+            continue
+
+        p50 = request_stats.get_latency_percentile(page_type, 50) * 1000
+        p99 = request_stats.get_latency_percentile(page_type, 99) * 1000
+        print(f'  {page_type:<14}{len(latencies):9d}{p50:10.1f}{p99:10.1f}')
+
+
+def run_benchmark(args):
+    server = make_standin(args)
+    metal_crawler.set_base_url(server.base_url)
+    # Every page must come from the stand-in.
+    set_cache_mode(is_enabled=False)
+
+    if args.rate is not None:
+        set_rate_limiter(AdaptiveRateLimiter(rate=args.rate, rate_min=args.rate, rate_max=args.rate))
+
+    db_handle = make_db_handle(args.db)
+    time_start = perf_counter()
+    band_links = []
+
+    for country_short in server.catalog.countries:
+        band_links.extend(crawl_country(country_short))
+
+    list_time = perf_counter() - time_start
+    time_start = perf_counter()
+
+    if args.is_async:
+        bands_status, request_stats = crawl_bands_async(band_links, db_handle, concurrency=args.concurrency)
+    else:
+        bands_status, request_stats = crawl_bands(band_links, db_handle)
+
+    crawl_time = perf_counter() - time_start
+    server.stop()
+    engine = 'asynchronous' if args.is_async else 'thread'
+    print_benchmark_report(len(band_links), engine, list_time, crawl_time, bands_status, request_stats,
+                           server.forbidden_count)
+
+
+def main():
+    arg_parser = make_standin_parser('Benchmarks a crawl against a synthetic M-A on localhost.')
+    arg_parser.add_argument('--async', dest='is_async', action='store_true',
+                            help='Uses the asynchronous crawl engine instead of threads.')
+    arg_parser.add_argument('--concurrency', type=int, default=CRAWLER_ASYNC_CONCURRENCY,
+                            help='Maximum number of requests in flight for --async.')
+    arg_parser.add_argument('--rate', type=float,
+                            help='Fixed request rate per second instead of the adaptive one of settings.py.')
+    arg_parser.add_argument('--db', choices=['none', 'neo4j', 'sqlite', 'memory'], default='none',
+                            help='Database to write to (default: none). neo4j and sqlite write into the configured '
+                                 'database; use an empty one. memory keeps everything in memory.')
+    arg_parser.add_argument('--work-dir', help='Directory for snapshots and logs (default: a temporary one).')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.work_dir if args.work_dir is not None else temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        os.chdir(work_dir)
+
+        for folder in FOLDERS_MAIN:
+            folder.mkdir(exist_ok=True)
+
+        logging.basicConfig(filename='benchmark.log', level=logging.INFO)
+        run_benchmark(args)
+
+
+if __name__ == '__main__':
+    main()
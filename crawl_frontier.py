@@ -0,0 +1,219 @@
+"""Keeps the state of a band crawl on disk so that a crashed or stopped crawl can be resumed. Every band link is
+recorded with its state (pending, in flight, done or failed) in a SQLite database and every change is committed
+immediately. The visited bands and artists loaded from the graph database at the start of the crawl are stored as well;
+a resumed crawl does not need to load them again.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from settings import CRAWLER_FRONTIER_PATH
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+STATE_PENDING = 'pending'
+STATE_IN_FLIGHT = 'in_flight'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    link TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_state ON links (state, position);
+CREATE TABLE IF NOT EXISTS visited (
+    kind TEXT NOT NULL,
+    link TEXT NOT NULL,
+    PRIMARY KEY (kind, link)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class CrawlFrontier:
+    """The persistent counterpart of the crawl queue. It's shared by all crawler threads; all access goes through one
+        connection guarded by a lock.
+    """
+
+    def __init__(self, path=CRAWLER_FRONTIER_PATH):
+        """Opens (or creates) the frontier database.
+
+        :param path: The path of the SQLite database. Use ':memory:' for a crawl which cannot be resumed.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        # WAL with synchronous NORMAL survives a crash of the process; only a power loss may lose the latest commits.
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _get_meta(self, key, default=None):
+        row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_meta(self, key, value):
+        self._connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def start(self, band_links, visited_entities, is_single_mode=False):
+        """Throws away the state of the previous crawl and records a new one.
+
+        :param band_links: A list of short band links; all of them are pending.
+        :param visited_entities: The dictionary of `GraphDatabaseContext.get_all_links`.
+        :param is_single_mode: Indicates if the connected bands of the first band will be added.
+        """
+        now = time.time()
+
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.execute('DELETE FROM links')
+            self._connection.execute('DELETE FROM visited')
+            self._connection.execute('DELETE FROM meta')
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO links (link, position, state, updated) VALUES (?, ?, ?, ?)',
+                ((link, position, STATE_PENDING, now) for position, link in enumerate(band_links)))
+
+            for kind in ['bands', 'artists']:
+                self._connection.executemany('INSERT OR IGNORE INTO visited (kind, link) VALUES (?, ?)',
+                                             ((kind, link) for link in visited_entities[kind]))
+
+            self._set_meta('started', now)
+            self._set_meta('initial', len(band_links))
+            self._set_meta('single_mode', int(is_single_mode))
+
+    def can_resume(self):
+        """Checks if there's a crawl with pending links.
+
+        :return: True if a crawl was started and not finished.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT COUNT(*) FROM links WHERE state IN (?, ?)',
+                                           (STATE_PENDING, STATE_IN_FLIGHT)).fetchone()
+            return row[0] > 0
+
+    def resume(self):
+        """Prepares the recorded crawl for continuation. Links which were in flight when the crawl stopped are pending
+            again.
+
+        :return: A tuple of the pending band links (in their original order), the visited entities and the single
+            mode flag.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.execute('UPDATE links SET state = ? WHERE state = ?', (STATE_PENDING, STATE_IN_FLIGHT))
+            band_links = [row[0] for row in self._connection.execute(
+                'SELECT link FROM links WHERE state = ? ORDER BY position', (STATE_PENDING,))]
+            visited_entities = {'bands': {}, 'artists': {}}
+
+            for kind, link in self._connection.execute('SELECT kind, link FROM visited'):
+                visited_entities[kind][link] = ''
+
+            is_single_mode = self._get_meta('single_mode', '0') == '1'
+
+        self.logger.info(f'Resuming a crawl with {len(band_links)} pending bands.')
+        return band_links, visited_entities, is_single_mode
+
+    def get_initial_count(self):
+        """Gets the number of bands of the crawl (including the connected bands in single mode)."""
+        with self._lock:
+            return int(self._get_meta('initial', 0))
+
+    def get_link_records(self):
+        """Gets the recorded state of all links which were visited at least once.
+
+        :return: A list of tuples with link, state, status and number of unsuccessful attempts.
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT link, state, status, attempts FROM links WHERE state != ? OR attempts > 0',
+                (STATE_PENDING,)).fetchall()
+
+    def add_links(self, band_links):
+        """Adds links to a running crawl (e.g. the connected bands in single mode) and ends the single mode.
+
+        :param band_links: A list of short band links.
+        """
+        now = time.time()
+
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            position = self._connection.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM links').fetchone()[0]
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO links (link, position, state, updated) VALUES (?, ?, ?, ?)',
+                ((link, position + offset, STATE_PENDING, now) for offset, link in enumerate(band_links)))
+            self._set_meta('single_mode', 0)
+            self._set_meta('initial', len(band_links) + 1)
+
+    def _set_state(self, band_link, state, status='', attempts=None):
+        with self._lock:
+            if attempts is None:
+                self._connection.execute('UPDATE links SET state = ?, status = ?, updated = ? WHERE link = ?',
+                                         (state, status, time.time(), band_link))
+            else:
+                self._connection.execute(
+                    'UPDATE links SET state = ?, status = ?, attempts = ?, updated = ? WHERE link = ?',
+                    (state, status, attempts, time.time(), band_link))
+
+    def mark_in_flight(self, band_link):
+        self._set_state(band_link, STATE_IN_FLIGHT)
+
+    def mark_pending(self, band_link, attempts):
+        """Puts a link which could not be crawled back into circulation.
+
+        :param band_link: The short band link.
+        :param attempts: The number of unsuccessful attempts so far.
+        """
+        self._set_state(band_link, STATE_PENDING, attempts=attempts)
+
+    def mark_failed(self, band_link, attempts=None, error_class=''):
+        """Records a link which will not be tried again.
+
+        :param band_link: The short band link.
+        :param attempts: The number of unsuccessful attempts; unchanged if None.
+        :param error_class: Why the last attempt failed (see retry_scheduler.py); kept as the status of the link.
+        """
+        self._set_state(band_link, STATE_FAILED, error_class, attempts)
+
+    def mark_done(self, band_link, status, artist_links=()):
+        """Records a finished link and the artists written with it.
+
+        :param band_link: The short band link.
+        :param status: Either `STATUS_ADDED` or `STATUS_SKIPPED` of metal_crawler.
+        :param artist_links: Short links of the artists of the band; a resumed crawl knows them as visited.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.execute('UPDATE links SET state = ?, status = ?, updated = ? WHERE link = ?',
+                                     (STATE_DONE, status, time.time(), band_link))
+            self._connection.execute('INSERT OR IGNORE INTO visited (kind, link) VALUES (?, ?)', ('bands', band_link))
+            self._connection.executemany('INSERT OR IGNORE INTO visited (kind, link) VALUES (?, ?)',
+                                         (('artists', artist_link) for artist_link in artist_links))
+
+    def count_states(self):
+        """Counts the links per state.
+
+        :return: A dictionary with the states as keys.
+        """
+        with self._lock:
+            counts = {STATE_PENDING: 0, STATE_IN_FLIGHT: 0, STATE_DONE: 0, STATE_FAILED: 0}
+
+            for state, count in self._connection.execute('SELECT state, COUNT(*) FROM links GROUP BY state'):
+                counts[state] = count
+
+            return counts
@@ -0,0 +1,181 @@
+"""Provides the HTTP session which is shared by all crawler threads. Instead of creating a new pool manager for every
+request (and paying for a new TCP and TLS handshake every time), all requests go through one set of keep-alive
+connection pools with one bounded pool per host.
+"""
+
+from array import array
+import logging
+import threading
+import time
+
+import certifi
+import urllib3
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from rate_limiter import get_rate_limiter
+from response_cache import get_entity_type
+from settings import CRAWLER_POOL_SIZE, CRAWLER_POOL_HOSTS, CRAWLER_REQUEST_TIMEOUT
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+ACCEPT_ENCODING = 'gzip,deflate'
+# M-A answers with this body (and sometimes a 403) if it thinks we're too fast.
+FORBIDDEN_BODY = b'Forbidden.'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SessionStats:
+    """Thread-safe counters of a `CrawlerSession`. A request which did not need a new connection reused one from the
+        pool. The latencies of all requests are kept per page type (see `response_cache.get_entity_type`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.latencies = {}
+
+    def request_sent(self):
+        with self._lock:
+            self.requests += 1
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def record_latency(self, url, seconds):
+        page_type = get_entity_type(url)
+
+        with self._lock:
+            if page_type not in self.latencies:
+                self.latencies[page_type] = array('d')
+
+            self.latencies[page_type].append(seconds)
+
+    def get_latency_percentile(self, page_type, percentile):
+        """Gets a percentile of the recorded latencies of a page type (nearest-rank method).
+
+        :param page_type: One of the types of `response_cache.get_entity_type`.
+        :param percentile: A number from 0 to 100.
+        :return: The latency in seconds or None if no request of the page type was sent.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies.get(page_type, []))
+
+        if len(latencies) == 0:
+            return None
+
+        rank = max(int(-(-percentile * len(latencies) // 100)), 1)
+        return latencies[rank - 1]
+
+    @property
+    def connections_reused(self):
+        with self._lock:
+            return max(self.requests - self.connections_opened, 0)
+
+    def __str__(self):
+        return f'{self.requests} requests over {self.connections_opened} connections ' \
+               f'({self.connections_reused} reused)'
+
+
+def is_forbidden(status, page_data):
+    """Checks if M-A refused to answer a request.
+
+    :param status: The HTTP status code of the answer.
+    :param page_data: The raw bytes of the answer.
+    :return: True if the answer is a *Forbidden*.
+    """
+    return status == 403 or page_data.startswith(FORBIDDEN_BODY)
+
+
+def _make_counting_pool(pool_class, stats: SessionStats):
+    """Derives a connection pool class which reports every newly opened connection to the given stats object.
+
+    :param pool_class: Either `HTTPConnectionPool` or `HTTPSConnectionPool`.
+    :param stats: The stats object of the session owning the pool.
+    :return: The derived pool class.
+    """
+
+    class CountingConnectionPool(pool_class):
+        def _new_conn(self):
+            stats.connection_opened()
+            return super()._new_conn()
+
+    return CountingConnectionPool
+
+
+class CrawlerSession:
+    """Wraps one `urllib3.PoolManager` with persistent connections. The pool manager is thread-safe and blocks a thread
+        if all connections to a host are in use, so the number of open connections per host never exceeds
+        `pool_size`. Every request waits for the rate limiter first and reports back if it was forbidden.
+    """
+
+    def __init__(self, pool_size=CRAWLER_POOL_SIZE, host_count=CRAWLER_POOL_HOSTS, limiter=None):
+        """Creates the pool manager with certificates (there will be nasty warnings for every call if you don't).
+
+        :param pool_size: Maximum number of connections per host.
+        :param host_count: Maximum number of host pools kept alive at the same time.
+        :param limiter: An `AdaptiveRateLimiter`; the process-wide one is used if None is given.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self.stats = SessionStats()
+
+        if limiter is None:
+            limiter = get_rate_limiter()
+
+        self.limiter = limiter
+        headers = urllib3.make_headers(keep_alive=True, accept_encoding=ACCEPT_ENCODING)
+        self._manager = urllib3.PoolManager(num_pools=host_count, maxsize=pool_size, block=True, headers=headers,
+                                            cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+        self._manager.pool_classes_by_scheme = {
+            'http': _make_counting_pool(HTTPConnectionPool, self.stats),
+            'https': _make_counting_pool(HTTPSConnectionPool, self.stats)
+        }
+
+    def request(self, url, timeout=CRAWLER_REQUEST_TIMEOUT, headers=None):
+        """Sends a GET request over a pooled connection. Compressed responses are decoded transparently.
+
+        :param url: The full URL to get.
+        :param timeout: Timeout in seconds for connecting and reading.
+        :param headers: Optional headers which are sent in addition to the session's default headers.
+        :return: The `urllib3.HTTPResponse` with the already read data. Exceptions of urllib3 (e.g. `MaxRetryError`)
+            are not caught.
+        """
+        self.limiter.acquire()
+        self.stats.request_sent()
+
+        if headers is not None:
+            headers = {**self._manager.headers, **headers}
+
+        time_start = time.perf_counter()
+        response = self._manager.request('GET', url, timeout=timeout, headers=headers)
+        self.stats.record_latency(url, time.perf_counter() - time_start)
+
+        if is_forbidden(response.status, response.data):
+            self.limiter.report_forbidden()
+        else:
+            self.limiter.report_success()
+
+        return response
+
+    def clear(self):
+        """Closes all pooled connections."""
+        self._manager.clear()
+
+
+def get_session() -> CrawlerSession:
+    """Gets the process-wide crawler session and creates it on the first call.
+
+    :return: The shared `CrawlerSession`.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = CrawlerSession()
+
+    return _session
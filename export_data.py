@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from typing import Dict, List
 from datetime import datetime
 from collections import defaultdict, OrderedDict
+from copy import deepcopy
 
 from country_helper import COUNTRY_NAMES, COUNTRY_POPULATION
 from graph.choices import GENDER, RELEASE_TYPES
@@ -72,12 +73,16 @@ class ExportGender:
             self.genders[gender] = number
             self.totals += number
 
-    def inc_gender(self, gender):
+    def inc_gender(self, gender, number=1):
         if gender in GENDER:
             if gender not in self.genders:
                 self.genders[gender] = 0
-            self.genders[gender] += 1
-            self.totals += 1
+            self.genders[gender] += number
+            self.totals += number
+
+    def merge(self, other):
+        for gender, number in other.genders.items():
+            self.inc_gender(gender, number)
 
     def update_percentages(self, totals=-1):
         # TODO: Add totals for the worlds total artist numbers.
@@ -112,6 +117,18 @@ class CountryData:
         self.formation_years[year] = number_formation
         self.number_formation_total += number_formation
 
+    def merge(self, other):
+        """Adds the bands and formation years of another CountryData of the same country."""
+        self.number_bands += other.number_bands
+        self.bands_per_100k += other.bands_per_100k
+
+        for year, number_formation in other.formation_years.items():
+            if year in self.formation_years:
+                self.formation_years[year] += number_formation
+                self.number_formation_total += number_formation
+            else:
+                self.add_formation_year(year, number_formation)
+
 
 @dataclass
 class ExportData:
@@ -155,7 +172,7 @@ class ExportData:
                 if artist_origin not in self.genders_origins[band_origin].keys():
                     self.genders_origins[band_origin][artist_origin] = ExportGender()
 
-                self.genders_origins[band_origin][artist_origin].inc_gender(gender)
+                self.genders_origins[band_origin][artist_origin].inc_gender(gender, max(count, 0))
                 is_applied = True
 
         return is_applied
@@ -245,6 +262,51 @@ class ExportData:
         if country_short not in self.country_data.keys():
             pass
 
+    def merge(self, other):
+        """Adds the data of another ExportData, e.g. one prepared from a different set of bands. All numbers are
+            summed up; artists are expected to be counted in only one of both (see the distinct artist counts of
+            `genders_origins`). Band networks are combined.
+
+        :param other: The ExportData to add; it's not changed.
+        :return: This ExportData.
+        """
+        for origin, count in other.origins.items():
+            self.origins[origin] = self.origins.get(origin, 0) + count
+
+        for artist_origin, export_gender in other.genders_country.items():
+            self.genders_country.setdefault(artist_origin, ExportGender()).merge(export_gender)
+
+        for band_origin, genders_origins in other.genders_origins.items():
+            for artist_origin, export_gender in genders_origins.items():
+                self.genders_origins.setdefault(band_origin, {}).setdefault(artist_origin, ExportGender()).merge(
+                    export_gender)
+
+        for country, genres in other.genres.items():
+            country_genres = self.genres.setdefault(country, {})
+
+            for genre, count in genres.items():
+                country_genres[genre] = country_genres.get(genre, 0) + count
+
+        for year, count in other.formation_year_totals.items():
+            self.formation_year_totals[year] = self.formation_year_totals.get(year, 0) + count
+
+        for country_short, country_data in other.country_data.items():
+            if country_short in self.country_data:
+                self.country_data[country_short].merge(country_data)
+            else:
+                self.country_data[country_short] = deepcopy(country_data)
+
+        for year, release_types in other.releases.items():
+            for release_type, releases in release_types.items():
+                self.releases.setdefault(year, {}).setdefault(release_type, []).extend(releases)
+
+        self.bands_total += other.bands_total
+        self.formation_year_min = min(self.formation_year_min, other.formation_year_min)
+        # The network is a class attribute until it's assigned; it must not be changed in place.
+        self.band_network = {**self.band_network, **other.band_network}
+
+        return self
+
     def do_export_calc(self):
         formation_year_min = datetime.today().year
 
@@ -259,3 +321,63 @@ class ExportData:
         for country in self.country_data.values():
             country.percentage_bands = country.number_bands / self.bands_total
             country.formation_years = OrderedDict(sorted(country.formation_years.items()))
+
+
+@dataclass
+class ExportRows:
+    """The aggregated rows a database strategy delivers for an ExportData. Rows are tuples in the given order of
+        values.
+    """
+    # (origin, number of artists) of all artists.
+    origins: list = field(default_factory=list)
+    # (origin, gender, number of artists) of the artists from the requested countries.
+    genders: list = field(default_factory=list)
+    # (band country, artist origin, gender, number of distinct artists) of the requested countries.
+    genders_country: list = field(default_factory=list)
+    # (country, number of bands) of the requested countries.
+    bands: list = field(default_factory=list)
+    # (country, formation date as ISO string or None, number of bands) of the requested countries.
+    formations: list = field(default_factory=list)
+    # (country, list of genres, number of bands) of the requested countries.
+    genres: list = field(default_factory=list)
+    # (country, band name, release name, rating, review count, link, release type key, release date as ISO string) of
+    # the requested countries.
+    releases: list = field(default_factory=list)
+
+
+def make_export_data(rows: ExportRows) -> ExportData:
+    """Fills an ExportData with the aggregated rows of a database. The rows are applied in a fixed order; bands per
+        country must be known before their formation years.
+
+    :param rows: The ExportRows of the requested countries.
+    :return: The prepped ExportData.
+    """
+    prepped_data = ExportData()
+
+    for origin, count in rows.origins:
+        prepped_data.origins[origin] = count
+
+    for origin, gender, count in rows.genders:
+        prepped_data.add_gender_country(artist_origin=origin, gender=gender, count=count)
+
+    for band_origin, artist_origin, gender, count in rows.genders_country:
+        prepped_data.add_gender_country(band_origin=band_origin, artist_origin=artist_origin, gender=gender,
+                                        count=count)
+
+    for country, count in rows.bands:
+        prepped_data.add_bands_per_country(country_short=country, number_bands=count)
+
+    for country, formed, count in rows.formations:
+        # Unknown formation dates have 'None' as the formation attribute.
+        if formed is not None:
+            prepped_data.add_band_formation_date(country_short=country, year=int(formed[:4]), formation_number=count)
+
+    for country, genres, count in rows.genres:
+        prepped_data.add_genre_country(country=country, genres=genres, count=count)
+
+    for release in rows.releases:
+        prepped_data.add_release(country=release[0], band_name=release[1], name=release[2],
+                                 rating=release[3], review_count=release[4], link=release[5],
+                                 release_type=release[6], date=release[7])
+
+    return prepped_data
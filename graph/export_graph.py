@@ -102,9 +102,9 @@ class GraphMLExporter(GraphExportStrategy):
             if FILTER_UNCONNECTED and len(payload['relations']) == 0:
                 pass
             else:
-                # Add an empty list for the actual ID (node).
+                # Add an empty set for the actual ID (node).
                 if node not in connections_made:
-                    connections_made[node] = []
+                    connections_made[node] = set()
 
             for relation in payload['relations']:
                 # Check if the relation is valid for this export. E.g. While exporting a Norwegian-only graph,
@@ -113,14 +113,14 @@ class GraphMLExporter(GraphExportStrategy):
                 if relation not in data_dict and not FIND_MA_INCONSISTENCIES:
                     continue
                 elif relation not in connections_made:
-                    connections_made[relation] = []
+                    connections_made[relation] = set()
 
                 # Test if a connection already exists.
                 if relation in connections_made[node] or node in connections_made[relation]:
                     pass
                 else:
-                    connections_made[node].append(relation)
-                    connections_made[relation].append(node)
+                    connections_made[node].add(relation)
+                    connections_made[relation].add(node)
                     export_file.write(f'<edge id="e{counter}" source="n{node}" target="n{relation}"/>\n')
                     counter += 1
 
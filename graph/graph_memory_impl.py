@@ -0,0 +1,317 @@
+"""Implements the `GraphDatabaseStrategy` in memory. Bands, members, releases and labels are kept in dictionaries by
+their emid; the relationships are kept in reverse indexes (band → members, member → bands, band → releases, country →
+bands) which are updated with every write. All queries are answered from these indexes without any I/O, so it's a
+backend without latency for tests and for profiling the Python side of crawls and exports. Nothing is persisted.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date
+import logging
+import threading
+
+from country_helper import COUNTRY_NAMES
+from graph.metal_graph import GraphDatabaseStrategy, NODE_PROPERTIES, get_member_status_filter, make_bands_per_pop
+from graph.report import DatabaseReport, ReportMode, ReportRows, make_database_report
+from export_data import ExportData, ExportRows, make_export_data
+import settings
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+def deflate(value):
+    """Converts a property like neomodel does: Dates become ISO strings, also inside lists.
+
+    :param value: A property of a written dictionary.
+    :return: The converted value.
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        return [deflate(element) for element in value]
+
+    return value
+
+
+class MemoryStrategy(GraphDatabaseStrategy):
+    """All access is guarded by one lock. Writes of `write_in_transaction_interface` are only applied once the whole
+        function ran without an error.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('Memory')
+        self._lock = threading.RLock()
+        # Writes of a running transaction; None outside of transactions.
+        self._pending_writes = None
+        self.nodes = {node_type: {} for node_type in NODE_PROPERTIES.keys()}
+        # The stints of a band by member emid.
+        self.band_members = defaultdict(dict)
+        self.member_bands = defaultdict(set)
+        self.band_releases = defaultdict(set)
+        self.label_releases = defaultdict(set)
+        self.country_bands = defaultdict(set)
+
+    def close(self):
+        pass
+
+    def _write(self, write):
+        with self._lock:
+            if self._pending_writes is not None:
+                self._pending_writes.append(write)
+            else:
+                write()
+
+    def write_in_transaction_interface(self, write):
+        """Runs `write` and applies all its writes afterwards; either all of them are applied or none.
+
+        :param write: A function without parameters which calls the write methods.
+        :return: The result of `write`.
+        """
+        with self._lock:
+            self._pending_writes = []
+
+            try:
+                result = write()
+                pending_writes = self._pending_writes
+            finally:
+                self._pending_writes = None
+
+            for pending_write in pending_writes:
+                pending_write()
+
+            return result
+
+    def _upsert_nodes(self, node_type, node_dicts):
+        properties = NODE_PROPERTIES[node_type]
+        nodes = [{name: deflate(node_dict.get(name)) for name in properties} for node_dict in node_dicts]
+
+        def write():
+            for node in nodes:
+                if node_type == 'bands':
+                    old_node = self.nodes['bands'].get(node['emid'])
+
+                    if old_node is not None:
+                        self.country_bands[old_node['country']].discard(node['emid'])
+
+                    self.country_bands[node['country']].add(node['emid'])
+
+                self.nodes[node_type][node['emid']] = node
+
+        self._write(write)
+
+    def add_band_interface(self, band_dict):
+        self._upsert_nodes('bands', [band_dict])
+
+    def add_label_interface(self, label_dict):
+        self._upsert_nodes('labels', [label_dict])
+
+    def add_release_interface(self, release_dict):
+        self._upsert_nodes('releases', [release_dict])
+
+    def add_member_interface(self, member_dict):
+        self._upsert_nodes('members', [member_dict])
+
+    def band_recorded_release_interface(self, band_id, release_id):
+        self.bands_recorded_releases_interface([(band_id, release_id)])
+
+    def member_played_in_band_interface(self, member_id, band_id, instrument, pseudonym, time_frame, status):
+        self.members_played_in_bands_interface([{
+            'member_id': member_id, 'band_id': band_id, 'instrument': instrument, 'pseudonym': pseudonym,
+            'time_frame': time_frame, 'status': status
+        }])
+
+    def label_issued_release_interface(self, label_id, release_id):
+        def write():
+            if label_id in self.nodes['labels'] and release_id in self.nodes['releases']:
+                self.label_releases[label_id].add(release_id)
+
+        self._write(write)
+
+    def add_bands_interface(self, band_dicts):
+        self._upsert_nodes('bands', band_dicts)
+
+    def add_releases_interface(self, release_dicts):
+        self._upsert_nodes('releases', release_dicts)
+
+    def add_members_interface(self, member_dicts):
+        self._upsert_nodes('members', member_dicts)
+
+    def bands_recorded_releases_interface(self, recordings):
+        recordings = list(recordings)
+
+        def write():
+            # Like the MATCH of the neomodel implementation: Nothing is connected if one of the two does not exist.
+            for band_id, release_id in recordings:
+                if band_id in self.nodes['bands'] and release_id in self.nodes['releases']:
+                    self.band_releases[band_id].add(release_id)
+
+        self._write(write)
+
+    def members_played_in_bands_interface(self, stints):
+        stints = [{name: deflate(value) for name, value in stint.items()} for stint in stints]
+
+        def write():
+            # A member has exactly one relationship to a band; the last stint wins.
+            for stint in stints:
+                if stint['member_id'] in self.nodes['members'] and stint['band_id'] in self.nodes['bands']:
+                    self.band_members[stint['band_id']][stint['member_id']] = stint
+                    self.member_bands[stint['member_id']].add(stint['band_id'])
+
+        self._write(write)
+
+    def get_all_links_interface(self) -> dict:
+        with self._lock:
+            return {
+                'bands': {band['link']: band['visited'] for band in self.nodes['bands'].values()},
+                'artists': {member['link']: member['visited'] for member in self.nodes['members'].values()}
+            }
+
+    def _get_band_ids(self, country_shorts) -> list:
+        """Gets the emids of the bands of the given countries (or all bands if the list is empty) in ascending order."""
+        if not country_shorts:
+            return sorted(self.nodes['bands'].keys())
+
+        return sorted(emid for country in set(country_shorts) for emid in self.country_bands[country])
+
+    def _count_members(self, band_ids) -> list:
+        """Counts the distinct members of the bands per band country, member origin and gender.
+
+        :param band_ids: A list of band emids.
+        :return: A list of (band country, artist origin, gender, number of distinct artists) rows.
+        """
+        members_per_country = defaultdict(set)
+
+        for band_id in band_ids:
+            members_per_country[self.nodes['bands'][band_id]['country']].update(self.band_members[band_id].keys())
+
+        counts = Counter()
+
+        for country, member_ids in members_per_country.items():
+            for member_id in member_ids:
+                member = self.nodes['members'][member_id]
+                counts[(country, member['origin'], member['gender'])] += 1
+
+        return [key + (count,) for key, count in counts.items()]
+
+    def export_bands_network_interface(self, country_shorts):
+        statuses = set(get_member_status_filter())
+        band_relationships = {}
+        self.logger.info('Starting export of band network...')
+
+        with self._lock:
+            for band_id in self._get_band_ids(country_shorts):
+                band = self.nodes['bands'][band_id]
+                relations = set()
+
+                for member_id, stint in self.band_members[band_id].items():
+                    if stint['status'] not in statuses:
+                        continue
+
+                    for outer_band_id in self.member_bands[member_id]:
+                        if outer_band_id != band_id and \
+                                self.band_members[outer_band_id][member_id]['status'] in statuses:
+                            relations.add(outer_band_id)
+
+                band_relationships[band_id] = {
+                    'name': band['name'],
+                    'country': COUNTRY_NAMES[band['country']],
+                    'relations': sorted(relations)
+                }
+
+        return band_relationships
+
+    def calc_bands_per_pop_interface(self, country_short, bands) -> dict:
+        """Calculates the number of bands per 100k people for a given country and puts the data into a dict.
+
+        :param country_short: The country's ISO code.
+        :param bands: A list of band emids used as basis for the calculation for the given country.
+        :return: A dictionary with the calculated data; empty if there are no bands or the population is smaller than
+            one.
+        """
+        with self._lock:
+            member_ids = set()
+            genres = Counter()
+
+            for band_id in bands:
+                member_ids.update(self.band_members[band_id].keys())
+                genres.update(self.nodes['bands'][band_id]['genres'] or [])
+
+            genders = Counter(self.nodes['members'][member_id]['gender'] for member_id in member_ids)
+
+        return make_bands_per_pop(country_short, len(bands), dict(genders), dict(genres))
+
+    def prepare_export_data(self, country_shorts: list, report_mode: ReportMode) -> ExportData:
+        self.logger.info('Preparing data export.')
+
+        with self._lock:
+            bands = self.nodes['bands']
+            members = self.nodes['members'].values()
+            band_ids = self._get_band_ids(country_shorts)
+            rows = ExportRows()
+            rows.origins = list(Counter(member['origin'] for member in members).items())
+            rows.genders = [key + (count,) for key, count in Counter(
+                (member['origin'], member['gender']) for member in members
+                if not country_shorts or member['origin'] in country_shorts).items()]
+            rows.genders_country = self._count_members(band_ids)
+            rows.bands = list(Counter(bands[band_id]['country'] for band_id in band_ids).items())
+            rows.formations = [key + (count,) for key, count in Counter(
+                (bands[band_id]['country'], bands[band_id]['formed']) for band_id in band_ids).items()]
+            genre_counts = Counter((bands[band_id]['country'], tuple(bands[band_id]['genres'] or []))
+                                   for band_id in band_ids)
+            rows.genres = [(country, list(genres), count) for (country, genres), count in genre_counts.items()]
+
+            for band_id in band_ids:
+                for release_id in sorted(self.band_releases[band_id]):
+                    release = self.nodes['releases'][release_id]
+                    rows.releases.append((bands[band_id]['country'], bands[band_id]['name'], release['name'],
+                                          release['rating'], release['review_count'], release['link'],
+                                          release['release_type'], release['release_date']))
+
+        return make_export_data(rows)
+
+    def generate_report_interface(self, country_shorts, report_mode) -> DatabaseReport:
+        country_shorts = country_shorts or []
+        release_types = settings.RELEASE_TYPES_REVIEW
+
+        with self._lock:
+            bands = self.nodes['bands']
+            band_ids = self._get_band_ids(country_shorts)
+            rows = ReportRows()
+            rows.artists = [key + (count,) for key, count in Counter(
+                (member['origin'], member['gender']) for member in self.nodes['members'].values()).items()]
+            rows.bands = list(Counter(band['country'] for band in bands.values()).items())
+            rows.genres = [key + (count,) for key, count in Counter(
+                (band['country'], genre) for band in bands.values() for genre in band['genres'] or []).items()]
+            band_links = defaultdict(list)
+            formations = Counter()
+            release_counts = Counter()
+
+            for band_id in band_ids:
+                band = bands[band_id]
+                band_links[band['country']].append(band['link'])
+
+                if band['formed'] is not None:
+                    formations[(band['country'], int(band['formed'][:4]))] += 1
+
+                for release_id in self.band_releases[band_id]:
+                    release = self.nodes['releases'][release_id]
+
+                    if release['release_type'] not in release_types:
+                        continue
+
+                    release_counts[(band['country'], release['release_type'])] += 1
+
+                    if release['rating'] is not None and release['rating'] >= settings.RELEASE_AVERAGE_MIN and \
+                            release['review_count'] is not None and \
+                            release['review_count'] >= settings.RELEASE_REVIEW_COUNT_MIN:
+                        rows.releases.append((band['country'], band['name'], release['name'], release['link'],
+                                              release['release_type'], release['release_date'], release['rating']))
+
+            rows.band_links = list(band_links.items())
+            rows.formations = [key + (count,) for key, count in formations.items()]
+            rows.members = self._count_members(band_ids)
+            rows.release_counts = [key + (count,) for key, count in release_counts.items()]
+            rows.releases.sort(key=lambda release: (release[5], release[2]))
+
+        return make_database_report(rows, country_shorts, report_mode, release_types)
@@ -1,20 +1,21 @@
 """Implements the `GraphDatabaseStrategy` and a set of classes to define data in the neomodel context."""
 
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import settings
+import time
 
 import logging
 from neomodel import StringProperty, IntegerProperty, ArrayProperty, DateProperty, RelationshipTo, \
     RelationshipFrom, StructuredRel, StructuredNode, config, db
-from neo4j import exceptions
+from neo4j import READ_ACCESS, exceptions
 from neomodel import match_q
 import progressbar
 
-from country_helper import COUNTRY_NAMES, COUNTRY_POPULATION
+from country_helper import COUNTRY_NAMES
 from graph.choices import *
-from graph.metal_graph import GraphDatabaseStrategy, POP_BANDS, POP_PER_100K, POP_POPULATION, RAW_GENRES, POP_COUNTRY
-from graph.report import CountryReport, DatabaseReport, ReleaseReport, ReportMode
-from export_data import ExportData
+from graph.metal_graph import GraphDatabaseStrategy, get_member_status_filter, make_bands_per_pop
+from graph.report import DatabaseReport, ReportMode, ReportRows, make_database_report
+from export_data import ExportData, ExportRows, make_export_data
 
 __author__ = 'Martin Woelke'
 __license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
@@ -82,6 +83,94 @@ class Member(StructuredNode):
         return results
 
 
+# Secondary indexes for the properties the crawler, the exports and the reports filter on. The emid of every node has a
+# unique constraint defined in the models above.
+SECONDARY_INDEXES = [('Band', 'country'), ('Band', 'link'), ('Member', 'link'), ('Member', 'origin'),
+                     ('Member', 'gender')]
+# Queries whose plans are checked at startup; none of them should scan all nodes of a label.
+HOT_QUERIES = {
+    'band by emid': ('MATCH (b:Band {emid: $emid}) RETURN b.link', {'emid': 0}),
+    'band by link': ('MATCH (b:Band {link: $link}) RETURN b.emid', {'link': ''}),
+    'bands by country': ('MATCH (b:Band) WHERE b.country IN $country_shorts RETURN b.link', {'country_shorts': ['NO']}),
+    'release by emid': ('MATCH (r:Release {emid: $emid}) RETURN r.name', {'emid': 0}),
+    'member by emid': ('MATCH (m:Member {emid: $emid}) RETURN m.link', {'emid': 0}),
+    'member by link': ('MATCH (m:Member {link: $link}) RETURN m.emid', {'link': ''}),
+    'members by origin': ('MATCH (m:Member) WHERE m.origin IN $origins RETURN m.gender', {'origins': ['NO']}),
+    'members by gender': ('MATCH (m:Member {gender: $gender}) RETURN m.origin', {'gender': 'F'})
+}
+SCAN_OPERATORS = ['AllNodesScan', 'NodeByLabelScan']
+
+
+def stream_query(query, parameters=None, fetch_size=settings.NEO4J_FETCH_SIZE):
+    """Runs a read query and yields its records lazily instead of loading the whole result like `db.cypher_query`
+        does. The records are fetched from the server in batches; keep the loop body short because the session stays
+        open until the generator is exhausted.
+
+    :param query: The Cypher query.
+    :param parameters: A dictionary with the query parameters.
+    :param fetch_size: Number of records fetched per round-trip.
+    :return: A generator of records, each a list of values like the rows of `db.cypher_query`.
+    """
+    with db.driver.session(fetch_size=fetch_size, default_access_mode=READ_ACCESS) as session:
+        for record in session.run(query, parameters):
+            yield record.values()
+
+
+def get_plan_operators(plan) -> list:
+    """Collects the operators of a query plan.
+
+    :param plan: The plan of a query summary (a dictionary with the keys 'operatorType' and 'children').
+    :return: A list of operator names without the runtime suffix (e.g. 'NodeIndexSeek' for 'NodeIndexSeek@neo4j').
+    """
+    if plan is None:
+        return []
+
+    operators = [plan['operatorType'].split('@')[0]]
+
+    for child in plan.get('children', []):
+        operators.extend(get_plan_operators(child))
+
+    return operators
+
+
+def fetch_timed(query, parameters=None, consume=list):
+    """Runs a read query in its own session and hands the stream of its records to `consume`.
+
+    :param query: The Cypher query.
+    :param parameters: A dictionary with the query parameters.
+    :param consume: A function which gets the generator of records (like `stream_query`) and returns what is kept of
+        them. `list` keeps all records; use it only for aggregated queries with one row per group.
+    :return: A tuple of the result of `consume`, the number of records and the time in seconds it took.
+    """
+    time_start = time.perf_counter()
+    record_count = 0
+
+    def count_records():
+        nonlocal record_count
+
+        for record in stream_query(query, parameters):
+            record_count += 1
+            yield record
+
+    result = consume(count_records())
+    return result, record_count, time.perf_counter() - time_start
+
+
+def run_queries_concurrently(queries: dict, workers=settings.NEO4J_QUERY_WORKERS, fetch=fetch_timed) -> dict:
+    """Runs independent read queries at the same time, each on a separate session of the driver's pool. The records
+        of a query are consumed by its worker while they are streamed; none of them is loaded in full.
+
+    :param queries: A dictionary with a name as key and a tuple of query, parameters and optionally the `consume`
+        function of `fetch_timed` as value.
+    :param workers: The maximum number of queries running at the same time.
+    :param fetch: Runs one query like `fetch_timed`; replaceable for tests.
+    :return: A dictionary with the same keys and the tuples of `fetch_timed` as value.
+    """
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(queries)), 1), thread_name_prefix='Query') as executor:
+        futures = {name: executor.submit(fetch, *query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
 class NeoModelStrategy(GraphDatabaseStrategy):
 
     config.DATABASE_URL = f'bolt://{settings.NEO4J_USERNAME}:{settings.NEO4J_PASSWORD}@{settings.NEO4J_IP_ADDRESS}:7687'
@@ -112,6 +201,44 @@ class NeoModelStrategy(GraphDatabaseStrategy):
             self.logger.error(f'{error_text}')
             raise
 
+        try:
+            self.install_schema()
+            self.verify_query_plans()
+        except exceptions.Neo4jError as e:
+            # Missing privileges only make queries slow.
+            self.logger.warning(f'Cannot install or verify the indexes: {e.message}')
+
+    def install_schema(self):
+        """Creates the unique constraints of the models and all secondary indexes unless they exist already."""
+        for node_class in [Band, Label, Release, Member]:
+            db.install_labels(node_class, quiet=True)
+
+        for label, property_name in SECONDARY_INDEXES:
+            db.cypher_query(f'CREATE INDEX {label.lower()}_{property_name} IF NOT EXISTS '
+                            f'FOR (n:{label}) ON (n.{property_name})')
+
+        # New indexes are populated in the background; the planner ignores them until they are online.
+        db.cypher_query('CALL db.awaitIndexes(300)')
+        self.logger.info('Constraints and indexes are in place.')
+
+    def verify_query_plans(self):
+        """Explains the hot queries and warns for each one which would scan all nodes of a label.
+
+        :return: A list of the names of the scanning queries (see HOT_QUERIES).
+        """
+        scanning_queries = []
+
+        with db.driver.session() as session:
+            for name, (query, parameters) in HOT_QUERIES.items():
+                plan = session.run(f'EXPLAIN {query}', parameters).consume().plan
+                scan_operators = [operator for operator in get_plan_operators(plan) if operator in SCAN_OPERATORS]
+
+                if len(scan_operators) > 0:
+                    self.logger.warning(f'Query "{name}" uses {", ".join(scan_operators)} instead of an index.')
+                    scanning_queries.append(name)
+
+        return scanning_queries
+
     def add_band_interface(self, band_dict):
         bands = Band.create_or_update(band_dict)
 
@@ -146,306 +273,188 @@ class NeoModelStrategy(GraphDatabaseStrategy):
         release = Release.nodes.get(emid=release_id)
         label.releases.connect(release)
 
+    def write_in_transaction_interface(self, write):
+        """Runs all writes of `write` in one explicit transaction; either all of them are committed or none. Transient
+            errors roll the transaction back and run it again after a delay.
+
+        :param write: A function without parameters which calls the write methods.
+        :return: The result of `write`.
+        """
+        for attempt in range(1, settings.NEO4J_WRITE_ATTEMPTS + 1):
+            try:
+                with db.write_transaction:
+                    return write()
+            except (exceptions.TransientError, exceptions.ServiceUnavailable, exceptions.SessionExpired) as e:
+                if attempt == settings.NEO4J_WRITE_ATTEMPTS:
+                    raise
+
+                delay = settings.NEO4J_WRITE_RETRY_DELAY * 2 ** (attempt - 1)
+                self.logger.warning(f'Transaction failed ({e.__class__.__name__}); trying again in {delay:.1f} s.')
+                time.sleep(delay)
+
+    @staticmethod
+    def _merge_nodes(node_class, node_dicts):
+        """Creates or updates nodes of one class with a single statement, like `create_or_update` does for each node.
+
+        :param node_class: The `StructuredNode` subclass; only its properties are written.
+        :param node_dicts: A list of dictionaries with the properties of each node (including the unique emid).
+        """
+        if len(node_dicts) == 0:
+            return
+
+        rows = [node_class.deflate(node_dict) for node_dict in node_dicts]
+        query = (f'UNWIND $rows AS row '
+                 f'MERGE (n:{node_class.__name__} {{emid: row.emid}}) '
+                 f'SET n += row')
+        db.cypher_query(query, {'rows': rows})
+
+    def add_bands_interface(self, band_dicts):
+        self._merge_nodes(Band, band_dicts)
+
+    def add_releases_interface(self, release_dicts):
+        self._merge_nodes(Release, release_dicts)
+
+    def add_members_interface(self, member_dicts):
+        self._merge_nodes(Member, member_dicts)
+
+    def bands_recorded_releases_interface(self, recordings):
+        if len(recordings) == 0:
+            return
+
+        query = ('UNWIND $rows AS row '
+                 'MATCH (b:Band {emid: row[0]}), (r:Release {emid: row[1]}) '
+                 'MERGE (b)-[:RECORDED]->(r)')
+        # The nodes are stored with deflated (integer) emids; crawled emids are strings.
+        rows = [[Band.emid.deflate(band_id), Release.emid.deflate(release_id)] for band_id, release_id in recordings]
+        db.cypher_query(query, {'rows': rows})
+
+    def members_played_in_bands_interface(self, stints):
+        if len(stints) == 0:
+            return
+
+        # The last stint of a member in a band wins.
+        # The emids are deflated like the ones of the nodes.
+        rows = {(stint['member_id'], stint['band_id']): {
+            'member_id': Member.emid.deflate(stint['member_id']), 'band_id': Band.emid.deflate(stint['band_id']),
+            'properties': MemberRelationship.deflate(stint)} for stint in stints}
+        # Like member_played_in_band_interface: A member has exactly one relationship to a band.
+        query = ('UNWIND $rows AS row '
+                 'MATCH (m:Member {emid: row.member_id}), (b:Band {emid: row.band_id}) '
+                 'OPTIONAL MATCH (m)-[old:PLAYED_IN]->(b) '
+                 'DELETE old '
+                 'WITH DISTINCT m, b, row '
+                 'CREATE (m)-[played_in:PLAYED_IN]->(b) '
+                 'SET played_in = row.properties')
+        db.cypher_query(query, {'rows': list(rows.values())})
+
     def get_all_links_interface(self) -> dict:
         all_links = {'bands': {}, 'artists': {}}
 
         self.logger.info('  Fetching known bands from database..')
         query = 'MATCH (b:Band) RETURN b.link, b.visited'
-        bands, meta = db.cypher_query(query)
-        for band_entry in bands:
+        for band_entry in stream_query(query):
             all_links['bands'][band_entry[0]] = band_entry[1]
-        self.logger.info(f'    ...found {len(bands)}')
+        self.logger.info(f'    ...found {len(all_links["bands"])}')
 
         self.logger.info('  Fetching known artists from database.')
         query = 'MATCH (n:Member) RETURN n.link, n.visited'
-        artists, meta = db.cypher_query(query)
-        for artist_entry in artists:
+        for artist_entry in stream_query(query):
             all_links['artists'][artist_entry[0]] = artist_entry[1]
-        self.logger.info(f'    ...found {len(artists)}')
+        self.logger.info(f'    ...found {len(all_links["artists"])}')
 
         return all_links
 
     def export_bands_network_interface(self, country_shorts: list):
         if len(country_shorts) != 0:
-            bands = Band.nodes.filter(country__in=country_shorts)
+            band_filter = 'WHERE b.country IN $country_shorts '
         else:
-            bands = Band.nodes.all()
+            band_filter = ''
+
+        parameters = {'country_shorts': country_shorts, 'statuses': get_member_status_filter()}
+        band_count = next(stream_query(f'MATCH (b:Band) {band_filter}RETURN count(b)', parameters))[0]
+        # One row per band with the distinct bands its members (with a status of the filter) also played in. The
+        # band-member-band projection is done by the database instead of a query per member and band.
+        query = (f'MATCH (b:Band) {band_filter}'
+                 'OPTIONAL MATCH (b)<-[stint:PLAYED_IN]-(m:Member)-[outer_stint:PLAYED_IN]->(outer_band:Band) '
+                 'WHERE stint.status IN $statuses AND outer_stint.status IN $statuses AND outer_band <> b '
+                 'RETURN b.emid, b.name, b.country, collect(DISTINCT outer_band.emid)')
 
         self.logger.info('Starting export of band network...')
-        progress_bar = progressbar.ProgressBar(max_value=len(bands))
+        progress_bar = progressbar.ProgressBar(max_value=band_count)
         band_relationships = {}
-        relationship_filter = []
 
-        # If IS_LIVE_MEMBER_IN_BAND is False all entries containing 'Live' will be filtered.
-        for key, value in MEMBER_STATUS.items():
-            if not settings.IS_LIVE_MEMBER_IN_BAND and 'Live' in value:
-                pass
-            else:
-                relationship_filter.append(key)
-
-        for band in bands:
-            # We have a band; let's create an entry and see if it's linked to anything.
-            band_relationships[band.emid] = {
-                'name': band.name,
-                'country': COUNTRY_NAMES[band.country],
-                'relations': []
+        for band_entry in stream_query(query, parameters):
+            band_relationships[band_entry[0]] = {
+                'name': band_entry[1],
+                'country': COUNTRY_NAMES[band_entry[2]],
+                # The graph is undirected; a connection from A to B is also listed for B. The exporters write every
+                # edge only once.
+                'relations': sorted(band_entry[3])
             }
-
-            # Iterate over all members linked to the actual band and see if they're connected to other bands.
-            for member in band.current_lineup.match(status__in=relationship_filter):
-                for outer_band in member.played_in.match(status__in=relationship_filter):
-                    is_already_connected = band.emid == outer_band.emid
-                    # WARNING: This makes the graph undirected. We deliberately connect only the first instance:
-                    # E.g. the connection from A to B is recorded but not the connection from B to A. This is extremely
-                    # Fragile and does not work well (exporting is more complicated and the order of the dict matters).
-                    # is_already_connected |= outer_band.emid in band_relationships.keys()
-                    is_already_connected |= outer_band.emid in band_relationships[band.emid]['relations']
-
-                    if not is_already_connected:
-                        band_relationships[band.emid]['relations'].append(outer_band.emid)
-
-            progress_bar.update(len(band_relationships))
+            progress_bar.update(min(len(band_relationships), band_count))
 
         progress_bar.finish()
         print()
         return band_relationships
 
-    def generate_country_report(self, country_short, bands):
-        """ Generate a CountryReport from the given country short and list of bands.
-
-        :param country_short: An ISO country short string.
-        :param bands: A list of Band objects.
-        :return: An instantiated CountryReport or None if any of the parameters were invalid.
-        """
-
-        if country_short not in COUNTRY_NAMES.keys():
-            return None
-
-        number_bands = len(bands)
-
-        # No need to go further if there are no bands.
-        if number_bands == 0:
-            return None
-
-        population = COUNTRY_POPULATION[country_short]
-
-        # Bands per capita cannot be calculated with 0 people.
-        if int(population) == 0:
-            return None
-
-        unique_members = {}
-        progress_bar = progressbar.ProgressBar(max_value=number_bands)
-        band_counter = 0
-        member_counter = 0
-        print(f'    Iterating {COUNTRY_NAMES[country_short]}\'s bands for gender and genre statistics.')
-
-        # Init genders dict outside. Will be set in CountryReport object manually.
-        genders = {}
-
-        for gender in GENDER:
-            genders[gender] = 0
-
-        genres = {}
-        gender_per_country = defaultdict(int)
-        bands_per_year = defaultdict(int)
-        sanity_bands = []
-
-        for band in bands:
-            sanity_bands.append(band.link)
-            for genre in band.genres:
-                if genre not in genres.keys():
-                    genres[genre] = 1
-                else:
-                    genres[genre] += 1
-            # Get the relationships of all members linked to the actual band.
-            for member in band.current_lineup:
-                if member.emid not in unique_members.keys():
-                    unique_members[member.emid] = ""
-                    # TODO: Fix multiple counting of artists.
-                    genders[member.gender] += 1
-                    member_counter += 1
-                    gender_per_country[member.origin] += 1
-
-            if band.formed is not None:
-                bands_per_year[band.formed.year] += 1
-            else:
-                pass
-                # Commented until I know what to do with unknown formation dates.
-                # bands_per_year[-1] += 1
-            band_counter += 1
-            progress_bar.update(band_counter)
-
-        progress_bar.finish()
-        genres = sorted(genres.items(), key=lambda x: x[1], reverse=True)
-        report = CountryReport(country_short, population, sanity_bands, genders, gender_per_country, genres, bands_per_year)
-
-        return report
-
     def calc_bands_per_pop_interface(self, country_short, bands) -> dict:
-        """Calculates the number of bands per 100k people for a given country and puts the data into a dict. The result
-            will be empty for two error cases: The country population is smaller than one or if there are no bands
-            available in the requested country.
-
-        :param country_short: The country's ISO code to get the data from the database.
-        :param bands: A list of bands used as basis for the calculation for the given country.
-        :return: A dictionary with the calculated data. Keys to data are the country short and the constants above.
-            The dict will be empty for the error cases described above.
-        """
-        result = {}
+        """Calculates the number of bands per 100k people for a given country and puts the data into a dict.
 
-        if len(bands) == 0:
-            return result
-
-        population = COUNTRY_POPULATION[country_short]
-
-        if int(population) <= 1:
-            return result
-
-        result[POP_COUNTRY] = COUNTRY_NAMES[country_short]
-        result[POP_BANDS] = str(len(bands))
-        result[POP_POPULATION] = population
-        bands_per_100k = len(bands) / (int(population) / 100000)
-        result[POP_PER_100K] = f'{bands_per_100k:.2f}'
-
-        unique_members = {}
-        genders = {}
-
-        for gender in GENDER:
-            genders[gender] = 0
-
-        progress_bar = progressbar.ProgressBar(max_value=len(bands))
-        band_counter = 0
-        member_counter = 0
-        self.logger.info(f'Iterating {COUNTRY_NAMES[country_short]}\'s bands for gender and genre statistics.')
-        genres = defaultdict(int)
-
-        for band in bands:
-            for genre in band.genres:
-                genres[genre] += 1
-            # Get the relationships of all members linked to the actual band.
-            for member in band.current_lineup:
-                if member.emid not in unique_members.keys():
-                    unique_members[member.emid] = ""
-                    # TODO: Fix multiple counting of artists.
-                    genders[member.gender] += 1
-                    member_counter += 1
-
-            band_counter += 1
-            progress_bar.update(band_counter)
-
-        progress_bar.finish()
-        result['Artists'] = member_counter
-
-        for key, value in genders.items():
-            percentage = (value / member_counter) * 100
-            result[f'  {GENDER[key]}'] = f'{value} ({percentage:.2f}%).'
-
-        result[RAW_GENRES] = genres
+        :param country_short: The country's ISO code.
+        :param bands: A list of band emids used as basis for the calculation for the given country.
+        :return: A dictionary with the calculated data; empty if there are no bands or the population is smaller than
+            one.
+        """
+        # Aggregated by the database instead of following the relationships of every band node.
+        parameters = {'emids': [Band.emid.deflate(emid) for emid in bands]}
+        genders, _ = db.cypher_query('MATCH (m:Member)-[:PLAYED_IN]->(b:Band) WHERE b.emid IN $emids '
+                                     'RETURN m.gender, count(DISTINCT m)', parameters)
+        genres, _ = db.cypher_query('MATCH (b:Band) WHERE b.emid IN $emids UNWIND b.genres AS genre '
+                                    'RETURN genre, count(*)', parameters)
 
-        return result
+        return make_bands_per_pop(country_short, len(bands), dict(genders), dict(genres))
 
     def prepare_export_data(self, country_shorts: list, report_mode: ReportMode) -> ExportData:
-        prepped_data = ExportData()
         self.logger.info('Preparing data export:')
-
-        # Prep origin data.
-        self.logger.info(' ┣ Fetching artist origins')
-        origins, meta = db.cypher_query('MATCH (m:Member) return m.origin, count(*)')
-        for origin in origins:
-            prepped_data.origins[origin[0]] = origin[1]
-
-        # Prep the gender raw data
-        # First we get the numbers per origin country of an artist.
-        self.logger.info(' ┣ Fetching genders (country origins)')
-        if len(country_shorts) == 0:
-            query = 'MATCH (m:Member) RETURN m.origin, m.gender, count(*)'
-        else:
-            query = f'MATCH (m:Member) WHERE m.origin IN {country_shorts} RETURN m.origin, m.gender, count(*)'
-        genders, meta = db.cypher_query(query)
-        for gender_entry in genders:
-            prepped_data.add_gender_country(artist_origin=gender_entry[0],
-                                            gender=gender_entry[1], count=gender_entry[2])
-
-        # The second gender block collects the origins of artists for every country. An artist is counted once per
-        # country.
-        if len(country_shorts) == 0:
-            self.logger.info(' ┗ Fetching genders_country (this will take a while longer)')
-
-            for country in COUNTRY_NAMES.keys():
-                # Stores artist IDs once per country to count them only once.
-                artist_ids = []
-                self.logger.info(f'   ┣ {COUNTRY_NAMES[country]}')
-                query2 = f'MATCH (b:Band)--(m:Member) WHERE b.country = "{country}" RETURN b.country, m.origin,' \
-                         f'm.gender, m.emid'
-                genders2, meta = db.cypher_query(query2)
-                for gender_entry in genders2:
-                    if gender_entry[3] not in artist_ids:
-                        artist_ids.append(gender_entry[3])
-
-                    prepped_data.add_gender_country(band_origin=gender_entry[0], artist_origin=gender_entry[1],
-                                                    gender=gender_entry[2])
-            self.logger.info(f'   ┗ Done')
-        else:
-            self.logger.info(' ┣ Fetching genders_country')
-            query = f'MATCH (b:Band)--(m:Member) WHERE b.country IN {country_shorts} RETURN b.country, m.origin, ' \
-                    f'm.gender, m.emid'
-            genders, meta = db.cypher_query(query)
-            for gender_entry in genders:
-                prepped_data.add_gender_country(band_origin=gender_entry[0], artist_origin=gender_entry[1],
-                                                gender=gender_entry[2])
-
-        # Prep the band origins.
-        self.logger.info(' ┣ Fetching bands per country')
+        # None of the queries depends on another one; the results are applied to ExportData afterwards in a fixed
+        # order so that the export doesn't depend on which query finished first.
         if len(country_shorts) == 0:
-            query = 'MATCH (b:Band) RETURN b.country, count(*)'
+            band_filter = ''
+            member_filter = ''
         else:
-            query = f'MATCH (b:Band) WHERE b.country IN {country_shorts} RETURN b.country, count(*)'
-        bands, meta = db.cypher_query(query)
-        for band_entry in bands:
-            prepped_data.add_bands_per_country(country_short=band_entry[0], number_bands=band_entry[1])
-
-        # Prep the band formation years.
-        self.logger.info(' ┣ Fetching band formation years')
-        if len(country_shorts) == 0:
-            query = 'MATCH (b:Band) RETURN b.country, b.formed, count(*)'
-        else:
-            query = f'MATCH (b:Band) WHERE b.country IN {country_shorts} RETURN b.country, b.formed, count(*)'
-        bands_form, meta = db.cypher_query(query)
-        for band_entry in bands_form:
-            # Unknown formation dates have 'None' as the formation attribute.
-            if band_entry[1] is not None:
-                formation_year = int(band_entry[1][:4])
-                prepped_data.add_band_formation_date(
-                    country_short=band_entry[0],
-                    year=formation_year,
-                    formation_number=band_entry[2]
-                )
-
-        # Prep the raw genre data.
-        self.logger.info(' ┣ Fetching genres')
-        if len(country_shorts) == 0:
-            query = 'MATCH (b:Band) return b.country, b.genres, count(*)'
-        else:
-            query = f'MATCH (b:Band) WHERE b.country IN {country_shorts} RETURN b.country, b.genres, count(*)'
-        genres, meta = db.cypher_query(query)
-        for genre_entry in genres:
-            prepped_data.add_genre_country(country=genre_entry[0], genres=genre_entry[1], count=genre_entry[2])
-
-        # Prep the releases.
-        self.logger.info(' ┣ Fetching releases')
-        if len(country_shorts) == 0:
-            query = ('MATCH (b:Band)--(r:Release) RETURN b.country, b.name, r.name, r.rating, r.review_count, r.link,'
-                     'r.release_type, r.release_date')
-        else:
-            query = (f'MATCH (b:Band)--(r:Release) WHERE b.country IN {country_shorts} return b.country, b.name, '
-                     'r.name, r.rating, r.review_count, r.link, r.release_type, r.release_date')
-        releases, meta = db.cypher_query(query)
-
-        for release in releases:
-            prepped_data.add_release(country=release[0], band_name=release[1], name=release[2],
-                                     rating=release[3], review_count=release[4], link=release[5],
-                                     release_type=release[6], date=release[7])
-
+            band_filter = 'WHERE b.country IN $country_shorts '
+            member_filter = 'WHERE m.origin IN $country_shorts '
+        parameters = {'country_shorts': country_shorts}
+        queries = {
+            # Prep origin data.
+            'origins': ('MATCH (m:Member) RETURN m.origin, count(*)', None),
+            # Prep the gender raw data. First we get the numbers per origin country of an artist.
+            'genders': (f'MATCH (m:Member) {member_filter}RETURN m.origin, m.gender, count(*)', parameters),
+            # The second gender block collects the origins of artists for every country. An artist is counted once
+            # per country of the bands they played in.
+            'genders_country': (f'MATCH (m:Member)-[:PLAYED_IN]->(b:Band) {band_filter}'
+                                'RETURN b.country, m.origin, m.gender, count(DISTINCT m)', parameters),
+            'bands': (f'MATCH (b:Band) {band_filter}RETURN b.country, count(*)', parameters),
+            'formations': (f'MATCH (b:Band) {band_filter}RETURN b.country, b.formed, count(*)', parameters),
+            'genres': (f'MATCH (b:Band) {band_filter}RETURN b.country, b.genres, count(*)', parameters),
+            # One row per release; they are added to an ExportData of their own while they are streamed.
+            'releases': (f'MATCH (b:Band)-[:RECORDED]->(r:Release) {band_filter}RETURN b.country, b.name, r.name, '
+                         'r.rating, r.review_count, r.link, r.release_type, r.release_date', parameters,
+                         lambda records: make_export_data(ExportRows(releases=records)))
+        }
+
+        self.logger.info(f' ┣ Fetching {", ".join(queries.keys())}')
+        time_start = time.perf_counter()
+        results = run_queries_concurrently(queries)
+        self.logger.info(f' ┣ Fetched in {time.perf_counter() - time_start:.2f} s')
+
+        for name, (result, record_count, query_time) in results.items():
+            self.logger.info(f' ┃  {name}: {record_count} rows in {query_time:.2f} s')
+
+        release_data = results.pop('releases')[0]
+        prepped_data = make_export_data(ExportRows(**{name: records for name, (records, record_count, query_time) in
+                                                      results.items()}))
+        prepped_data.merge(release_data)
         self.logger.info(' ┗ Data prepped.')
 
         return prepped_data
@@ -459,87 +468,47 @@ class NeoModelStrategy(GraphDatabaseStrategy):
             because that only makes sense if all bands of all countries are in the database.
         :return: An initialized DatabaseReport object which can be processed further. Printing it is an obvious choice.
         """
-
-        genders = {}
-        artists_total = 0
-        artists_per_country = defaultdict(int)
-
-        self.logger.info('  Getting all artists.')
-
-        for gender_key in GENDER:
-            artists = Member.nodes.filter(gender__exact=gender_key)
-            for artist in artists:
-                artists_per_country[artist.origin] += 1
-
-            genders[gender_key] = len(artists)
-            artists_total += genders[gender_key]
-
-        self.logger.info(f'    ...found {artists_total}')
-        self.logger.info('  Getting all bands.')
-        bands_all = Band.nodes.all()
-        band_count = len(bands_all)
-        bands_filtered = defaultdict(list)
-        self.logger.info(f'    ...found {band_count}')
-        self.logger.info('  Filtering bands.')
-
-        # Two sets of bands are needed: First the bands from the requested countries and second all bands to calculate
-        # e.g. percentages.
         if len(country_shorts) == 0:
-            for band in bands_all:
-                bands_filtered[band.country].append(band)
+            band_filter = ''
         else:
-            for short in country_shorts:
-                temp_bands = Band.nodes.filter(country__exact=short)
-                # This guarantees that every key also has data behind it.
-                if len(temp_bands) > 0:
-                    bands_filtered[short] = temp_bands
-
-        genres = defaultdict(int)
-        release_types = []
-
-        for release_type in settings.RELEASE_TYPES_REVIEW:
-            release_types.append(RELEASE_TYPES[release_type])
-
-        release_report = ReleaseReport(release_types)
-        self.logger.info('  Prep done. Processing releases and genres.')
-        progress_bar = progressbar.ProgressBar(max_value=len(bands_all))
-        band_counter = 0
-
-        for band in bands_all:
-            for genre in band.genres:
-                genres[genre] += 1
-
-            if band.country in bands_filtered.keys():
-                for release in band.releases:
-                    release_report.process_release(
-                        COUNTRY_NAMES[band.country], band.emid, band.name, release.name, release.link,
-                        RELEASE_TYPES[release.release_type], release.release_date, release.rating, release.review_count
-                    )
-
-            band_counter += 1
-            progress_bar.update(band_counter)
-
-        progress_bar.finish()
-        self.logger.info('  Releases processed. Creating database report.')
-        db_report = DatabaseReport(band_count, genders, artists_total, artists_per_country, genres, release_report,
-                                   report_mode)
-        country_diff = set(country_shorts) - set(bands_filtered.keys())
-
-        if len(country_diff) > 0:
-            diff_report = 'No bands were found for: '
-
-            for country in country_diff:
-                diff_report += COUNTRY_NAMES[country] + ', '
-
-            if len(country_diff) > 1:
-                diff_report = diff_report[:-2]
-
-            print(diff_report)
-
-        if report_mode is ReportMode.CountryOn:
-            self.logger.info('  Creating country reports.')
-        # Prepping such a loop with 11k bands may well take 2.5s to 3.2s.
-        for iso_short, bands in bands_filtered.items():
-            db_report.add_country_report(self.generate_country_report(iso_short, bands))
-
-        return db_report
+            band_filter = 'WHERE b.country IN $country_shorts '
+        parameters = {
+            'country_shorts': country_shorts,
+            'release_types': settings.RELEASE_TYPES_REVIEW,
+            'rating_min': settings.RELEASE_AVERAGE_MIN,
+            'review_count_min': settings.RELEASE_REVIEW_COUNT_MIN
+        }
+        # Everything is counted by the database; each query returns one row per group instead of the nodes.
+        queries = {
+            'artists': ('MATCH (m:Member) RETURN m.origin, m.gender, count(*)', None),
+            'bands': ('MATCH (b:Band) RETURN b.country, count(*)', None),
+            'genres': ('MATCH (b:Band) UNWIND b.genres AS genre RETURN b.country, genre, count(*)', None),
+            'band_links': (f'MATCH (b:Band) {band_filter}RETURN b.country, collect(b.link)', parameters),
+            'formations': (f'MATCH (b:Band) {band_filter}WITH b WHERE b.formed IS NOT NULL '
+                           'RETURN b.country, toInteger(substring(b.formed, 0, 4)), count(*)', parameters),
+            'members': (f'MATCH (m:Member)-[:PLAYED_IN]->(b:Band) {band_filter}'
+                        'RETURN b.country, m.origin, m.gender, count(DISTINCT m)', parameters),
+            'release_counts': (f'MATCH (b:Band)-[:RECORDED]->(r:Release) {band_filter}'
+                               'WITH b, r WHERE r.release_type IN $release_types '
+                               'RETURN b.country, r.release_type, count(*)', parameters),
+            'releases': (f'MATCH (b:Band)-[:RECORDED]->(r:Release) {band_filter}'
+                         'WITH b, r WHERE r.release_type IN $release_types AND r.rating >= $rating_min '
+                         'AND r.review_count >= $review_count_min '
+                         'RETURN b.country, b.name, r.name, r.link, r.release_type, r.release_date, r.rating '
+                         'ORDER BY r.release_date, r.name', parameters)
+        }
+
+        self.logger.info('  Aggregating artists, bands, genres and releases.')
+        time_start = time.perf_counter()
+        results = run_queries_concurrently(queries)
+        self.logger.info(f'    ...done in {time.perf_counter() - time_start:.2f} s')
+
+        for name, (records, record_count, query_time) in results.items():
+            self.logger.info(f'    {name}: {record_count} rows in {query_time:.2f} s')
+
+        # Unlike the releases of an export, the rated releases are filtered by the database and all of them are part of
+        # the report anyway.
+        rows = ReportRows(**{name: [tuple(record) for record in records] for name, (records, record_count, query_time)
+                             in results.items()})
+
+        return make_database_report(rows, country_shorts, report_mode, settings.RELEASE_TYPES_REVIEW)
@@ -0,0 +1,350 @@
+"""Implements the reading part of the `GraphDatabaseStrategy` on the band snapshots of earlier crawls (see
+snapshot_store.py), so exports and reports need no database at all. Every query is a map-reduce over the countries of
+the snapshot store: a pool of processes streams the snapshots of one country each and aggregates them into a partial
+result (an ExportData, ReportRows or the lineups of the network); the partial results are merged in this process.
+Artists play in bands of several countries, so the workers also return the artists they found and everything counted
+per distinct artist of the whole store is counted after merging them.
+
+The snapshots are read-only; crawls must write into one of the other backends.
+"""
+
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import time
+
+from country_helper import COUNTRY_NAMES
+from graph.choices import MEMBER_STATUS
+from graph.metal_graph import GraphDatabaseStrategy, get_member_status_filter, make_bands_per_pop
+from graph.report import DatabaseReport, ReportMode, ReportRows, make_database_report
+from export_data import ExportData, ExportRows, make_export_data
+from global_helpers import get_dict_key
+from metal_crawler import make_formation_date, make_release_date
+from snapshot_store import SnapshotStore
+import settings
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+def read_bands(store_path, country_short):
+    """Streams the band snapshots of a country from a store opened just for this; used in the worker processes."""
+    snapshot_store = SnapshotStore(store_path)
+
+    try:
+        yield from snapshot_store.iter_bands(country_short)
+    finally:
+        snapshot_store.close(compact_ratio=None)
+
+
+def get_members(band_data) -> dict:
+    """Gets the artists of a band snapshot by emid."""
+    return {member['emid']: member for members in band_data['lineup'].values() for member in members}
+
+
+def get_stints(band_data) -> dict:
+    """Gets the member status of all artists who played in a band (i.e. have an instrument) by emid. Like in the
+        database, the last lineup category of an artist wins.
+    """
+    stints = {}
+
+    for status, members in band_data['lineup'].items():
+        for member in members:
+            if len(member['instruments']) > 0:
+                stints[member['emid']] = get_dict_key(MEMBER_STATUS, status)
+
+    return stints
+
+
+def count_artists(country_short, artists) -> list:
+    """Makes (country, origin, gender, number of distinct artists) rows of a band country."""
+    counts = Counter((member['origin'], member['gender']) for member in artists.values())
+    return [(country_short, origin, gender, count) for (origin, gender), count in counts.items()]
+
+
+def map_export(task):
+    """Aggregates the snapshots of one country for `prepare_export_data`.
+
+    :param task: A tuple of the path of the store, the ISO country short and whether the bands of the country were
+        requested (otherwise only their artists are collected).
+    :return: A tuple of all artists (origin and gender by emid) and the partial ExportData of the country (None if the
+        country was not requested).
+    """
+    store_path, country_short, is_requested = task
+    artists = {}
+    played_artists = {}
+    formations = Counter()
+    genres = Counter()
+    rows = ExportRows()
+
+    for band_data in read_bands(store_path, country_short):
+        members = get_members(band_data)
+        artists.update({emid: (member['origin'], member['gender']) for emid, member in members.items()})
+
+        if not is_requested:
+            continue
+
+        played_artists.update({emid: members[emid] for emid in get_stints(band_data)})
+        formed = make_formation_date(band_data['formed'])
+        formations[formed.isoformat() if formed is not None else None] += 1
+        genres[tuple(band_data['genres'])] += 1
+
+        for release in band_data['releases'].values():
+            rows.releases.append((country_short, band_data['name'], release['name'], release['rating'],
+                                  release['review_count'], release['link'], release['release_type'],
+                                  make_release_date(release['release_date']).isoformat()))
+
+    if not is_requested:
+        return artists, None
+
+    rows.bands = [(country_short, sum(genres.values()))] if len(genres) > 0 else []
+    rows.formations = [(country_short, formed, count) for formed, count in formations.items()]
+    rows.genres = [(country_short, list(band_genres), count) for band_genres, count in genres.items()]
+    rows.genders_country = count_artists(country_short, played_artists)
+
+    return artists, make_export_data(rows)
+
+
+def map_report(task):
+    """Aggregates the snapshots of one country for `generate_report_interface`.
+
+    :param task: A tuple of the path of the store, the ISO country short, whether the country was requested
+        (otherwise only its artists, bands and genres are counted) and the release types of the report.
+    :return: A tuple of all artists (origin and gender by emid) and the ReportRows of the country.
+    """
+    store_path, country_short, is_requested, release_types = task
+    artists = {}
+    played_artists = {}
+    band_links = []
+    genres = Counter()
+    formations = Counter()
+    release_counts = Counter()
+    band_count = 0
+    rows = ReportRows()
+
+    for band_data in read_bands(store_path, country_short):
+        members = get_members(band_data)
+        artists.update({emid: (member['origin'], member['gender']) for emid, member in members.items()})
+        band_count += 1
+        genres.update(band_data['genres'])
+
+        if not is_requested:
+            continue
+
+        band_links.append(band_data['link'])
+        played_artists.update({emid: members[emid] for emid in get_stints(band_data)})
+        formed = make_formation_date(band_data['formed'])
+
+        if formed is not None:
+            formations[formed.year] += 1
+
+        for release in band_data['releases'].values():
+            if release['release_type'] not in release_types:
+                continue
+
+            release_counts[release['release_type']] += 1
+
+            if release['rating'] >= settings.RELEASE_AVERAGE_MIN and \
+                    release['review_count'] >= settings.RELEASE_REVIEW_COUNT_MIN:
+                rows.releases.append((country_short, band_data['name'], release['name'], release['link'],
+                                      release['release_type'],
+                                      make_release_date(release['release_date']).isoformat(), release['rating']))
+
+    rows.bands = [(country_short, band_count)] if band_count > 0 else []
+    rows.genres = [(country_short, genre, count) for genre, count in genres.items()]
+
+    if is_requested and band_count > 0:
+        rows.band_links = [(country_short, band_links)]
+        rows.formations = [(country_short, year, count) for year, count in formations.items()]
+        rows.members = count_artists(country_short, played_artists)
+        rows.release_counts = [(country_short, release_type, count) for release_type, count in release_counts.items()]
+
+    return artists, rows
+
+
+def map_network(task):
+    """Collects the bands of one country with the artists connecting them for `export_bands_network_interface`.
+
+    :param task: A tuple of the path of the store, the ISO country short and the member statuses which connect bands.
+    :return: A list of tuples of band emid, band name and the emids of the connecting artists.
+    """
+    store_path, country_short, statuses = task
+    bands = []
+
+    for band_data in read_bands(store_path, country_short):
+        stints = get_stints(band_data)
+        bands.append((band_data['emid'], band_data['name'],
+                      [emid for emid, status in stints.items() if status in statuses]))
+
+    return bands
+
+
+def map_links(task):
+    """Collects the visit dates of the bands and artists of one country for `get_all_links_interface`."""
+    store_path, country_short = task
+    links = {'bands': {}, 'artists': {}}
+
+    for band_data in read_bands(store_path, country_short):
+        links['bands'][band_data['link']] = band_data['visited']
+
+        for member in get_members(band_data).values():
+            links['artists'][member['link']] = member['visited']
+
+    return links
+
+
+class SnapshotStrategy(GraphDatabaseStrategy):
+
+    def __init__(self, path=settings.SNAPSHOT_PATH, workers=settings.SNAPSHOT_EXPORT_WORKERS):
+        """Opens the snapshot store.
+
+        :param path: The directory of the snapshot store.
+        :param workers: Number of processes aggregating the countries; None uses one per CPU and 1 aggregates
+            everything in this process.
+        """
+        self.logger = logging.getLogger('Snapshots')
+        self.path = str(path)
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.snapshot_store = SnapshotStore(self.path)
+
+    def close(self):
+        self.snapshot_store.close(compact_ratio=None)
+
+    def _get_countries(self) -> list:
+        """Gets all countries of the store with the biggest first; they take longest and are started first."""
+        countries = self.snapshot_store.get_countries()
+        return sorted(countries, key=lambda country: -self.snapshot_store.get_band_count(country))
+
+    def _map(self, function, tasks) -> list:
+        """Runs `function` on all tasks in the process pool and returns the results in the order of the tasks."""
+        time_start = time.perf_counter()
+
+        if self.workers == 1 or len(tasks) <= 1:
+            results = [function(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                results = list(executor.map(function, tasks))
+
+        self.logger.info(f'{function.__name__} of {len(tasks)} countries took {time.perf_counter() - time_start:.2f} s.')
+        return results
+
+    def _read_only(self, *args, **kwargs):
+        raise NotImplementedError('The snapshots are read-only; crawl into another database.')
+
+    add_band_interface = _read_only
+    add_label_interface = _read_only
+    add_release_interface = _read_only
+    add_member_interface = _read_only
+    band_recorded_release_interface = _read_only
+    member_played_in_band_interface = _read_only
+    label_issued_release_interface = _read_only
+    write_in_transaction_interface = _read_only
+    add_bands_interface = _read_only
+    add_releases_interface = _read_only
+    add_members_interface = _read_only
+    bands_recorded_releases_interface = _read_only
+    members_played_in_bands_interface = _read_only
+
+    def get_all_links_interface(self) -> dict:
+        all_links = {'bands': {}, 'artists': {}}
+
+        for links in self._map(map_links, [(self.path, country) for country in self._get_countries()]):
+            all_links['bands'].update(links['bands'])
+            all_links['artists'].update(links['artists'])
+
+        return all_links
+
+    def export_bands_network_interface(self, country_shorts):
+        self.logger.info('Starting export of band network...')
+        # Relations to bands of other countries are kept, so the lineups of all countries are needed.
+        tasks = [(self.path, country, get_member_status_filter()) for country in self._get_countries()]
+        band_countries = {}
+        band_names = {}
+        band_artists = {}
+        artist_bands = defaultdict(set)
+
+        for country, bands in zip([task[1] for task in tasks], self._map(map_network, tasks)):
+            for emid, name, artists in bands:
+                band_countries[emid] = country
+                band_names[emid] = name
+                band_artists[emid] = artists
+
+                for artist in artists:
+                    artist_bands[artist].add(emid)
+
+        band_relationships = {}
+
+        for emid in sorted(band_countries.keys()):
+            if country_shorts and band_countries[emid] not in country_shorts:
+                continue
+
+            relations = set().union(*[artist_bands[artist] for artist in band_artists[emid]])
+            relations.discard(emid)
+            band_relationships[emid] = {
+                'name': band_names[emid],
+                'country': COUNTRY_NAMES[band_countries[emid]],
+                'relations': sorted(relations)
+            }
+
+        return band_relationships
+
+    def calc_bands_per_pop_interface(self, country_short, bands) -> dict:
+        """Calculates the number of bands per 100k people for a given country and puts the data into a dict.
+
+        :param country_short: The country's ISO code.
+        :param bands: A list of band emids used as basis for the calculation for the given country.
+        :return: A dictionary with the calculated data; empty if there are no bands or the population is smaller than
+            one.
+        """
+        band_ids = set(bands)
+        artists = {}
+        genres = Counter()
+
+        for band_data in read_bands(self.path, country_short):
+            if band_data['emid'] in band_ids:
+                members = get_members(band_data)
+                artists.update({emid: members[emid]['gender'] for emid in get_stints(band_data)})
+                genres.update(band_data['genres'])
+
+        return make_bands_per_pop(country_short, len(band_ids), dict(Counter(artists.values())), dict(genres))
+
+    def prepare_export_data(self, country_shorts: list, report_mode: ReportMode) -> ExportData:
+        self.logger.info('Preparing data export.')
+        tasks = [(self.path, country, not country_shorts or country in country_shorts)
+                 for country in self._get_countries()]
+        artists = {}
+        export_data = ExportData()
+
+        for country_artists, country_data in self._map(map_export, tasks):
+            artists.update(country_artists)
+
+            if country_data is not None:
+                export_data.merge(country_data)
+
+        rows = ExportRows()
+        rows.origins = list(Counter(origin for origin, gender in artists.values()).items())
+        rows.genders = [key + (count,) for key, count in Counter(
+            artist for artist in artists.values() if not country_shorts or artist[0] in country_shorts).items()]
+
+        return export_data.merge(make_export_data(rows))
+
+    def generate_report_interface(self, country_shorts, report_mode) -> DatabaseReport:
+        country_shorts = country_shorts or []
+        release_types = settings.RELEASE_TYPES_REVIEW
+        tasks = [(self.path, country, not country_shorts or country in country_shorts, release_types)
+                 for country in self._get_countries()]
+        artists = {}
+        rows = ReportRows()
+
+        for country_artists, country_rows in self._map(map_report, tasks):
+            artists.update(country_artists)
+
+            for name in ['bands', 'genres', 'band_links', 'formations', 'members', 'release_counts', 'releases']:
+                getattr(rows, name).extend(getattr(country_rows, name))
+
+        rows.artists = [key + (count,) for key, count in Counter(artists.values()).items()]
+        rows.releases.sort(key=lambda release: (release[5], release[2]))
+
+        return make_database_report(rows, country_shorts, report_mode, release_types)
@@ -0,0 +1,392 @@
+"""Implements the `GraphDatabaseStrategy` on an embedded SQLite database. Nodes are tables with the properties of the
+neomodel models as columns and relationships are tables of ID pairs; list properties (genres, dates of activity, time
+frames) are stored as JSON arrays and dates as ISO strings like neomodel does. No server is needed; the whole database
+is one file.
+"""
+
+from collections import defaultdict
+from datetime import date
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import progressbar
+
+from country_helper import COUNTRY_NAMES
+from graph.metal_graph import GraphDatabaseStrategy, NODE_PROPERTIES, get_member_status_filter, make_bands_per_pop
+from graph.report import DatabaseReport, ReportMode, ReportRows, make_database_report
+from export_data import ExportData, ExportRows, make_export_data
+import settings
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+# Every node type of NODE_PROPERTIES has a table of the same name with the properties as columns.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bands (
+    emid INTEGER PRIMARY KEY,
+    link TEXT,
+    visited TEXT,
+    name TEXT,
+    country TEXT,
+    locations TEXT,
+    status TEXT,
+    formed TEXT,
+    active TEXT,
+    themes TEXT,
+    genres TEXT
+);
+CREATE INDEX IF NOT EXISTS bands_country ON bands (country);
+CREATE INDEX IF NOT EXISTS bands_link ON bands (link);
+CREATE TABLE IF NOT EXISTS labels (
+    emid INTEGER PRIMARY KEY,
+    name TEXT,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS releases (
+    emid INTEGER PRIMARY KEY,
+    name TEXT,
+    link TEXT,
+    release_type TEXT,
+    rating INTEGER,
+    review_count INTEGER,
+    release_date TEXT
+);
+CREATE TABLE IF NOT EXISTS members (
+    emid INTEGER PRIMARY KEY,
+    link TEXT,
+    visited TEXT,
+    name TEXT,
+    age INTEGER,
+    origin TEXT,
+    gender TEXT
+);
+CREATE INDEX IF NOT EXISTS members_link ON members (link);
+CREATE INDEX IF NOT EXISTS members_origin ON members (origin, gender);
+CREATE TABLE IF NOT EXISTS recorded (
+    band_id INTEGER NOT NULL REFERENCES bands (emid),
+    release_id INTEGER NOT NULL REFERENCES releases (emid),
+    PRIMARY KEY (band_id, release_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS recorded_release ON recorded (release_id);
+CREATE TABLE IF NOT EXISTS played_in (
+    member_id INTEGER NOT NULL REFERENCES members (emid),
+    band_id INTEGER NOT NULL REFERENCES bands (emid),
+    instrument TEXT,
+    pseudonym TEXT,
+    time_frame TEXT,
+    status TEXT,
+    PRIMARY KEY (member_id, band_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS played_in_band ON played_in (band_id, member_id);
+CREATE TABLE IF NOT EXISTS issued (
+    label_id INTEGER NOT NULL REFERENCES labels (emid),
+    release_id INTEGER NOT NULL REFERENCES releases (emid),
+    PRIMARY KEY (label_id, release_id)
+) WITHOUT ROWID;
+"""
+
+# Country filters take the list of countries as one JSON parameter, so every query has a single fixed text.
+BAND_FILTER = 'AND b.country IN (SELECT value FROM json_each(:country_shorts)) '
+MEMBER_FILTER = 'AND m.origin IN (SELECT value FROM json_each(:country_shorts)) '
+
+
+def deflate(value):
+    """Converts a property into a value SQLite can store.
+
+    :param value: A property of a written dictionary.
+    :return: Dates as ISO strings, lists as JSON arrays (with dates as ISO strings) and everything else unchanged.
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        return json.dumps(value, default=deflate)
+
+    return value
+
+
+def load_list(value) -> list:
+    """Converts a stored JSON array back into a list; NULL becomes an empty list."""
+    return [] if value is None else json.loads(value)
+
+
+class SqliteStrategy(GraphDatabaseStrategy):
+    """The crawler writes from a single thread and the reports read from the main thread; all access goes through one
+        connection guarded by a lock.
+    """
+
+    def __init__(self, path=settings.SQLITE_DATABASE_PATH):
+        """Opens (or creates) the database.
+
+        :param path: The path of the SQLite database. Use ':memory:' for a temporary one.
+        """
+        self.logger = logging.getLogger('SQLite')
+        self._lock = threading.RLock()
+        self._is_in_transaction = False
+        self._connection = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        self.logger.info(f'SQLite database {path} is ready.')
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, query, parameters=None) -> list:
+        with self._lock:
+            return self._connection.execute(query, {} if parameters is None else parameters).fetchall()
+
+    def _write(self, write):
+        """Runs `write` with the connection; outside `write_in_transaction_interface` in a transaction of its own."""
+        with self._lock:
+            if self._is_in_transaction:
+                return write(self._connection)
+
+            with self._connection:
+                self._connection.execute('BEGIN')
+                return write(self._connection)
+
+    def write_in_transaction_interface(self, write):
+        """Runs all writes of `write` in one transaction; either all of them are committed or none.
+
+        :param write: A function without parameters which calls the write methods.
+        :return: The result of `write`.
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            self._is_in_transaction = True
+
+            try:
+                result = write()
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            else:
+                self._connection.execute('COMMIT')
+            finally:
+                self._is_in_transaction = False
+
+            return result
+
+    def _upsert_nodes(self, table, node_dicts):
+        """Creates or updates the rows of one node table with a single statement, like `create_or_update` does for
+            each node.
+
+        :param table: The name of the node table (see NODE_PROPERTIES).
+        :param node_dicts: A list of dictionaries with the properties of each node (including the unique emid).
+        """
+        if len(node_dicts) == 0:
+            return
+
+        columns = NODE_PROPERTIES[table]
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+        query = (f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+                 f'ON CONFLICT (emid) DO UPDATE SET {updates}')
+        rows = [[deflate(node_dict.get(column)) for column in columns] for node_dict in node_dicts]
+        self._write(lambda connection: connection.executemany(query, rows))
+
+    def add_band_interface(self, band_dict):
+        self._upsert_nodes('bands', [band_dict])
+
+    def add_label_interface(self, label_dict):
+        self._upsert_nodes('labels', [label_dict])
+
+    def add_release_interface(self, release_dict):
+        self._upsert_nodes('releases', [release_dict])
+
+    def add_member_interface(self, member_dict):
+        self._upsert_nodes('members', [member_dict])
+
+    def band_recorded_release_interface(self, band_id, release_id):
+        self.bands_recorded_releases_interface([(band_id, release_id)])
+
+    def member_played_in_band_interface(self, member_id, band_id, instrument, pseudonym, time_frame, status):
+        self.members_played_in_bands_interface([{
+            'member_id': member_id, 'band_id': band_id, 'instrument': instrument, 'pseudonym': pseudonym,
+            'time_frame': time_frame, 'status': status
+        }])
+
+    def label_issued_release_interface(self, label_id, release_id):
+        query = ('INSERT OR IGNORE INTO issued (label_id, release_id) '
+                 'SELECT ?, ? WHERE EXISTS (SELECT 1 FROM labels WHERE emid = ?) '
+                 'AND EXISTS (SELECT 1 FROM releases WHERE emid = ?)')
+        self._write(lambda connection: connection.execute(query, (label_id, release_id, label_id, release_id)))
+
+    def add_bands_interface(self, band_dicts):
+        self._upsert_nodes('bands', band_dicts)
+
+    def add_releases_interface(self, release_dicts):
+        self._upsert_nodes('releases', release_dicts)
+
+    def add_members_interface(self, member_dicts):
+        self._upsert_nodes('members', member_dicts)
+
+    def bands_recorded_releases_interface(self, recordings):
+        if len(recordings) == 0:
+            return
+
+        # Like the MATCH of the neomodel implementation: Nothing is connected if one of the two does not exist.
+        query = ('INSERT OR IGNORE INTO recorded (band_id, release_id) '
+                 'SELECT ?1, ?2 WHERE EXISTS (SELECT 1 FROM bands WHERE emid = ?1) '
+                 'AND EXISTS (SELECT 1 FROM releases WHERE emid = ?2)')
+        self._write(lambda connection: connection.executemany(query, [tuple(recording) for recording in recordings]))
+
+    def members_played_in_bands_interface(self, stints):
+        if len(stints) == 0:
+            return
+
+        # A member has exactly one relationship to a band; the last stint wins.
+        query = ('INSERT OR REPLACE INTO played_in (member_id, band_id, instrument, pseudonym, time_frame, status) '
+                 'SELECT ?1, ?2, ?3, ?4, ?5, ?6 WHERE EXISTS (SELECT 1 FROM members WHERE emid = ?1) '
+                 'AND EXISTS (SELECT 1 FROM bands WHERE emid = ?2)')
+        rows = [(stint['member_id'], stint['band_id'], stint['instrument'], stint['pseudonym'],
+                 deflate(stint['time_frame']), stint['status']) for stint in stints]
+        self._write(lambda connection: connection.executemany(query, rows))
+
+    def get_all_links_interface(self) -> dict:
+        all_links = {'bands': {}, 'artists': {}}
+
+        self.logger.info('  Fetching known bands from database..')
+        all_links['bands'] = dict(self._query('SELECT link, visited FROM bands'))
+        self.logger.info(f'    ...found {len(all_links["bands"])}')
+
+        self.logger.info('  Fetching known artists from database.')
+        all_links['artists'] = dict(self._query('SELECT link, visited FROM members'))
+        self.logger.info(f'    ...found {len(all_links["artists"])}')
+
+        return all_links
+
+    @staticmethod
+    def _make_parameters(country_shorts) -> dict:
+        return {
+            'country_shorts': json.dumps(country_shorts or []),
+            'statuses': json.dumps(get_member_status_filter()),
+            'release_types': json.dumps(settings.RELEASE_TYPES_REVIEW),
+            'rating_min': settings.RELEASE_AVERAGE_MIN,
+            'review_count_min': settings.RELEASE_REVIEW_COUNT_MIN
+        }
+
+    def export_bands_network_interface(self, country_shorts):
+        band_filter = BAND_FILTER if country_shorts else ''
+        parameters = self._make_parameters(country_shorts)
+        bands = self._query(f'SELECT b.emid, b.name, b.country FROM bands b WHERE 1 {band_filter}ORDER BY b.emid',
+                            parameters)
+        # The band-member-band projection; only stints with a status of the filter connect bands.
+        connections = self._query(
+            'SELECT DISTINCT stint.band_id, outer_stint.band_id FROM bands b '
+            'JOIN played_in stint ON stint.band_id = b.emid '
+            'JOIN played_in outer_stint ON outer_stint.member_id = stint.member_id '
+            f'AND outer_stint.band_id != stint.band_id WHERE 1 {band_filter}'
+            'AND stint.status IN (SELECT value FROM json_each(:statuses)) '
+            'AND outer_stint.status IN (SELECT value FROM json_each(:statuses))', parameters)
+
+        self.logger.info('Starting export of band network...')
+        relations = defaultdict(set)
+
+        for band_id, outer_band_id in connections:
+            relations[band_id].add(outer_band_id)
+
+        progress_bar = progressbar.ProgressBar(max_value=len(bands))
+        band_relationships = {}
+
+        for emid, name, country in bands:
+            band_relationships[emid] = {
+                'name': name,
+                'country': COUNTRY_NAMES[country],
+                'relations': sorted(relations[emid])
+            }
+            progress_bar.update(len(band_relationships))
+
+        progress_bar.finish()
+        print()
+        return band_relationships
+
+    def calc_bands_per_pop_interface(self, country_short, bands) -> dict:
+        """Calculates the number of bands per 100k people for a given country and puts the data into a dict.
+
+        :param country_short: The country's ISO code.
+        :param bands: A list of band emids used as basis for the calculation for the given country.
+        :return: A dictionary with the calculated data; empty if there are no bands or the population is smaller than
+            one.
+        """
+        parameters = {'emids': json.dumps(list(bands))}
+        band_ids = '(SELECT value FROM json_each(:emids))'
+        genders = dict(self._query(f'SELECT m.gender, count(DISTINCT m.emid) FROM played_in p '
+                                   f'JOIN members m ON m.emid = p.member_id WHERE p.band_id IN {band_ids} '
+                                   'GROUP BY m.gender', parameters))
+        genres = dict(self._query(f'SELECT genre.value, count(*) FROM bands b, json_each(b.genres) genre '
+                                  f'WHERE b.emid IN {band_ids} GROUP BY genre.value', parameters))
+
+        return make_bands_per_pop(country_short, len(bands), genders, genres)
+
+    def prepare_export_data(self, country_shorts: list, report_mode: ReportMode) -> ExportData:
+        self.logger.info('Preparing data export:')
+        band_filter = BAND_FILTER if country_shorts else ''
+        member_filter = MEMBER_FILTER if country_shorts else ''
+        parameters = self._make_parameters(country_shorts)
+        queries = {
+            'origins': 'SELECT m.origin, count(*) FROM members m GROUP BY m.origin',
+            'genders': f'SELECT m.origin, m.gender, count(*) FROM members m WHERE 1 {member_filter}'
+                       'GROUP BY m.origin, m.gender',
+            'genders_country': 'SELECT b.country, m.origin, m.gender, count(DISTINCT m.emid) FROM played_in p '
+                               'JOIN members m ON m.emid = p.member_id JOIN bands b ON b.emid = p.band_id '
+                               f'WHERE 1 {band_filter}GROUP BY b.country, m.origin, m.gender',
+            'bands': f'SELECT b.country, count(*) FROM bands b WHERE 1 {band_filter}GROUP BY b.country',
+            'formations': f'SELECT b.country, b.formed, count(*) FROM bands b WHERE 1 {band_filter}'
+                          'GROUP BY b.country, b.formed',
+            'genres': f'SELECT b.country, b.genres, count(*) FROM bands b WHERE 1 {band_filter}'
+                      'GROUP BY b.country, b.genres',
+            'releases': 'SELECT b.country, b.name, r.name, r.rating, r.review_count, r.link, r.release_type, '
+                        'r.release_date FROM recorded JOIN bands b ON b.emid = recorded.band_id '
+                        f'JOIN releases r ON r.emid = recorded.release_id WHERE 1 {band_filter}'
+        }
+        results = {}
+
+        for name, query in queries.items():
+            time_start = time.perf_counter()
+            results[name] = self._query(query, parameters)
+            self.logger.info(f' ┃  {name}: {len(results[name])} rows in {time.perf_counter() - time_start:.2f} s')
+
+        results['genres'] = [(country, load_list(genres), count) for country, genres, count in results['genres']]
+        prepped_data = make_export_data(ExportRows(**results))
+        self.logger.info(' ┗ Data prepped.')
+
+        return prepped_data
+
+    def generate_report_interface(self, country_shorts, report_mode) -> DatabaseReport:
+        country_shorts = country_shorts or []
+        band_filter = BAND_FILTER if country_shorts else ''
+        parameters = self._make_parameters(country_shorts)
+        release_filter = 'AND r.release_type IN (SELECT value FROM json_each(:release_types)) '
+        queries = {
+            'artists': 'SELECT m.origin, m.gender, count(*) FROM members m GROUP BY m.origin, m.gender',
+            'bands': 'SELECT b.country, count(*) FROM bands b GROUP BY b.country',
+            'genres': 'SELECT b.country, genre.value, count(*) FROM bands b, json_each(b.genres) genre '
+                      'GROUP BY b.country, genre.value',
+            'band_links': f'SELECT b.country, json_group_array(b.link) FROM bands b WHERE 1 {band_filter}'
+                          'GROUP BY b.country',
+            'formations': 'SELECT b.country, CAST(substr(b.formed, 1, 4) AS INTEGER), count(*) FROM bands b '
+                          f'WHERE b.formed IS NOT NULL {band_filter}GROUP BY 1, 2',
+            'members': 'SELECT b.country, m.origin, m.gender, count(DISTINCT m.emid) FROM played_in p '
+                       'JOIN members m ON m.emid = p.member_id JOIN bands b ON b.emid = p.band_id '
+                       f'WHERE 1 {band_filter}GROUP BY b.country, m.origin, m.gender',
+            'release_counts': 'SELECT b.country, r.release_type, count(*) FROM recorded '
+                              'JOIN bands b ON b.emid = recorded.band_id '
+                              f'JOIN releases r ON r.emid = recorded.release_id WHERE 1 {band_filter}{release_filter}'
+                              'GROUP BY b.country, r.release_type',
+            'releases': 'SELECT b.country, b.name, r.name, r.link, r.release_type, r.release_date, r.rating '
+                        'FROM recorded JOIN bands b ON b.emid = recorded.band_id '
+                        f'JOIN releases r ON r.emid = recorded.release_id WHERE 1 {band_filter}{release_filter}'
+                        'AND r.rating >= :rating_min AND r.review_count >= :review_count_min '
+                        'ORDER BY r.release_date, r.name'
+        }
+
+        self.logger.info('  Aggregating artists, bands, genres and releases.')
+        results = {name: self._query(query, parameters) for name, query in queries.items()}
+        results['band_links'] = [(country, json.loads(links)) for country, links in results['band_links']]
+
+        return make_database_report(ReportRows(**results), country_shorts, report_mode, settings.RELEASE_TYPES_REVIEW)
@@ -4,6 +4,9 @@
 
 from abc import ABCMeta, abstractmethod
 
+import settings
+from country_helper import COUNTRY_NAMES, COUNTRY_POPULATION
+from graph.choices import GENDER, MEMBER_STATUS
 from graph.report import DatabaseReport, ReportMode
 from export_data import ExportData
 
@@ -16,6 +19,56 @@ POP_POPULATION = 'Population'
 POP_BANDS = 'Bands'
 RAW_GENRES = 'Genres'
 POP_COUNTRY = 'Country'
+# The properties of each node type (the models of the neomodel implementation). Keys of the written dictionaries which
+# are not listed are ignored.
+NODE_PROPERTIES = {
+    'bands': ['emid', 'link', 'visited', 'name', 'country', 'locations', 'status', 'formed', 'active', 'themes',
+              'genres'],
+    'labels': ['emid', 'name', 'status'],
+    'releases': ['emid', 'name', 'link', 'release_type', 'rating', 'review_count', 'release_date'],
+    'members': ['emid', 'link', 'visited', 'name', 'age', 'origin', 'gender']
+}
+
+
+def get_member_status_filter() -> list:
+    """Gets the member statuses which connect artists and bands in network exports.
+
+    :return: A list of MEMBER_STATUS keys. If IS_LIVE_MEMBER_IN_BAND is False all entries containing 'Live' are
+        filtered.
+    """
+    return [key for key, value in MEMBER_STATUS.items() if settings.IS_LIVE_MEMBER_IN_BAND or 'Live' not in value]
+
+
+def make_bands_per_pop(country_short, band_count, genders: dict, genres: dict) -> dict:
+    """Puts the aggregated data of `calc_bands_per_pop_interface` into its dict.
+
+    :param country_short: The country's ISO code.
+    :param band_count: The number of bands of the country.
+    :param genders: A dictionary with the genders and the number of distinct artists of that gender in the bands.
+    :param genres: A dictionary with the genres and the number of bands playing it.
+    :return: A dictionary with the calculated data; empty if there are no bands or the population is smaller than one.
+    """
+    result = {}
+    population = COUNTRY_POPULATION[country_short]
+
+    if band_count == 0 or int(population) <= 1:
+        return result
+
+    result[POP_COUNTRY] = COUNTRY_NAMES[country_short]
+    result[POP_BANDS] = str(band_count)
+    result[POP_POPULATION] = population
+    result[POP_PER_100K] = f'{band_count / (int(population) / 100000):.2f}'
+    member_count = sum(genders.values())
+    result['Artists'] = member_count
+
+    for key in GENDER:
+        value = genders.get(key, 0)
+        percentage = (value / member_count) * 100 if member_count > 0 else 0.0
+        result[f'  {GENDER[key]}'] = f'{value} ({percentage:.2f}%).'
+
+    result[RAW_GENRES] = genres
+
+    return result
 
 
 class GraphDatabaseStrategy(metaclass=ABCMeta):
@@ -48,6 +101,30 @@ class GraphDatabaseStrategy(metaclass=ABCMeta):
     def label_issued_release_interface(self, label_id, release_id):
         pass
 
+    @abstractmethod
+    def write_in_transaction_interface(self, write):
+        pass
+
+    @abstractmethod
+    def add_bands_interface(self, band_dicts):
+        pass
+
+    @abstractmethod
+    def add_releases_interface(self, release_dicts):
+        pass
+
+    @abstractmethod
+    def add_members_interface(self, member_dicts):
+        pass
+
+    @abstractmethod
+    def bands_recorded_releases_interface(self, recordings):
+        pass
+
+    @abstractmethod
+    def members_played_in_bands_interface(self, stints):
+        pass
+
     @abstractmethod
     def get_all_links_interface(self) -> dict:
         pass
@@ -58,6 +135,12 @@ class GraphDatabaseStrategy(metaclass=ABCMeta):
 
     @abstractmethod
     def calc_bands_per_pop_interface(self, country_short, bands) -> dict:
+        """Calculates the number of bands per 100k people for a given country and puts the data into a dict.
+
+        :param country_short: The country's ISO code.
+        :param bands: A list of band emids used as basis for the calculation for the given country.
+        :return: A dictionary built by `make_bands_per_pop`.
+        """
         pass
 
     @abstractmethod
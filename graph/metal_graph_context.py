@@ -1,19 +1,39 @@
 import logging
 
-from graph.graph_neomodel_impl import NeoModelStrategy
 from graph.report import DatabaseReport, ReportMode
 from export_data import ExportData
+from settings import DATABASE_BACKEND
 
 __author__ = 'Martin Woelke'
 __license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
 __copyright__ = 'Copyright 2019-2023, Martin Woelke'
 
 
-def init_db():
+DATABASE_BACKENDS = ['neo4j', 'sqlite', 'memory', 'snapshots']
+
+
+def init_db(backend=DATABASE_BACKEND):
+    """Creates the database handle of the chosen backend.
+
+    :param backend: One of DATABASE_BACKENDS.
+    :return: A GraphDatabaseContext or None if the database is not available.
+    """
     logger = logging.getLogger('Mapper')
     db_handle = None
     try:
-        db_handle = GraphDatabaseContext(NeoModelStrategy())
+        # Strategies are imported late; the neomodel one configures neomodel on import.
+        if backend == 'sqlite':
+            from graph.graph_sqlite_impl import SqliteStrategy
+            db_handle = GraphDatabaseContext(SqliteStrategy())
+        elif backend == 'memory':
+            from graph.graph_memory_impl import MemoryStrategy
+            db_handle = GraphDatabaseContext(MemoryStrategy())
+        elif backend == 'snapshots':
+            from graph.graph_snapshot_impl import SnapshotStrategy
+            db_handle = GraphDatabaseContext(SnapshotStrategy())
+        else:
+            from graph.graph_neomodel_impl import NeoModelStrategy
+            db_handle = GraphDatabaseContext(NeoModelStrategy())
     except:
         logger.error('  Need a database to function properly. Exiting...')
 
@@ -48,6 +68,31 @@ class GraphDatabaseContext:
     def label_issued_release(self, label_id, release_id):
         self._strategy.label_issued_release_interface(label_id, release_id)
 
+    def write_in_transaction(self, write):
+        # write: A function without parameters calling the write methods. All its writes are committed together.
+        return self._strategy.write_in_transaction_interface(write)
+
+    # The bulk methods below write a whole list with a constant number of round-trips. Lists may contain the entities
+    # of several bands.
+
+    def add_bands(self, band_dicts):
+        self._strategy.add_bands_interface(band_dicts)
+
+    def add_releases(self, release_dicts):
+        self._strategy.add_releases_interface(release_dicts)
+
+    def add_members(self, member_dicts):
+        self._strategy.add_members_interface(member_dicts)
+
+    def bands_recorded_releases(self, recordings):
+        # recordings: Pairs of band and release emid.
+        self._strategy.bands_recorded_releases_interface(recordings)
+
+    def members_played_in_bands(self, stints):
+        # stints: Dictionaries with the keys member_id, band_id, instrument, pseudonym, time_frame and status (see
+        # member_played_in_band). Only the last stint of a member in a band is kept.
+        self._strategy.members_played_in_bands_interface(stints)
+
     def get_all_links(self) -> dict:
         """Prepares a dictionary that contains all previously visited short links of all bands and artists. Two keys are
             used: 'bands' and 'artists'. For ~10k bands and ~40k artists this takes ~7s. Using the lookup table is  much
@@ -2,6 +2,7 @@
 these classes to successfully export data."""
 
 from collections import defaultdict, OrderedDict
+from dataclasses import dataclass, field
 import json
 from enum import Enum
 from pathlib import Path
@@ -10,7 +11,7 @@ import logging
 from genre import GENRE_CORE_MA
 from global_helpers import get_export_path, get_time_stamp, FOLDER_LINKS, LINK_EXTENSION, FOLDER_LINKS_INVALID,\
     FOLDER_LINKS_MISSING
-from country_helper import COUNTRY_NAMES
+from country_helper import COUNTRY_NAMES, COUNTRY_POPULATION
 from graph.choices import GENDER, RELEASE_TYPES
 from settings import RELEASE_AVERAGE_MIN, RELEASE_REVIEW_COUNT_MIN, TOP
 
@@ -497,26 +498,41 @@ class ReleaseReport:
             return
 
         # Collect release counts per type (and total).
-        self.country_releases[country_name][release_type] += 1
-        self.releases_total[release_type] += 1
+        self.add_release_count(country_name, release_type)
 
         # Collect releases in a tuple. We filter by the minimum values for average percentage_bands and review count from the
         # settings file.
         if ratings >= RELEASE_AVERAGE_MIN and review_count >= RELEASE_REVIEW_COUNT_MIN:
-            # Instantiate release types in the order we like (so that the JSON export is consistent).
-            if str(year)[0:4] not in self.releases_per_year:
-                for temp_type in self.workable_types:
-                    self.releases_per_year[str(year)[0:4]][temp_type] = []
-            self.releases_per_year[str(year)[0:4]][release_type].append((release_name, band_name, ratings, link))
-            self.all_releases[release_type].append(
-                {
-                    "release_name": release_name,
-                    "country_name": country_name,
-                    "link": link,
-                    "ratings": ratings,
-                    "band_name": band_name
-                }
-            )
+            self.add_rated_release(country_name, band_name, release_name, link, release_type, year, ratings)
+
+    def add_release_count(self, country_name, release_type, count=1):
+        """Counts releases of a workable type without looking at their ratings.
+
+        :param country_name: The name of the country of the band.
+        :param release_type: A release type of `workable_types`.
+        :param count: The number of releases.
+        """
+        self.country_releases[country_name][release_type] += count
+        self.releases_total[release_type] += count
+
+    def add_rated_release(self, country_name, band_name, release_name, link, release_type, year, ratings):
+        """Adds a release which passed the minimum rating and review count to the per-year and overall lists. It's not
+            counted; see `add_release_count`.
+        """
+        # Instantiate release types in the order we like (so that the JSON export is consistent).
+        if str(year)[0:4] not in self.releases_per_year:
+            for temp_type in self.workable_types:
+                self.releases_per_year[str(year)[0:4]][temp_type] = []
+        self.releases_per_year[str(year)[0:4]][release_type].append((release_name, band_name, ratings, link))
+        self.all_releases[release_type].append(
+            {
+                "release_name": release_name,
+                "country_name": country_name,
+                "link": link,
+                "ratings": ratings,
+                "band_name": band_name
+            }
+        )
 
     @staticmethod
     def get_release_tuple_string(release_tuple):
@@ -682,3 +698,131 @@ class ReleaseReport:
                 report += f'    {self.get_release_tuple_string(sorted_releases[i])}\n'
 
         return report
+
+
+@dataclass
+class ReportRows:
+    """The aggregated rows a database strategy delivers for a DatabaseReport. Every count is done by the database;
+        `make_database_report` only sums them up. Rows are tuples in the given order of values.
+    """
+    # (origin, gender, number of artists) of all artists.
+    artists: list = field(default_factory=list)
+    # (country, number of bands) of all bands.
+    bands: list = field(default_factory=list)
+    # (country, genre, number of bands) of all bands.
+    genres: list = field(default_factory=list)
+    # (country, list of short band links) of the requested countries.
+    band_links: list = field(default_factory=list)
+    # (country, year, number of bands formed) of the requested countries.
+    formations: list = field(default_factory=list)
+    # (band country, artist origin, gender, number of distinct artists) of the requested countries.
+    members: list = field(default_factory=list)
+    # (country, release type key, number of releases) of the requested countries and the reviewed release types.
+    release_counts: list = field(default_factory=list)
+    # (country, band name, release name, link, release type key, release date, rating) of the requested countries, the
+    # reviewed release types and above the minimum rating and review count.
+    releases: list = field(default_factory=list)
+
+
+def make_country_report(country_short, band_links, genders, gender_per_country, genres, bands_per_year):
+    """Generates a CountryReport from aggregated data.
+
+    :param country_short: An ISO country short string.
+    :param band_links: A list of short links of all bands of the country.
+    :param genders: A dictionary with genders and the number of artists of that gender in bands of the country.
+    :param gender_per_country: A dictionary with the origins and the number of artists of that origin in bands of the
+        country.
+    :param genres: A dictionary with the genres and the number of bands of the country playing it.
+    :param bands_per_year: A dictionary with the years and the number of bands formed in that year.
+    :return: An instantiated CountryReport or None if any of the parameters were invalid.
+    """
+    if country_short not in COUNTRY_NAMES.keys():
+        return None
+
+    # No need to go further if there are no bands.
+    if len(band_links) == 0:
+        return None
+
+    population = COUNTRY_POPULATION[country_short]
+
+    # Bands per capita cannot be calculated with 0 people.
+    if int(population) == 0:
+        return None
+
+    genres = sorted(genres.items(), key=lambda x: x[1], reverse=True)
+
+    return CountryReport(country_short, population, band_links, genders, gender_per_country, genres, bands_per_year)
+
+
+def make_database_report(rows: ReportRows, country_shorts: list, report_mode: ReportMode,
+                         release_types_review: list) -> DatabaseReport:
+    """Assembles a DatabaseReport and its CountryReports from the aggregated rows of a database.
+
+    :param rows: The ReportRows of the requested countries.
+    :param country_shorts: The list of requested ISO country names; empty for all countries.
+    :param report_mode: Determines the grade of details.
+    :param release_types_review: The keys of the release types to consider (see RELEASE_TYPES).
+    :return: An initialized DatabaseReport object.
+    """
+    genders = {gender_key: 0 for gender_key in GENDER}
+    artists_per_country = defaultdict(int)
+
+    for origin, gender, count in rows.artists:
+        if gender in genders:
+            genders[gender] += count
+            artists_per_country[origin] += count
+
+    genres = defaultdict(int)
+    country_genres = defaultdict(lambda: defaultdict(int))
+
+    for country, genre, count in rows.genres:
+        genres[genre] += count
+        country_genres[country][genre] += count
+
+    country_genders = defaultdict(lambda: {gender_key: 0 for gender_key in GENDER})
+    country_origins = defaultdict(lambda: defaultdict(int))
+
+    # Every artist has one origin and one gender, so the sums of distinct artists stay distinct.
+    for country, origin, gender, count in rows.members:
+        if gender in GENDER:
+            country_genders[country][gender] += count
+            country_origins[country][origin] += count
+
+    bands_per_year = defaultdict(lambda: defaultdict(int))
+
+    for country, year, count in rows.formations:
+        bands_per_year[country][year] += count
+
+    release_report = ReleaseReport([RELEASE_TYPES[release_type] for release_type in release_types_review])
+
+    for country, release_type, count in rows.release_counts:
+        release_report.add_release_count(COUNTRY_NAMES[country], RELEASE_TYPES[release_type], count)
+
+    for country, band_name, release_name, link, release_type, release_date, rating in rows.releases:
+        release_report.add_rated_release(COUNTRY_NAMES[country], band_name, release_name, link,
+                                         RELEASE_TYPES[release_type], release_date, rating)
+
+    band_count = sum(count for country, count in rows.bands)
+    db_report = DatabaseReport(band_count, genders, sum(genders.values()), artists_per_country, genres,
+                               release_report, report_mode)
+    band_links = {country: links for country, links in rows.band_links if len(links) > 0}
+    country_diff = [country for country in country_shorts if country not in band_links]
+
+    if len(country_diff) > 0:
+        print('No bands were found for: ' + ', '.join(COUNTRY_NAMES[country] for country in country_diff))
+
+    # Requested countries keep their order, all countries are sorted.
+    if len(country_shorts) > 0:
+        countries = [country for country in country_shorts if country in band_links]
+    else:
+        countries = sorted(band_links.keys())
+
+    for country in countries:
+        country_report = make_country_report(country, band_links[country], country_genders[country],
+                                             country_origins[country], country_genres[country],
+                                             bands_per_year[country])
+
+        if country_report is not None:
+            db_report.add_country_report(country_report)
+
+    return db_report
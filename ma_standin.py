@@ -0,0 +1,439 @@
+"""A local stand-in for M-A to develop and benchmark the crawler without sending a single request to
+metal-archives.com. It serves synthetic band, artist and discography pages and the AJAX country lists with the same
+structure the crawler parses. Pages recorded in a response cache can be served instead of the synthetic ones. Latency,
+*Forbidden* answers and missing pages can be injected.
+
+Start it standalone and point the crawler at it with CRAWLER_BASE_URL (or `metal_crawler.set_base_url`):
+
+    python ma_standin.py --bands 1000 --latency 0.05 --forbidden 0.01
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from graph.choices import RELEASE_TYPES
+from response_cache import ResponseCache
+from settings import CRAWLER_BASE_URL
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+STANDIN_COUNTRIES = ['NO', 'SE', 'FI', 'DE', 'US', 'BR', 'GR', 'PL']
+STANDIN_GENRES = ['Black Metal', 'Death Metal', 'Thrash Metal', 'Heavy Metal', 'Doom Metal', 'Melodic Death Metal']
+STANDIN_INSTRUMENTS = ['Vocals', 'Guitars', 'Bass', 'Drums', 'Keyboards']
+# Limit imposed by M-A for one page of the AJAX country list.
+COUNTRY_PAGE_SIZE = 500
+
+PAGE_FORBIDDEN = b'Forbidden.\n'
+PAGE_NOT_FOUND = b'Error 404 - Page not found'
+
+BAND_PATTERN = re.compile(r'^/bands/[^/]+/(\d+)$')
+ARTIST_PATTERN = re.compile(r'^/artists/[^/]+/(\d+)$')
+DISCOGRAPHY_PATTERN = re.compile(r'^/band/discography/id/(\d+)/tab/all$')
+COUNTRY_PATTERN = re.compile(r'^/browse/ajax-country/c/([A-Z]{2})(/json/1)?$')
+
+BAND_TEMPLATE = """<html><head><title>{name} - Encyclopaedia Metallum</title></head><body>
+<h1 class="band_name"><a href="{base}bands/{link}">{name}</a></h1>
+<div class="float_left"><a class="image" href="#">Logo</a></div>
+<dl class="float_left">
+<dt>Country of origin:</dt>
+<dd><a href="{base}lists/{country}">{country}</a></dd>
+<dt>Location:</dt>
+<dd>{location}</dd>
+<dt>Status:</dt>
+<dd>{status}</dd>
+<dt>Formed in:</dt>
+<dd>{formed}</dd>
+</dl>
+<div class="clear"></div>
+<div class="clear"></div>
+<div class="clear"></div>
+<dl class="clear">
+<dt>Years active:</dt>
+<dd>
+{years}
+</dd>
+</dl>
+<div class="float_right"></div>
+<div class="float_right"></div>
+<div class="float_right"></div>
+<dl class="float_right">
+<dt>Genre:</dt>
+<dd>{genre}</dd>
+<dt>Themes:</dt>
+<dd>{themes}</dd>
+<dt>Current label:</dt>
+<dd>{label}</dd>
+</dl>
+<ul>
+<li><a href="#band_tab_members_all">Complete lineup</a></li>
+<li><a href="#band_tab_members_current">Current lineup</a></li>
+</ul>
+<div class="ui-tabs-panel-content">
+<table class="display lineupTable">
+{lineup}
+</table>
+</div>
+</body></html>"""
+
+ARTIST_TEMPLATE = """<html><head><title>{pseudonym} - Encyclopaedia Metallum</title></head><body>
+<div id="member_info">
+<h1 class="band_member_name">{pseudonym}</h1>
+<div class="clear"></div>
+<div class="clear"></div>
+<dl class="float_left">
+<dt>Real/full name:</dt>
+<dd>{name}</dd>
+<dt>Age:</dt>
+<dd>{age}</dd>
+</dl>
+<dl class="float_right">
+<dt>Place of birth:</dt>
+<dd>{origin}</dd>
+<dt>Gender:</dt>
+<dd>{gender}</dd>
+</dl>
+</div>
+</body></html>"""
+
+DISCOGRAPHY_TEMPLATE = """<html><body>
+<table class="display discog">
+<thead><tr><th>Name</th><th>Type</th><th>Year</th><th>Reviews</th></tr></thead>
+<tbody>
+{releases}
+</tbody>
+</table>
+</body></html>"""
+
+
+class StandinCatalog:
+    """A deterministic synthetic M-A. The same seed always creates the same bands, artists and releases. Artists are
+        drawn from a pool shared by all bands, so many of them play in several bands like on the real M-A.
+    """
+
+    def __init__(self, band_count, seed=0, missing_rate=0.0):
+        """Creates all bands and artists.
+
+        :param band_count: Number of bands; the IDs run from 1 to band_count.
+        :param seed: Seed for the random generators.
+        :param missing_rate: Share of bands which are listed in their country but whose page answers with a 404.
+        """
+        self.seed = seed
+        self.bands = {}
+        self.artists = {}
+        self.countries = {country: [] for country in STANDIN_COUNTRIES}
+        generator = random.Random(seed)
+        artist_pool_size = max(int(band_count * 1.5), 5)
+
+        for band_id in range(1, band_count + 1):
+            country = STANDIN_COUNTRIES[band_id % len(STANDIN_COUNTRIES)]
+            formed = generator.randint(1980, 2015)
+            member_ids = generator.sample(range(1, artist_pool_size + 1), generator.randint(2, 5))
+            band = {
+                'id': band_id,
+                'name': f'Standin Band {band_id}',
+                'link': f'Standin_Band_{band_id}/{band_id}',
+                'country': country,
+                'formed': formed,
+                'is_active': generator.random() < 0.6,
+                'genre': generator.choice(STANDIN_GENRES),
+                'label_id': generator.choice([None, generator.randint(1, 50)]),
+                'members': [],
+                'is_missing': generator.random() < missing_rate
+            }
+
+            for index, member_id in enumerate(member_ids):
+                category = 'Current' if band['is_active'] and index < len(member_ids) - 1 else 'Past'
+                start = generator.randint(formed, 2020)
+                end = 'present' if category == 'Current' else str(generator.randint(start, 2022))
+                instrument = generator.choice(STANDIN_INSTRUMENTS)
+                band['members'].append((category, member_id, f'{instrument} ({start}-{end})'))
+                self.artists.setdefault(member_id, []).append(band_id)
+
+            self.bands[band_id] = band
+            self.countries[country].append(band_id)
+
+    def get_artist(self, artist_id):
+        generator = random.Random(self.seed * 1000003 + artist_id)
+        return {
+            'pseudonym': f'Standin Artist {artist_id}',
+            'name': generator.choice(['N/A', f'Standin Person {artist_id}']),
+            'age': generator.choice(['N/A', f'{generator.randint(18, 70)} (born 1970)']),
+            'origin': generator.choice(['N/A', generator.choice(STANDIN_COUNTRIES)]),
+            'gender': generator.choice(['Male', 'Male', 'Female', 'Unknown'])
+        }
+
+    def render_band(self, band_id, base):
+        band = self.bands[band_id]
+        lineup = []
+        last_category = None
+
+        for category, artist_id, instruments in band['members']:
+            if category != last_category:
+                lineup.append(f'<tr class="lineupHeaders">\n<td colspan="3">{category}</td>\n</tr>')
+                last_category = category
+
+            pseudonym = self.get_artist(artist_id)['pseudonym']
+            lineup.append(f'<tr class="lineupRow">\n<td>\n<a href="{base}artists/{pseudonym.replace(" ", "_")}/'
+                          f'{artist_id}" class="bold">{pseudonym}</a></td>\n<td>{instruments}</td>\n</tr>')
+            other_bands = [self.bands[other_id] for other_id in self.artists[artist_id] if other_id != band_id]
+
+            if len(other_bands) > 0:
+                links = ', '.join(f'<a href="{base}bands/{other["link"]}">{other["name"]}</a>'
+                                  for other in other_bands)
+                lineup.append(f'<tr class="lineupBandsRow">\n<td colspan="3">See also: {links}</td>\n</tr>')
+
+        if band['label_id'] is None:
+            label = 'Unsigned/independent'
+        else:
+            label = f'<a href="{base}labels/Standin_Records_{band["label_id"]}/{band["label_id"]}">' \
+                    f'Standin Records {band["label_id"]}</a>'
+
+        return BAND_TEMPLATE.format(
+            base=base, name=band['name'], link=band['link'], country=band['country'], location='Standin City',
+            status='Active' if band['is_active'] else 'Split-up', formed=band['formed'],
+            years=f'{band["formed"]}-{"present" if band["is_active"] else band["formed"] + 5}', genre=band['genre'],
+            themes='Darkness, Benchmarks', label=label, lineup='\n'.join(lineup))
+
+    def render_artist(self, artist_id, base):
+        artist = self.get_artist(artist_id)
+        origin = artist['origin']
+
+        if origin != 'N/A':
+            origin = f'Standin City, <a href="{base}lists/{origin}">{origin}</a>'
+
+        return ARTIST_TEMPLATE.format(pseudonym=artist['pseudonym'], name=artist['name'], age=artist['age'],
+                                      origin=origin, gender=artist['gender'])
+
+    def render_discography(self, band_id, base):
+        band = self.bands[band_id]
+        generator = random.Random(self.seed * 1000033 + band_id)
+        releases = []
+
+        for index in range(generator.randint(0, 8)):
+            album_id = band_id * 100 + index
+            rating = ''
+
+            if generator.random() < 0.5:
+                rating = f'{generator.randint(1, 20)} ({generator.randint(30, 100)}%)'
+
+            releases.append(
+                f'<tr><td><a href="{base}albums/{band["link"].split("/")[0]}/Release_{index}/{album_id}">'
+                f'Release {index}</a></td><td>{generator.choice(list(RELEASE_TYPES.values()))}</td>'
+                f'<td>{band["formed"] + index}</td><td>{rating}</td></tr>')
+
+        if len(releases) == 0:
+            releases.append('<tr><td colspan="4">Nothing entered yet.</td></tr>')
+
+        return DISCOGRAPHY_TEMPLATE.format(releases='\n'.join(releases))
+
+    def render_country(self, country, start, echo, base):
+        band_ids = self.countries.get(country, [])
+        rows = []
+
+        for band_id in band_ids[start:start + COUNTRY_PAGE_SIZE]:
+            band = self.bands[band_id]
+            rows.append([f"<a href='{base}bands/{band['link']}'>{band['name']}</a>", band['genre'], 'Standin City',
+                         '<span class="active">Active</span>'])
+
+        return json.dumps({'error': '', 'iTotalRecords': len(band_ids), 'iTotalDisplayRecords': len(band_ids),
+                           'sEcho': echo, 'aaData': rows})
+
+    def render_country_list(self, base):
+        links = ''.join(f'\n<a href="{base}lists/{country}">{country}</a><br />' for country in self.countries)
+        return f'<html><body><div class="countryCol">{links}\n</div></body></html>'
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Serves a `StandinCatalog` on localhost. Every request runs in its own thread, so injected latency does not
+        serialize the requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, catalog: StandinCatalog, port=0, latency=0.0, forbidden_rate=0.0, recorded_path=None,
+                 seed=0):
+        """Binds the server; `start` serves it in a background thread.
+
+        :param catalog: The synthetic M-A to serve.
+        :param port: The port to listen on; 0 picks a free one.
+        :param latency: Mean latency of an answer in seconds; the actual one is between half and one and a half times
+            of it.
+        :param forbidden_rate: Share of requests answered with *Forbidden*.
+        :param recorded_path: Path of a response cache. Pages found in it are served (with the links rewritten to the
+            stand-in) instead of the synthetic ones.
+        :param seed: Seed of the random generator for latency and forbidden answers.
+        """
+        super().__init__(('127.0.0.1', port), StandinHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.forbidden_rate = forbidden_rate
+        self.recorded = None if recorded_path is None else ResponseCache(recorded_path, is_cache_only=True)
+        self.base_url = f'http://127.0.0.1:{self.server_address[1]}/'
+        self.request_count = 0
+        self.forbidden_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def next_answer(self):
+        """Counts the request and draws its latency and if it's forbidden.
+
+        :return: A tuple of the latency in seconds and True for a forbidden answer.
+        """
+        with self._lock:
+            self.request_count += 1
+            latency = self.latency * (0.5 + self._random.random())
+            is_forbidden = self._random.random() < self.forbidden_rate
+
+            if is_forbidden:
+                self.forbidden_count += 1
+
+            return latency, is_forbidden
+
+    def get_recorded(self, path):
+        if self.recorded is None:
+            return None
+
+        entry = self.recorded.lookup(CRAWLER_BASE_URL + path.lstrip('/'))
+
+        if entry is None:
+            return None
+
+        return entry.data.replace(CRAWLER_BASE_URL.encode('utf-8'), self.base_url.encode('utf-8'))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='Standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; Nagle's algorithm would delay every answer on a kept-alive connection.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        latency, is_forbidden = self.server.next_answer()
+
+        if latency > 0:
+            time.sleep(latency)
+
+        if is_forbidden:
+            self.answer(403, PAGE_FORBIDDEN)
+            return
+
+        url = urlsplit(self.path)
+        page = self.server.get_recorded(self.path)
+
+        if page is None:
+            page = self.render(url.path, parse_qs(url.query))
+
+        if page is None:
+            self.answer(404, PAGE_NOT_FOUND)
+        else:
+            self.answer(200, page)
+
+    def render(self, path, query):
+        catalog = self.server.catalog
+        base = self.server.base_url
+        match = BAND_PATTERN.match(path)
+
+        if match is not None:
+            band = catalog.bands.get(int(match.group(1)))
+            return None if band is None or band['is_missing'] else catalog.render_band(band['id'], base)
+
+        match = ARTIST_PATTERN.match(path)
+
+        if match is not None:
+            artist_id = int(match.group(1))
+            return catalog.render_artist(artist_id, base) if artist_id in catalog.artists else None
+
+        match = DISCOGRAPHY_PATTERN.match(path)
+
+        if match is not None:
+            band_id = int(match.group(1))
+            return catalog.render_discography(band_id, base) if band_id in catalog.bands else None
+
+        match = COUNTRY_PATTERN.match(path)
+
+        if match is not None:
+            start = int(query.get('iDisplayStart', ['0'])[0])
+            echo = int(query.get('sEcho', ['1'])[0])
+            return catalog.render_country(match.group(1), start, echo, base)
+
+        if path == '/browse/country':
+            return catalog.render_country_list(base)
+
+        return None
+
+    def answer(self, status, page):
+        if isinstance(page, str):
+            page = page.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_standin_parser(description):
+    """Creates an argument parser with the options of the stand-in. Shared with the benchmark.
+
+    :param description: The description of the program.
+    :return: An `argparse.ArgumentParser`.
+    """
+    arg_parser = argparse.ArgumentParser(description=description)
+    arg_parser.add_argument('--bands', type=int, default=1000, help='Number of synthetic bands (default: 1000).')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='Mean latency of an answer in seconds.')
+    arg_parser.add_argument('--forbidden', type=float, default=0.0,
+                            help='Share of requests answered with "Forbidden." (0.0 to 1.0).')
+    arg_parser.add_argument('--missing', type=float, default=0.0,
+                            help='Share of bands whose page answers with a 404 (0.0 to 1.0).')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Seed for all generated data.')
+    arg_parser.add_argument('--recorded', metavar='CACHE_PATH',
+                            help='Serves pages of this response cache instead of synthetic ones if possible.')
+    return arg_parser
+
+
+def make_standin(args, port=0) -> StandinServer:
+    """Creates the stand-in from the parsed arguments of `make_standin_parser`.
+
+    :param args: The parsed arguments.
+    :param port: The port to listen on; 0 picks a free one.
+    :return: The started `StandinServer`.
+    """
+    catalog = StandinCatalog(args.bands, args.seed, args.missing)
+    return StandinServer(catalog, port, args.latency, args.forbidden, args.recorded, args.seed).start()
+
+
+def main():
+    arg_parser = make_standin_parser('Serves a synthetic M-A on localhost.')
+    arg_parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080).')
+    args = arg_parser.parse_args()
+    server = make_standin(args, args.port)
+    print(f'Serving {args.bands} bands on {server.base_url}. Press <CTRL+C> to stop.')
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,11 @@ from global_helpers import __version__, BAND_LINK_FILE_NAME, FOLDER_LINKS, FOLDE
     append_genitive_s
 from country_helper import COUNTRY_NAMES, REGIONS_ALL, print_regions, print_countries
 from metal_crawler import crawl_country, crawl_countries, crawl_bands
+from async_crawler import crawl_bands_async
+from crawl_frontier import CrawlFrontier
+from snapshot_import import import_snapshots
+from snapshot_store import SnapshotStore
+from response_cache import set_cache_mode
 from graph.report import ReportMode
 from graph.export_graph import GraphExportContext, GraphMLExporter
 from genre import save_genres
@@ -25,7 +30,8 @@ from html_exporter import generate_html_report
 from logo import get_logo
 from exporter import ExportMode, Exporter
 from exporter_markdown import ExporterMarkdown
-from graph.metal_graph_context import init_db
+from graph.metal_graph_context import DATABASE_BACKENDS, init_db
+from settings import CRAWLER_ASYNC_CONCURRENCY, CRAWLER_CACHE_ENABLED, DATABASE_BACKEND, SNAPSHOT_LEGACY_PATH
 
 __author__ = 'Martin Woelke'
 # https://opensource.org/licenses/NPOSL-3.0
@@ -55,6 +61,17 @@ list_text = 'List available countries and regions.'
 export_mode_raw_text = 'Exports raw data into csv, html and json files.'
 export_mode_md_text = 'Exports the database into Markdown files which  can be directly used e.g. in the GitHub wiki.'
 export_mode_gml_text = 'Exports a graph (as GraphML) of bands. Use the settings file to change the defaults.'
+async_text = 'Crawls bands (-s or -c) with the asynchronous engine instead of threads.'
+concurrency_text = f'Maximum number of requests in flight for --async (default: {CRAWLER_ASYNC_CONCURRENCY}).'
+cache_only_text = 'Crawls only from the response cache (regardless of the age of a page) without requesting anything ' \
+                  'from M-A. Pages which are not cached count as errors.'
+no_cache_text = 'Neither uses nor fills the response cache while crawling.'
+resume_text = 'Resumes the last band crawl (-s or -c) where it stopped, e.g. after a crash or Q.'
+db_text = f'Database to crawl into and to analyze (default: {DATABASE_BACKEND}). sqlite needs no server; memory ' \
+          'keeps nothing after the run; snapshots analyzes (-y) the band snapshots of the crawls without a database.'
+import_snapshots_text = 'Rebuilds the database (--db) from the band snapshots of earlier crawls instead of crawling ' \
+                        'again. Imports all bands or only the bands of the given country shorts. Band snapshots of ' \
+                        'older versions (JSON files) are moved into the snapshot store first.'
 
 
 def flush_queue(country_short, link_list):
@@ -92,6 +109,28 @@ def flush_queue(country_short, link_list):
     return country_filename
 
 
+def run_crawl(band_links, db_handle, args, is_single_mode=False, is_resume=False):
+    """Crawls the given bands with the engine chosen on the command line.
+
+    :param band_links: A list of short band links.
+    :param db_handle: The database handle.
+    :param args: The parsed command line arguments.
+    :param is_single_mode: Indicates if a single band and its immediate connections is crawled.
+    :param is_resume: Continues the crawl recorded in the crawl frontier instead of crawling `band_links`.
+    """
+    if args.db == 'snapshots':
+        logging.getLogger('MAIN').error('The snapshots are read-only. Crawl into another database (--db).')
+        return
+
+    set_cache_mode(is_enabled=CRAWLER_CACHE_ENABLED and not args.no_cache, is_cache_only=args.cache_only)
+
+    if args.is_async:
+        crawl_bands_async(band_links, db_handle, is_single_mode=is_single_mode, concurrency=args.concurrency,
+                          is_resume=is_resume)
+    else:
+        crawl_bands(band_links, db_handle, is_single_mode=is_single_mode, is_resume=is_resume)
+
+
 def main():
     with open('loggerConfig.yaml', 'r') as log_config:
         log_config = yaml.safe_load(log_config.read())
@@ -138,6 +177,14 @@ def main():
     # arg_parser.add_argument('--md', action='store_true', help=export_mode_md_text)
     arg_parser.add_argument('--raw', action='store_true', help=export_mode_raw_text)
     arg_parser.add_argument('--gml', action='store_true', help=export_mode_gml_text)
+    arg_parser.add_argument('--async', dest='is_async', action='store_true', help=async_text)
+    arg_parser.add_argument('--concurrency', type=int, default=CRAWLER_ASYNC_CONCURRENCY, help=concurrency_text,
+                            metavar='REQUESTS')
+    arg_parser.add_argument('--cache-only', action='store_true', help=cache_only_text)
+    arg_parser.add_argument('--no-cache', action='store_true', help=no_cache_text)
+    arg_parser.add_argument('--resume', action='store_true', help=resume_text)
+    arg_parser.add_argument('--db', choices=DATABASE_BACKENDS, default=DATABASE_BACKEND, help=db_text)
+    arg_parser.add_argument('--import-snapshots', nargs='*', help=import_snapshots_text, metavar='COUNTRY_SHORT')
     args = arg_parser.parse_args()
 
     # All countries
@@ -150,12 +197,26 @@ def main():
         for country_short in country_links:
             link_list = crawl_country(country_short)
             flush_queue(country_short, link_list)
+    # Resume the last crawl
+    elif args.resume:
+        frontier = CrawlFrontier()
+        can_resume = frontier.can_resume()
+        frontier.close()
+
+        if not can_resume:
+            logger.error('There is no unfinished crawl to resume.')
+        else:
+            db_handle = init_db(args.db)
+
+            if db_handle is not None:
+                run_crawl([], db_handle, args, is_resume=True)
+                save_genres()
     # Single mode
     elif args.s is not None:
-        db_handle = init_db()
+        db_handle = init_db(args.db)
 
         if db_handle is not None:
-            crawl_bands([args.s], db_handle, is_single_mode=True)
+            run_crawl([args.s], db_handle, args, is_single_mode=True)
             save_genres()
     # ISO countries
     elif args.i is not None and len(args.i) > 0:
@@ -191,7 +252,7 @@ def main():
             flush_queue(region, link_list)
     # Crawl list of countries, regions or files.
     elif args.c is not None:
-        db_handle = init_db()
+        db_handle = init_db(args.db)
         # Do not continue if the DB is not available.
         if db_handle is None:
             exit(-1)
@@ -237,10 +298,30 @@ def main():
                 logger.error(f'File {country_region_file} was not readable.')
 
         if len(sanitized_bands) != 0:
-            crawl_bands(sanitized_bands, db_handle)
+            run_crawl(sanitized_bands, db_handle, args)
             save_genres()
         else:
             logger.error('No bands to crawl. Check your input files.')
+    # Rebuild the database from the band snapshots.
+    elif args.import_snapshots is not None:
+        db_handle = init_db(args.db) if args.db != 'snapshots' else None
+
+        if db_handle is None:
+            sys.exit(-1)
+
+        country_shorts = [country.upper() for country in args.import_snapshots]
+        snapshot_store = SnapshotStore()
+        legacy_count = snapshot_store.import_json_files(SNAPSHOT_LEGACY_PATH)
+
+        if legacy_count > 0:
+            logger.info(f'Added {legacy_count} band snapshots of older versions to the snapshot store.')
+
+        imported_count, failed_links = import_snapshots(db_handle, snapshot_store, country_shorts)
+        snapshot_store.close(compact_ratio=None)
+        print(f'Imported {imported_count} bands from the snapshots.')
+
+        if len(failed_links) > 0:
+            logger.error(f'{len(failed_links)} bands could not be imported: {", ".join(failed_links)}')
     # TODO: Refactor into else block below, positively identify the export mode then assume countries.
     elif args.y is not None or args.z:
         # TODO: z is not used in the new implementation.
@@ -273,8 +354,7 @@ def main():
                     else:
                         logger.info(f'Unknown country/region: {country}')
 
-        # Only one DB implemented; uses Neo4j.
-        db_handle = init_db()
+        db_handle = init_db(args.db)
 
         if db_handle is None:
             sys.exit(-9)
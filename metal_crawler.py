@@ -3,24 +3,33 @@
 import os
 import json
 import threading
-import time
 import queue
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from pathlib import Path
+from time import perf_counter, sleep
 from dataclasses import dataclass, field
 from typing import List, Dict
 from dataclasses_serialization.json import JSONSerializer
 
-import certifi
-import urllib3
-from urllib3.exceptions import ReadTimeoutError, MaxRetryError
+from urllib3.exceptions import HTTPError
 import progressbar
-from settings import CRAWLER_THREAD_COUNT
-from bs4 import BeautifulSoup, NavigableString, Tag
+from settings import CRAWLER_THREAD_COUNT, CRAWLER_BAND_FANOUT, CRAWLER_BASE_URL, CRAWLER_WRITE_QUEUE_SIZE, \
+    CRAWLER_WRITE_BATCH_SIZE
+from bs4 import NavigableString, Tag
 
 from country_helper import COUNTRY_NAMES, split_locations
+from artist_registry import ArtistRegistry
+from crawl_frontier import CrawlFrontier, STATE_DONE, STATE_FAILED
+from crawler_session import get_session
+from retry_scheduler import RetryScheduler, ERROR_FORBIDDEN, ERROR_TIMEOUT, ERROR_NOT_FOUND, ERROR_PARSE
+from response_cache import get_response_cache
+from rate_limiter import get_rate_limiter
+from parser_pool import ParserPool
+from page_parser import PAGE_BAND, PAGE_ARTIST, PAGE_DISCOGRAPHY, parse_page
+from snapshot_store import SnapshotStore
 from genre import split_genres
 from global_helpers import get_dict_key
 from graph.choices import *
@@ -29,8 +38,10 @@ __author__ = 'Martin Woelke'
 __license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
 __copyright__ = 'Copyright 2019-2023, Martin Woelke'
 
-EM_LINK_MAIN = 'https://www.metal-archives.com/'
+EM_LINK_MAIN = CRAWLER_BASE_URL
 EM_LINK_LABEL = EM_LINK_MAIN + 'labels/'
+EM_LINK_ARTISTS = EM_LINK_MAIN + 'artists/'
+EM_LINK_ALBUMS = EM_LINK_MAIN + 'albums/'
 BANDS_DASH = 'bands/'
 ajaxLinks = queue.Queue()
 entity_paths = {'bands': 'databases/visited_bands.txt', 'members': 'databases/visited_members.txt'}
@@ -38,10 +49,34 @@ lineup_mapping = {
         "Current lineup": "Current", "Last known lineup": "Last known", "Past members": "past"
     }
 STATUS_ERROR = 'unrecoverable'
+STATUS_RETRIED = 'retried'
 STATUS_SKIPPED = 'skipped'
 STATUS_ADDED = 'added'
 STATUS_INITIAL = 'initial'
+STATUS_DB_WRITE_TIME = 'db_write_time'
+PAGE_VALID = 'valid'
+PAGE_RETRY = 'retry'
+PAGE_INVALID = 'invalid'
 STOP_CRAWL_USER_INPUT = ""
+# Artist data used for band members which are already in the database and not visited again.
+ARTIST_KNOWN = {'name': '', 'gender': 'U', 'age': -1, 'origin': 'ZZ'}
+# Returned for artist pages without member info; these artists are left out of the lineup.
+ARTIST_SKIPPED = 'skipped'
+
+
+class PageError(Exception):
+    """Raised if a page could not be cooked. The error class (one of the ERROR_* constants of retry_scheduler.py)
+        decides if and when the band is tried again.
+    """
+
+    def __init__(self, link, error_class):
+        super().__init__(f'{error_class}: {link}')
+        self.link = link
+        self.error_class = error_class
+
+    def __reduce__(self):
+        # Raised in parser processes; the default pickling would call the constructor with the message only.
+        return PageError, (self.link, self.error_class)
 
 
 @dataclass
@@ -81,6 +116,7 @@ class Band(DbEntity):
         self.active = []
         self.lineup = {}
         self.releases = {}
+        self.label = Label()
         self.type = 'band'
 
 
@@ -108,20 +144,153 @@ class Release(DbEntity):
         self.type = 'release'
 
 
+@dataclass
+class LineupEntry:
+    """An artist as found in the lineup of a band page, before the artist page is visited."""
+    category: str = 'not set'
+    link: str = 'not set'
+    full_link: str = 'not set'
+    emid: str = 'not set'
+    pseudonym: str = 'not set'
+    instruments: List = field(default_factory=list)
+
+
+class DatabaseWriterThread(threading.Thread):
+    """The only thread writing crawled bands to the database. Crawlers hand their bands over through a bounded queue
+        and go on crawling; they only wait if the writer falls behind by more than the size of the queue. The writer
+        takes all bands waiting in the queue (up to a batch size) at once.
+    """
+
+    def __init__(self, db_handle, band_errors, frontier, is_detailed=False, queue_size=CRAWLER_WRITE_QUEUE_SIZE,
+                 batch_size=CRAWLER_WRITE_BATCH_SIZE, snapshot_store=None):
+        """Constructs the writer; call `start` before submitting bands and `close` after the last one.
+
+        :param db_handle: The database handle used to add all entities.
+        :param band_errors: The shared status dictionary of the crawl.
+        :param frontier: The `CrawlFrontier` of the crawl; written bands are done.
+        :param is_detailed: A parameter that is not used and might be useful someday.
+        :param queue_size: Maximum number of bands waiting to be written.
+        :param batch_size: Maximum number of bands written at once.
+        :param snapshot_store: The `SnapshotStore` receiving the snapshots of all crawled bands; no snapshots are
+            saved if it's None. The writer closes it in `close`.
+        """
+        super(DatabaseWriterThread, self).__init__(name='DatabaseWriter')
+        self.logger = logging.getLogger('Crawler')
+        self.db_handle = db_handle
+        self.band_errors = band_errors
+        self.frontier = frontier
+        self.is_detailed = is_detailed
+        self.bands = queue.Queue(maxsize=max(queue_size, 1))
+        self.batch_size = max(batch_size, 1)
+        self.batch_count = 0
+        self.snapshot_store = snapshot_store
+
+    def submit(self, band):
+        """Hands a crawled band over to the writer; blocks while the queue is full."""
+        self.bands.put(band)
+
+    def close(self):
+        """Writes all bands still in the queue, waits for the writer to finish and closes the snapshot store."""
+        self.bands.put(None)
+        self.join()
+
+        if self.snapshot_store is not None:
+            self.snapshot_store.close()
+
+    def run(self):
+        is_closed = False
+
+        while not is_closed:
+            batch = [self.bands.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.bands.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is the end marker of `close`.
+            if None in batch:
+                is_closed = True
+                batch = [band for band in batch if band is not None]
+
+            # The writer must keep draining the queue; otherwise the crawlers and `close` wait for it forever.
+            try:
+                if len(batch) > 0:
+                    self.write_batch(batch)
+            except Exception:
+                self.logger.exception(f'Handling a batch of {len(batch)} bands failed.')
+
+                for band in batch:
+                    self.band_errors[STATUS_ERROR].setdefault(band.link, 'database')
+
+    def write_batch(self, bands):
+        time_start = perf_counter()
+        self.batch_count += 1
+
+        try:
+            apply_batch_to_db(bands, self.db_handle, self.is_detailed)
+            written_bands = bands
+        except Exception as e:
+            self.logger.exception(f'Writing a batch of {len(bands)} bands failed. Writing them one by one.')
+            written_bands = [band for band in bands if self.write_band(band)]
+
+        for band in written_bands:
+            self.band_errors[STATUS_ADDED][band.link] = ''
+
+            try:
+                self.frontier.mark_done(band.link, STATUS_ADDED, get_artist_links(band))
+            except Exception:
+                self.logger.exception(f'Marking {band.link} as done in the crawl frontier failed.')
+                self.band_errors[STATUS_ERROR][band.link] = 'frontier'
+
+        self.band_errors[STATUS_DB_WRITE_TIME] += perf_counter() - time_start
+
+        if self.snapshot_store is not None:
+            # Bands which are not in the database don't get a snapshot either; they are crawled again.
+            for band in written_bands:
+                try:
+                    is_saved = save_band_snapshot(band, self.snapshot_store)
+                except Exception:
+                    self.logger.exception(f'Saving the snapshot of {band.link} failed.')
+                    is_saved = False
+
+                if not is_saved:
+                    self.band_errors[STATUS_ERROR][band.link] = 'snapshot'
+
+            try:
+                self.snapshot_store.flush()
+            except Exception:
+                self.logger.exception(f'Flushing the snapshots of {len(written_bands)} bands failed.')
+
+    def write_band(self, band):
+        """Writes a single band of a failed batch.
+
+        :return: True if the band was written.
+        """
+        try:
+            apply_to_db(band, self.db_handle, self.is_detailed)
+            return True
+        except Exception as e:
+            self.logger.exception('Writing artists failed! This is bad. Expect loss of data for the above band.')
+            self.band_errors[STATUS_ERROR][band.link] = 'database'
+            self.frontier.mark_failed(band.link, error_class='database')
+            return False
+
+
 class VisitBandThread(threading.Thread):
-    def __init__(self, thread_id, band_links, lock, db_handle, band_errors, visited_entities,
-                 progress_bar, visited_bands, is_detailed=False, is_single_mode=True):
+    def __init__(self, thread_id, band_links, db_writer, band_errors, visited_entities,
+                 progress_bar, visited_bands, is_detailed=False, is_single_mode=True, artist_registry=None,
+                 frontier=None, retry_scheduler=None, parser_pool=None):
         """Constructs a worker object which is used to get prepared data from a band page.
         The only remarkable thing is switching the ``chardet.charsetprober`` logger to INFO.
 
         :param thread_id: An integer number
         :param band_links: A queue with short addresses of bands which are consumed one at a time by
             the workers.
-        :param lock: Secures concurrent access to ``database`` which is used by all other workers.
-        :param db_handle: The database handle is used to add all entities directly into the
-            database with the strategy defined on the outside.
-        :param band_errors: A shared dictionary with band links as keys and the number of unsuccessful crawl attempts as
-            the value.
+        :param db_writer: The `DatabaseWriterThread` shared by all workers which writes the crawled
+            bands into the database with the strategy defined on the outside.
+        :param band_errors: The shared status dictionary of the crawl (see `make_bands_status`).
         :param visited_entities: A dictionary with keys like 'bands' or 'artists' to quickly check
             if crawling is needed. The value is the date the entry was written into the database.
             The dictionary must be filled on the outside or everything will be crawled and applied
@@ -132,6 +301,14 @@ class VisitBandThread(threading.Thread):
             easily.
         :param is_detailed: A parameter that is not used and might be useful someday.
         :param is_single_mode: Indicates if a single band and its immediate connections is crawled.
+        :param artist_registry: The `ArtistRegistry` shared by all threads so that an artist page is fetched only once
+            per crawl. A registry of its own is used if None is given.
+        :param frontier: The `CrawlFrontier` recording the state of every band link. An in-memory frontier is used
+            if None is given.
+        :param retry_scheduler: The `RetryScheduler` shared by all threads which puts failed bands back into the queue
+            once they are due. A scheduler of its own is used if None is given.
+        :param parser_pool: The `ParserPool` shared by all threads which parses the downloaded pages. The thread
+            parses itself if None is given.
         """
 
         super(VisitBandThread, self).__init__()
@@ -144,16 +321,20 @@ class VisitBandThread(threading.Thread):
         self.qsize = band_links.qsize()
         self.logger.debug(f"Initializing {self.name}.")
         self.logger.debug(f"  Init with {self.qsize} bands.")
-        self.lock = lock
-        self.db_handle = db_handle
+        self.db_writer = db_writer
         self.visited_entities = visited_entities
         self.visited_bands = visited_bands
         self.today = date.today()
         self.is_detailed = is_detailed
         self.is_single_mode = is_single_mode
         self.band_errors = band_errors
-        self.retries_max = 3
         self.progress_bar = progress_bar
+        self.artist_registry = ArtistRegistry() if artist_registry is None else artist_registry
+        self.frontier = CrawlFrontier(':memory:') if frontier is None else frontier
+        self.retry_scheduler = RetryScheduler() if retry_scheduler is None else retry_scheduler
+        self.parser_pool = ParserPool(workers=0) if parser_pool is None else parser_pool
+        # Requests of a single band (discography and artist pages) are sent in parallel.
+        self.fan_out = ThreadPoolExecutor(max_workers=CRAWLER_BAND_FANOUT, thread_name_prefix=f'{self.name}_FanOut')
         global STOP_CRAWL_USER_INPUT
 
     def update_bar(self, band_link):
@@ -167,11 +348,32 @@ class VisitBandThread(threading.Thread):
         """
         self.logger.debug("Running " + self.name)
 
+        try:
+            self.visit_bands()
+        finally:
+            self.fan_out.shutdown(wait=False, cancel_futures=True)
+
+        return -1
+
+    def visit_bands(self):
+        """Takes band links from the queue and crawls them until the queue is empty and no retry is
+            scheduled or the user stopped the crawl.
+        """
         while STOP_CRAWL_USER_INPUT != "Q":
+            for band_link in self.retry_scheduler.pop_due():
+                self.band_links.put(band_link)
+
             try:
                 link_band_temp = self.band_links.get_nowait()
             except queue.Empty:
-                return -1
+                delay = self.retry_scheduler.get_delay()
+
+                if delay is None:
+                    return
+
+                # Wake up regularly to notice a stop request.
+                sleep(min(delay, 1.0))
+                continue
 
             # TODO: Implement revisiting mechanism based on date.
             # No need to visit if the band is already in the database.
@@ -179,63 +381,40 @@ class VisitBandThread(threading.Thread):
                 self.logger.debug(f"  Skipping {link_band_temp}.")
                 self.update_bar(link_band_temp)
                 self.band_errors[STATUS_SKIPPED][link_band_temp] = ""
+                self.frontier.mark_done(link_band_temp, STATUS_SKIPPED)
                 continue
 
+            self.frontier.mark_in_flight(link_band_temp)
+            # A band without a page error failed while parsing.
+            error_class = ERROR_PARSE
+
             try:
                 crawl_result = self.crawl_band(link_band_temp)
+            except PageError as e:
+                crawl_result = None
+                error_class = e.error_class
             except Exception as e:
                 self.logger.exception('Something bad happened while crawling.')
                 crawl_result = None
 
-            # Error case: putting the link back into circulation.
+            # Error case: the retry scheduler puts the link back into circulation later.
             if crawl_result is None:
-                if link_band_temp not in self.band_errors[STATUS_ERROR].keys():
-                    self.band_errors[STATUS_ERROR][link_band_temp] = 1
-                else:
-                    self.band_errors[STATUS_ERROR][link_band_temp] += 1
-
-                if self.band_errors[STATUS_ERROR][link_band_temp] < self.retries_max:
-                    self.band_links.put(link_band_temp)
-                else:
-                    self.logger.error(f'Too many retries for {link_band_temp}.')
+                if not record_crawl_error(link_band_temp, self.band_errors, error_class, self.retry_scheduler,
+                                          self.frontier):
                     self.update_bar(link_band_temp)
                 continue
             else:
                 self.visited_entities['bands'][link_band_temp] = ''
 
-            self.lock.acquire()
-
-            try:
-                apply_to_db(crawl_result, self.db_handle, self.is_detailed)
-                self.band_errors[STATUS_ADDED][link_band_temp] = ''
-            except Exception as e:
-                self.logger.exception('Writing artists failed! This is bad. Expect loss of data for the above band.')
-                self.band_errors[STATUS_ERROR][link_band_temp] = ''
-            finally:
-                self.lock.release()
-                self.update_bar(link_band_temp)
-
-            # Saving the data to disk will later enable us to limit getting live data if it is not
-            # needed.
-            actual_band_path = f"databases/{crawl_result.country}"
-            os.makedirs(actual_band_path, exist_ok=True)
-            # We take the band link because it always uses escaped sequences. This way we have the
-            # highest compatibility for writing files in underlying filesystems. The slash must be
-            # replaced of course.
-            db_path = Path(f"{actual_band_path}/{crawl_result.link.replace('/', '_')}.json")
-            actual_band_file = open(db_path, "w", encoding="utf-8")
-            # TODO: Add try block for the dump. It crashed once because it found a Tag object.
-            band_data = JSONSerializer.serialize(crawl_result)
-            band_data_text = json.dumps(band_data)
-            actual_band_file.write(band_data_text)
-            actual_band_file.close()
+            self.db_writer.submit(crawl_result)
+            self.update_bar(link_band_temp)
 
     def crawl_band(self, band_short_link):
         """This is where the magic happens: A short band link is expanded, visited and parsed for
             data.
 
             It still may throw an exception that must be caught and dealt with. Best by putting the
-            link back into circulation.
+            link back into circulation. A `PageError` tells why a page could not be cooked.
 
         :param band_short_link: Short form of the band link (e.g. Darkthrone/146).
         :return:
@@ -252,313 +431,82 @@ class VisitBandThread(threading.Thread):
         # is called. The line looks like this:
         # url = rfc3986.uri_reference(url).unsplit()
         # Needs to import rfc3986.
-        link_band = EM_LINK_MAIN + BANDS_DASH + band_short_link
+        link_band = get_band_link(band_short_link)
+        disco_link = get_discography_link(get_band_id(band_short_link))
         logger = logging.getLogger('Crawler')
         logger.info(f'>>> Crawling [{band_short_link}]')
-        band_soup = cook_soup(link_band)
-
-        if band_soup is None:
-            return None
-
-        logger.debug("  Start scraping from actual band.")
-        # Finds band name; needs to extract the ID later.
-        s = band_soup.find_all(attrs={"class": "band_name"})
+        # The discography only needs the ID from the short link; no need to wait for the band page.
+        disco_future = self.fan_out.submit(fetch_page, disco_link)
 
-        if len(s) == 0:
-            logger.fatal(f"  Did not find the attribute band_name for {band_short_link}.")
-            logger.debug("  Band page source for reference:")
-            logger.debug(band_soup.text)
+        try:
+            # This thread only downloads; the pages are parsed by the parser pool.
+            band_data_ref, lineup_entries, linked_bands = parse_fetched_page(
+                self.parser_pool, link_band, fetch_page(link_band), parse_band_data, band_short_link, self.today,
+                self.is_single_mode)
+        except Exception:
+            disco_future.cancel()
+            raise
+
+        if band_data_ref is None:
+            # Not a band page (yet); a retry must not get the same page from the cache.
+            get_response_cache().invalidate(link_band)
+            disco_future.cancel()
             return None
 
-        # All data of a band is collected here.  Band members are referenced and collected in their
-        # own collection.
-        band_data_ref = Band()
-        band_data_ref.name = str(s[0].next_element.text)
-        band_data_ref.emid = band_short_link[band_short_link.rfind('/') + 1:]
-        band_data_ref.link = band_short_link
-        band_data_ref.visited = str(self.today)
-
-        s = band_soup.find_all(attrs={"class": "float_left"})
-        # Take the last two letters of the link.
-        band_data_ref.country = s[1].contents[3].contents[0].attrs["href"][-2:]
-        band_data_ref.location = split_locations(s[1].contents[7].text)
-        band_data_ref.status = get_dict_key(BAND_STATUS, s[1].contents[11].text)
-        band_data_ref.formed = s[1].contents[15].text
-
-        s = band_soup.find_all(attrs={"class": "clear"})
-
-        # Get years into a list. Earlier incarnations of a band are ignored.
-        years_raw = s[3].contents[3].text.lstrip().rstrip()
-        years_raw = years_raw.replace('\t', '')
-        years_raw = years_raw.replace('\n', '')
-        year_tokens = years_raw.split(',')
-
-        for year_token in year_tokens:
-            # First one filters the earlier incarnation. The second one is for a bit more obscure
-            # use case. In that an earlier incarnation exists but has a comma in the name (leading
-            # for the latter portion to be split).
-            if '(as' not in year_token and ')' not in year_token:
-                band_data_ref.active.append(year_token.lstrip())
-
-        s = band_soup.find_all(attrs={"class": "float_right"})
-        band_data_ref.genres = split_genres(s[3].contents[3].contents[0])
-        band_data_ref.theme = s[3].contents[7].contents[0].split(', ')
-
-        label_node = s[3].contents[11].contents[0]
-
-        # The label from band page is only the active one. All others will only be available through
-        # the individual releases. TODO: Visit all releases and get more detailed info.
-        if label_node.isinstance(NavigableString):
-            label_name = str(s[3].contents[11].contents[0])
-            if label_name == "Unsigned/independent":
-                label_id = -1
-            else:
-                label_id = label_name
-            label_link = ""
-        else:
-            if len(label_node.contents) > 0:
-                label_name = label_node.contents[0]
-                label_link = label_node.attrs["href"][len(EM_LINK_LABEL):]
-                label_id = label_link[label_link.find('/') + 1:]
+        artist_futures = {}
+
+        # Visit all unknown band members at once. An artist may appear in more than one lineup
+        # category but is only visited once. Artists shared with bands of other threads are only
+        # visited once per crawl as well.
+        for lineup_entry in lineup_entries:
+            if lineup_entry.link in self.visited_entities['artists']:
+                logger.debug(f"      Skipping band member {lineup_entry.link}.")
+            elif lineup_entry.full_link not in artist_futures:
+                artist_futures[lineup_entry.full_link] = self.fan_out.submit(
+                    self.artist_registry.get, lineup_entry.full_link, self.fetch_artist)
+
+        for lineup_entry in lineup_entries:
+            if lineup_entry.full_link in artist_futures:
+                artist_data = artist_futures[lineup_entry.full_link].result()
             else:
-                logger.error("Label node appears to empty; dumping parent parent node.")
-                logger.error(str(s[3]))
-                raise ValueError('Label node must not be empty.')
-
-        band_data_ref.label.emid = label_id
-        band_data_ref.label.name = label_name
-        band_data_ref.label.link = label_link
-
-        logger.debug("  Scraping artists from actual band.")
-        artists_and_bands = band_soup.find_all(attrs={"class": "ui-tabs-panel-content"})
-        artists_and_band_element = artists_and_bands[0]
-        actual_category = artists_and_band_element.contents[1].contents
-
-        # This check sets a flag if a band e.g. only has a "last known" lineup. In that case it is
-        # not "diverse".
-        lineup_finder = band_soup.find_all(attrs={"href": "#band_tab_members_all"})
-        is_lineup_diverse = True
-
-        if len(lineup_finder) == 0:
-            is_lineup_diverse = False
-
-        # Needs to be outside because it won't be set in every iteration of the loop.
-        header_category = ''
-
-        # The contents of actual_category starts with a LF (`Navigable String`) and has a LF at
-        # every even position. So we start at index 1 with actual payload and only take data from
-        # uneven indexes.
-        # Data at even indexes are from one of three categories:
-        #   * lineupHeaders: A header category like "Current" or "Past".
-        #   * lineupRow: An artist including instruments and time spans.
-        #   * lineupBandsRow: Other bands an artist played in. We do not need to parse this as we
-        #     connect each band member with the actual band.
-        for i in range(1, len(actual_category), 2):
-            actual_row = actual_category[i]
-            last_found_header = actual_row.attrs["class"][0]
-
-            # Normal case.
-            if last_found_header == "lineupHeaders":
-                header_category = actual_row.contents[1].contents[0].rstrip().lstrip().replace('\t', '')
-                # While crawling Tarot/4339 I found an unusual double space between Past and (Live).
-                # Let's remove it.
-                header_category = header_category.replace('  ', ' ')
-                logger.debug(f"  Found header: {header_category}")
-            # Special case where a band only has one line-up.
-            elif last_found_header == "lineupRow":
-                # If a band has only one lineup (current, last-known or past) the usual headers will
-                # be missing on the page. For active bands with changing lineup we get 'Current'.
-                # For a band with no lineup changes it will be empty.
-                if not is_lineup_diverse:
-                    test_header2 = str(band_soup.find_all(attrs={"href": "#band_tab_members_current"})[0].contents[0])
-                    header_category = lineup_mapping[test_header2]
-                    logger.debug(f"  Did not find a header. Digging deeper: {header_category}")
-            elif last_found_header == "lineupBandsRow":
-                pass
-
-            if header_category not in band_data_ref.lineup.keys() and header_category != '':
-                # Add an empty lineup list for the found header_category if it was not in before.
-                # `header_category` will always have a valid value.
-                band_data_ref.lineup[header_category] = []
-            elif header_category == '':
-                # For the unlikely case that the header category is not found.
-                raise ValueError(f'The header category was empty while crawling {band_data_ref.name}.')
-
-            # Five elements for artists.
-            if len(actual_row) == 5:
-                temp_artist_soup_link = actual_row.contents[1].contents[1].attrs["href"]
-
-                # The leading part ist not needed and stripped
-                # (https://www.metal-archives.com/artists/). It's always 39 letters long.
-                temp_artist_link = actual_row.contents[1].contents[1].attrs["href"][39:]
-                temp_artist_id = temp_artist_link[temp_artist_link.find('/') + 1:]
-                temp_artist_pseudonym = str(actual_row.contents[1].contents[1].contents[0])
-                logger.debug(f"  Recording artist data for {temp_artist_pseudonym}.")
-
-                # Don't visit known band members.
-                if temp_artist_link in self.visited_entities['artists']:
-                    logger.debug(f"      Skipping band member {temp_artist_link}.")
-                    artist_soup = None
-                    artist_exists = True
-                else:
-                    artist_soup = cook_soup(temp_artist_soup_link)
-                    artist_exists = False
-
-                name = ""
-                gender = "U"
-                age = -1
-                origin = 'ZZ'
-
-                if artist_soup is not None and artist_soup != 0:
-                    member_info = None
-
-                    # The artist soup is not always reliably cooked. I'll leave the debug print logs in for now.
-                    try:
-                        member_info = artist_soup.find('div', attrs={'id': 'member_info'})
-                    except Exception as e:
-                        print('e >>>>>>>>>>>>>>>>>>>>')
-                        print(f'artist_soup: {artist_soup}')
-                        print()
-
-                    if member_info is None:
-                        print('n >>>>>>>>>>>>>>>>>>>>')
-                        print(f'artist_soup: {artist_soup}')
-                        logger.error(f'Crawling artist failed (member info is None): {temp_artist_soup_link}')
-                        print('<<<<<<<<<<<<<<<<<<<<')
-                        continue
+                artist_data = ARTIST_KNOWN
 
-                    name = str(member_info.contents[7].contents[3].contents[0]).lstrip().rstrip()
-                    gender = str(member_info.contents[9].contents[7].contents[0])
+            # Error case: The artist page is invalid and the artist does not exist.
+            if artist_data is None:
+                for future in list(artist_futures.values()) + [disco_future]:
+                    future.cancel()
+                return None
 
-                    if gender in GENDER.values():
-                        gender = get_dict_key(GENDER, gender)
-                    else:
-                        logger.error(f'Encountered unrecognized gender: {gender}')
-                        gender = "U"
-
-                    temp_age = str(member_info.contents[7].contents[7].contents[0]).lstrip().rstrip()
-                    # Age strings contain either an N/A or are YY (born ...).
-                    if 'N/A' not in temp_age:
-                        age = temp_age[:temp_age.find(" ")]
-
-                    if 'N/A' not in member_info.contents[9].contents[3].text:
-                        origin = member_info.contents[9].contents[3].contents[1].attrs['href'][-2:]
-                else:
-                    logger.error(f'Crawling artist failed: {temp_artist_soup_link}')
-                    # Error case: artist_soup is invalid and the artist does not exist.
-                    if not artist_exists:
-                        return None
-
-                # If the band member does not have a name in the database we simply use the
-                # pseudonym. This unfortunately overwrites the name with whatever pseudonym we found
-                # last.
-                if 'N/A' in name:
-                    name = temp_artist_pseudonym
-
-                artist = Artist()
-                band_data_ref.lineup[header_category].append(artist)
-                artist.emid = temp_artist_id
-                artist.link = temp_artist_link
-                artist.name = name
-                artist.gender = gender
-                artist.age = age
-                artist.origin = origin
-                artist.pseudonym = temp_artist_pseudonym
-                artist.instruments = cut_instruments_alt(actual_row.contents[3].contents[0])
-                artist.visited = str(self.today)
+            add_artist(band_data_ref, lineup_entry, artist_data, self.today)
 
         number_added_bands = 0
         # Happens only for the first band if -s was used as the command line switch.
         if self.is_single_mode:
-            number_added_bands = self.add_connected_bands_to_queue(band_soup)
-
-        # Crawl discography.
-        link_disco = f"https://www.metal-archives.com/band/discography/id/{band_data_ref.emid}/tab/all"
-        disco_soup = cook_soup(link_disco)
-
-        if disco_soup is None:
-            logger.error(f"  Unable to get the discography for {band_short_link}.")
-            # We have to throw everything away and start anew.
-            return None
-
-        table = disco_soup.find('table', attrs={'class': 'display discog'})
-        table_body = table.find('tbody')
-        rows = table_body.find_all('tr')
-
-        for row in rows:
-            cells = row.findAll("td")
-
-            # Guard clause for the unlikely case if a band has no releases.
-            if len(cells) == 1:
-                logger.debug(f"  No releases found for {band_data_ref.name}.")
-                continue
-
-            # TODO: Visit release page to get details like the actual release date instead of only the year.
-            album_id = cells[0].contents[0].attrs['href']
-            # We don't need the fixed part of the link (https://www.metal-archives.com/albums/).
-            album_link = album_id[38:]
-            # Get the ID just to be sure.
-            album_id = album_id[album_id.rfind('/') + 1:]
-
-            release = Release()
-            band_data_ref.releases[album_id] = release
-            release.emid = album_id
-            release.name = cells[0].text
-            release.release_type = get_dict_key(RELEASE_TYPES, cells[1].text)
-            release.release_date = cells[2].text
-            release.link = album_link
-
-            album_rating_raw = cells[3].text.rstrip().strip()
-            parenthesis_open = album_rating_raw.find('(')
-            # Instantiate with data for invalid review and and ratings.
-            album_rating = -1
-            review_count = 0
-
-            if parenthesis_open != -1:
-                split_rating = album_rating_raw.split('(')
-
-                # Get the average rating and review count from a string looking like this: '8 (64%)'
-                if len(split_rating) == 2:
-                    review_count = int(split_rating[0].rstrip())
-                    album_rating = int(split_rating[1][:-2])
-
-            release.rating = album_rating
-            release.review_count = review_count
+            number_added_bands = self.add_connected_bands_to_queue(linked_bands)
 
+        # We have to throw everything away and start anew if the discography fails.
+        band_data_ref.releases = parse_fetched_page(self.parser_pool, disco_link, disco_future.result(),
+                                                    parse_discography_data, disco_link)
         logger.debug(f'<<< Crawling [{band_short_link}]')
         return band_data_ref
 
-    def add_connected_bands_to_queue(self, band_soup):
-        """Extracts all band links from the given band soup and adds them to the queue, resets the
+    def fetch_artist(self, artist_link):
+        """Downloads an artist page and has it parsed by the parser pool; see `parse_artist_page`."""
+        return parse_fetched_page(self.parser_pool, artist_link, fetch_page(artist_link), parse_artist_data, artist_link)
+
+    def add_connected_bands_to_queue(self, linked_bands):
+        """Adds the connected bands of the band that's crawled right now to the queue, resets the
             single mode flag and updates the progressbar to the new band amount.
 
-        :param band_soup: The band soup of the band that's crawled right now. A band soup is cooked
-            with`cook_soup(link_band)` (which expects the _full_ address of a band page).
+        :param linked_bands: The short links of the connected bands as extracted by
+            `get_connected_band_links` (see `parse_band_data`).
         :return The number of connected bands.
         """
-        band_rows = band_soup.find_all('tr', attrs={'class': 'lineupBandsRow'})
-        linked_bands = []
-
-        for band_row in band_rows:
-            actual_bands = band_row.contents[1].contents
-            for i in range(1, len(actual_bands), 2):
-                band_link = actual_bands[i].attrs['href'][37:]
-                if band_link not in linked_bands:
-                    linked_bands.append(band_link)
-                    self.band_links.put(band_link)
-
-        # Most of the time the crawler log is off, so this goes to the screen and the log file.
-        if len(linked_bands) == 0:
-            log_message = f'The chosen band does not have any outward connections.'
-        else:
-            log_message = f'Added {len(linked_bands)} connected bands to the crawl.'
-            self.band_errors[STATUS_INITIAL] = len(linked_bands) + 1
-
-        # The logger named Crawler normally is not used for console output because it interferes
-        # with the progress bar. That's why we use a different logger to notify the user about
-        # connected bands instead of the object's logger.
-        temp_logger = logging.getLogger('Connector')
-        temp_logger.info(log_message)
+        for band_link in linked_bands:
+            self.band_links.put(band_link)
+
+        self.frontier.add_links(linked_bands)
+        report_connected_bands(linked_bands, self.band_errors)
         # Switch off the single mode after the first call. At least for now. Maybe we'll do two
         # levels (or more) later.
         self.is_single_mode = False
@@ -568,6 +516,521 @@ class VisitBandThread(threading.Thread):
         return len(linked_bands)
 
 
+def record_crawl_error(band_link, band_errors, error_class, retry_scheduler: RetryScheduler, frontier: CrawlFrontier):
+    """Counts an unsuccessful crawl attempt of a band and schedules the next one if the error allows it.
+
+    :param band_link: Short link of the band that could not be crawled.
+    :param band_errors: The shared status dictionary of the crawl.
+    :param error_class: One of the ERROR_* constants of retry_scheduler.py.
+    :param retry_scheduler: The scheduler putting the band back into circulation once it's due.
+    :param frontier: The frontier of the crawl; the link is either pending again or failed.
+    :return: True if the band was scheduled for another attempt, False if it's unrecoverable.
+    """
+    attempts = band_errors[STATUS_RETRIED].get(band_link, 0) + 1
+    band_errors[STATUS_RETRIED][band_link] = attempts
+
+    if retry_scheduler.schedule(band_link, attempts, error_class):
+        frontier.mark_pending(band_link, attempts)
+        return True
+
+    logging.getLogger('Crawler').error(f'Giving up on {band_link} after {attempts} attempt(s) ({error_class}).')
+    band_errors[STATUS_ERROR][band_link] = error_class
+    frontier.mark_failed(band_link, attempts, error_class)
+    return False
+
+
+def get_artist_links(band: Band):
+    """Gets the short links of all artists in the lineup of a band."""
+    return [artist.link for artists in band.lineup.values() for artist in artists]
+
+
+def save_band_snapshot(band: Band, snapshot_store: SnapshotStore) -> bool:
+    """Appends the crawled band data as JSON to the snapshot store. This will later enable us to limit getting live
+        data if it is not needed.
+
+    :param band: The crawled band.
+    :param snapshot_store: The store of the crawl; the band is readable after its next `flush`.
+    :return: False if the band could not be serialized (e.g. a scraper left a Tag object in it).
+    """
+    try:
+        snapshot_store.append(band.country, band.link, JSONSerializer.serialize(band))
+    except (TypeError, ValueError):
+        logging.getLogger('Crawler').exception(f'Serializing the snapshot of {band.link} failed.')
+        return False
+
+    return True
+
+
+def make_band_from_snapshot(band_data) -> Band:
+    """Restores a Band with its lineup and releases from the dictionary of its snapshot (see `save_band_snapshot`).
+
+    :param band_data: The deserialized JSON of a band snapshot.
+    :return: The Band as it was crawled.
+    """
+    band = inflate_entity(Band(), band_data, ['lineup', 'releases', 'label'])
+    band.label = inflate_entity(Label(), band_data.get('label', {}))
+
+    for status, members in band_data.get('lineup', {}).items():
+        band.lineup[status] = [inflate_entity(Artist(), member_data) for member_data in members]
+
+    # JSON turned the keys into strings; the releases are keyed by their emid like in `parse_discography`.
+    for release_data in band_data.get('releases', {}).values():
+        release = inflate_entity(Release(), release_data)
+        band.releases[release.emid] = release
+
+    return band
+
+
+def inflate_entity(entity, entity_data, skipped_keys=()):
+    """Sets all values of a serialized entity (including attributes which are not fields like the pseudonym of an
+        Artist) on a new entity.
+    """
+    for key, value in entity_data.items():
+        if key not in skipped_keys:
+            setattr(entity, key, value)
+
+    return entity
+
+
+def set_base_url(base_url):
+    """Points the crawler to another address than M-A (e.g. the stand-in server of ma_standin.py). Must be called
+        before crawling starts.
+
+    :param base_url: The address including a trailing slash (e.g. http://127.0.0.1:8080/).
+    """
+    global EM_LINK_MAIN, EM_LINK_LABEL, EM_LINK_ARTISTS, EM_LINK_ALBUMS
+
+    EM_LINK_MAIN = base_url
+    EM_LINK_LABEL = EM_LINK_MAIN + 'labels/'
+    EM_LINK_ARTISTS = EM_LINK_MAIN + 'artists/'
+    EM_LINK_ALBUMS = EM_LINK_MAIN + 'albums/'
+
+
+def get_band_link(band_short_link):
+    return EM_LINK_MAIN + BANDS_DASH + band_short_link
+
+
+def get_band_id(band_short_link):
+    return band_short_link[band_short_link.rfind('/') + 1:]
+
+
+def get_discography_link(band_id):
+    return f"{EM_LINK_MAIN}band/discography/id/{band_id}/tab/all"
+
+
+def parse_band_page(band_soup, band_short_link, today):
+    """Scrapes the data of the band itself (without lineup and releases) from a band page.
+
+    :param band_soup: The cooked soup of the band page.
+    :param band_short_link: Short form of the band link (e.g. Darkthrone/146).
+    :param today: The date of the visit.
+    :return: A Band instance or `None` if the page is not a band page.
+    """
+    logger = logging.getLogger('Crawler')
+    logger.debug("  Start scraping from actual band.")
+    # Finds band name; needs to extract the ID later.
+    s = band_soup.find_all(attrs={"class": "band_name"})
+
+    if len(s) == 0:
+        logger.fatal(f"  Did not find the attribute band_name for {band_short_link}.")
+        logger.debug("  Band page source for reference:")
+        logger.debug(band_soup.text)
+        return None
+
+    # All data of a band is collected here.  Band members are referenced and collected in their
+    # own collection.
+    band_data_ref = Band()
+    band_data_ref.name = str(s[0].next_element.text)
+    band_data_ref.emid = get_band_id(band_short_link)
+    band_data_ref.link = band_short_link
+    band_data_ref.visited = str(today)
+
+    s = band_soup.find_all(attrs={"class": "float_left"})
+    # Take the last two letters of the link.
+    band_data_ref.country = s[1].contents[3].contents[0].attrs["href"][-2:]
+    band_data_ref.location = split_locations(s[1].contents[7].text)
+    band_data_ref.status = get_dict_key(BAND_STATUS, s[1].contents[11].text)
+    band_data_ref.formed = s[1].contents[15].text
+
+    s = band_soup.find_all(attrs={"class": "clear"})
+
+    # Get years into a list. Earlier incarnations of a band are ignored.
+    years_raw = s[3].contents[3].text.lstrip().rstrip()
+    years_raw = years_raw.replace('\t', '')
+    years_raw = years_raw.replace('\n', '')
+    year_tokens = years_raw.split(',')
+
+    for year_token in year_tokens:
+        # First one filters the earlier incarnation. The second one is for a bit more obscure
+        # use case. In that an earlier incarnation exists but has a comma in the name (leading
+        # for the latter portion to be split).
+        if '(as' not in year_token and ')' not in year_token:
+            band_data_ref.active.append(year_token.lstrip())
+
+    s = band_soup.find_all(attrs={"class": "float_right"})
+    band_data_ref.genres = split_genres(s[3].contents[3].contents[0])
+    band_data_ref.theme = s[3].contents[7].contents[0].split(', ')
+
+    label_node = s[3].contents[11].contents[0]
+
+    # The label from band page is only the active one. All others will only be available through
+    # the individual releases. TODO: Visit all releases and get more detailed info.
+    if isinstance(label_node, NavigableString):
+        label_name = str(s[3].contents[11].contents[0])
+        if label_name == "Unsigned/independent":
+            label_id = -1
+        else:
+            label_id = label_name
+        label_link = ""
+    else:
+        if len(label_node.contents) > 0:
+            label_name = label_node.contents[0]
+            label_link = label_node.attrs["href"][len(EM_LINK_LABEL):]
+            label_id = label_link[label_link.find('/') + 1:]
+        else:
+            logger.error("Label node appears to empty; dumping parent parent node.")
+            logger.error(str(s[3]))
+            raise ValueError('Label node must not be empty.')
+
+    band_data_ref.label.emid = label_id
+    band_data_ref.label.name = label_name
+    band_data_ref.label.link = label_link
+
+    return band_data_ref
+
+
+def parse_lineup(band_soup, band_data_ref):
+    """Scrapes the lineup from a band page. Every found lineup category is added as a key to the
+        lineup of the given band; the artists themselves are returned because their pages must be
+        visited before they can be added.
+
+    :param band_soup: The cooked soup of the band page.
+    :param band_data_ref: The band as returned by `parse_band_page`.
+    :return: A list of LineupEntry objects in the order of the page.
+    """
+    logger = logging.getLogger('Crawler')
+    logger.debug("  Scraping artists from actual band.")
+    lineup_entries = []
+    artists_and_bands = band_soup.find_all(attrs={"class": "ui-tabs-panel-content"})
+    artists_and_band_element = artists_and_bands[0]
+    actual_category = artists_and_band_element.contents[1].contents
+
+    # This check sets a flag if a band e.g. only has a "last known" lineup. In that case it is
+    # not "diverse".
+    lineup_finder = band_soup.find_all(attrs={"href": "#band_tab_members_all"})
+    is_lineup_diverse = True
+
+    if len(lineup_finder) == 0:
+        is_lineup_diverse = False
+
+    # Needs to be outside because it won't be set in every iteration of the loop.
+    header_category = ''
+
+    # The contents of actual_category starts with a LF (`Navigable String`) and has a LF at
+    # every even position. So we start at index 1 with actual payload and only take data from
+    # uneven indexes.
+    # Data at even indexes are from one of three categories:
+    #   * lineupHeaders: A header category like "Current" or "Past".
+    #   * lineupRow: An artist including instruments and time spans.
+    #   * lineupBandsRow: Other bands an artist played in. We do not need to parse this as we
+    #     connect each band member with the actual band.
+    for i in range(1, len(actual_category), 2):
+        actual_row = actual_category[i]
+        last_found_header = actual_row.attrs["class"][0]
+
+        # Normal case.
+        if last_found_header == "lineupHeaders":
+            header_category = actual_row.contents[1].contents[0].rstrip().lstrip().replace('\t', '')
+            # While crawling Tarot/4339 I found an unusual double space between Past and (Live).
+            # Let's remove it.
+            header_category = header_category.replace('  ', ' ')
+            logger.debug(f"  Found header: {header_category}")
+        # Special case where a band only has one line-up.
+        elif last_found_header == "lineupRow":
+            # If a band has only one lineup (current, last-known or past) the usual headers will
+            # be missing on the page. For active bands with changing lineup we get 'Current'.
+            # For a band with no lineup changes it will be empty.
+            if not is_lineup_diverse:
+                test_header2 = str(band_soup.find_all(attrs={"href": "#band_tab_members_current"})[0].contents[0])
+                header_category = lineup_mapping[test_header2]
+                logger.debug(f"  Did not find a header. Digging deeper: {header_category}")
+        elif last_found_header == "lineupBandsRow":
+            pass
+
+        if header_category not in band_data_ref.lineup.keys() and header_category != '':
+            # Add an empty lineup list for the found header_category if it was not in before.
+            # `header_category` will always have a valid value.
+            band_data_ref.lineup[header_category] = []
+        elif header_category == '':
+            # For the unlikely case that the header category is not found.
+            raise ValueError(f'The header category was empty while crawling {band_data_ref.name}.')
+
+        # Five elements for artists.
+        if len(actual_row) == 5:
+            lineup_entry = LineupEntry()
+            lineup_entry.category = header_category
+            lineup_entry.full_link = actual_row.contents[1].contents[1].attrs["href"]
+            # The leading part ist not needed and stripped
+            # (https://www.metal-archives.com/artists/).
+            lineup_entry.link = lineup_entry.full_link[len(EM_LINK_ARTISTS):]
+            lineup_entry.emid = lineup_entry.link[lineup_entry.link.find('/') + 1:]
+            lineup_entry.pseudonym = str(actual_row.contents[1].contents[1].contents[0])
+            lineup_entry.instruments = cut_instruments_alt(actual_row.contents[3].contents[0])
+            logger.debug(f"  Recording artist data for {lineup_entry.pseudonym}.")
+            lineup_entries.append(lineup_entry)
+
+    return lineup_entries
+
+
+def parse_artist_page(artist_soup, artist_link):
+    """Scrapes name, gender, age and origin from an artist page.
+
+    :param artist_soup: The cooked soup of the artist page; may be `None` if cooking failed.
+    :param artist_link: The full link of the artist page (only used for logging).
+    :return: A dictionary with the keys 'name', 'gender', 'age' and 'origin', ARTIST_SKIPPED if the
+        page is missing the member info or `None` if the soup is invalid.
+    """
+    logger = logging.getLogger('Crawler')
+
+    if artist_soup is None or artist_soup == 0:
+        logger.error(f'Crawling artist failed: {artist_link}')
+        return None
+
+    member_info = None
+    name = ""
+    gender = "U"
+    age = -1
+    origin = 'ZZ'
+
+    # The artist soup is not always reliably cooked. I'll leave the debug print logs in for now.
+    try:
+        member_info = artist_soup.find('div', attrs={'id': 'member_info'})
+    except Exception as e:
+        print('e >>>>>>>>>>>>>>>>>>>>')
+        print(f'artist_soup: {artist_soup}')
+        print()
+
+    if member_info is None:
+        print('n >>>>>>>>>>>>>>>>>>>>')
+        print(f'artist_soup: {artist_soup}')
+        logger.error(f'Crawling artist failed (member info is None): {artist_link}')
+        print('<<<<<<<<<<<<<<<<<<<<')
+        return ARTIST_SKIPPED
+
+    name = str(member_info.contents[7].contents[3].contents[0]).lstrip().rstrip()
+    gender = str(member_info.contents[9].contents[7].contents[0])
+
+    if gender in GENDER.values():
+        gender = get_dict_key(GENDER, gender)
+    else:
+        logger.error(f'Encountered unrecognized gender: {gender}')
+        gender = "U"
+
+    temp_age = str(member_info.contents[7].contents[7].contents[0]).lstrip().rstrip()
+    # Age strings contain either an N/A or are YY (born ...).
+    if 'N/A' not in temp_age:
+        age = temp_age[:temp_age.find(" ")]
+
+    if 'N/A' not in member_info.contents[9].contents[3].text:
+        origin = member_info.contents[9].contents[3].contents[1].attrs['href'][-2:]
+
+    return {'name': name, 'gender': gender, 'age': age, 'origin': origin}
+
+
+def parse_fetched_page(parser_pool, link, page_data, function, *args):
+    """Has a downloaded page parsed by the parser pool. Pages are cached before they are parsed; a page which cannot
+        be parsed (`function` raises an exception or returns `None`) is removed from the response cache again, so that
+        a retry downloads it anew.
+
+    :param parser_pool: The `ParserPool` of the crawl.
+    :param link: The full link of the page.
+    :param page_data: The raw bytes of the page as returned by `fetch_page`.
+    :param function: One of the parse_*_data functions.
+    :param args: The arguments of `function` after the page data.
+    :return: The result of `function`.
+    """
+    try:
+        result = parser_pool.parse(function, page_data, *args)
+    except Exception:
+        get_response_cache().invalidate(link)
+        raise
+
+    if result is None:
+        get_response_cache().invalidate(link)
+
+    return result
+
+
+# The parse_*_data functions turn the raw data of a page into plain objects. They run in the processes of a
+# `ParserPool`; their arguments and results are pickled.
+
+def parse_band_data(page_data, band_short_link, today, is_single_mode=False):
+    """Parses a band page with its lineup.
+
+    :param page_data: The raw bytes of the band page.
+    :param band_short_link: Short form of the band link (e.g. Darkthrone/146).
+    :param today: The date of the visit.
+    :param is_single_mode: Also extracts the links of the connected bands.
+    :return: A tuple of the Band (or `None` if the page is not a band page), the LineupEntry objects of
+        `parse_lineup` and the short links of `get_connected_band_links` (empty unless in single mode).
+    :raises PageError: If the page does not contain any text.
+    """
+    band_soup = make_soup_or_raise(get_band_link(band_short_link), page_data, PAGE_BAND)
+    band_data_ref = parse_band_page(band_soup, band_short_link, today)
+
+    if band_data_ref is None:
+        return None, [], []
+
+    lineup_entries = parse_lineup(band_soup, band_data_ref)
+    linked_bands = get_connected_band_links(band_soup) if is_single_mode else []
+
+    return band_data_ref, lineup_entries, linked_bands
+
+
+def parse_artist_data(page_data, artist_link):
+    """Parses an artist page; see `parse_artist_page`."""
+    return parse_artist_page(make_soup_or_raise(artist_link, page_data, PAGE_ARTIST), artist_link)
+
+
+def parse_discography_data(page_data, disco_link):
+    """Parses a discography page.
+
+    :return: The releases by emid as `parse_discography` adds them to a band.
+    """
+    band_data_ref = Band()
+    parse_discography(make_soup_or_raise(disco_link, page_data, PAGE_DISCOGRAPHY), band_data_ref)
+    return band_data_ref.releases
+
+
+def add_artist(band_data_ref, lineup_entry, artist_data, today):
+    """Creates an Artist from a lineup entry and the data of the artist page and adds it to the
+        lineup of the band.
+
+    :param band_data_ref: The band the artist is added to.
+    :param lineup_entry: The LineupEntry as returned by `parse_lineup`.
+    :param artist_data: Either the dictionary returned by `parse_artist_page`, ARTIST_KNOWN for an
+        artist which was not visited or ARTIST_SKIPPED (in which case nothing is added).
+    :param today: The date of the visit.
+    :return: The added Artist or `None` if it was skipped.
+    """
+    if artist_data == ARTIST_SKIPPED:
+        return None
+
+    name = artist_data['name']
+
+    # If the band member does not have a name in the database we simply use the
+    # pseudonym. This unfortunately overwrites the name with whatever pseudonym we found
+    # last.
+    if 'N/A' in name:
+        name = lineup_entry.pseudonym
+
+    artist = Artist()
+    band_data_ref.lineup[lineup_entry.category].append(artist)
+    artist.emid = lineup_entry.emid
+    artist.link = lineup_entry.link
+    artist.name = name
+    artist.gender = artist_data['gender']
+    artist.age = artist_data['age']
+    artist.origin = artist_data['origin']
+    artist.pseudonym = lineup_entry.pseudonym
+    artist.instruments = lineup_entry.instruments
+    artist.visited = str(today)
+
+    return artist
+
+
+def parse_discography(disco_soup, band_data_ref):
+    """Scrapes all releases from a discography page and adds them to the given band.
+
+    :param disco_soup: The cooked soup of the discography page (tab "all").
+    :param band_data_ref: The band the releases are added to.
+    """
+    logger = logging.getLogger('Crawler')
+    table = disco_soup.find('table', attrs={'class': 'display discog'})
+    table_body = table.find('tbody')
+    rows = table_body.find_all('tr')
+
+    for row in rows:
+        cells = row.findAll("td")
+
+        # Guard clause for the unlikely case if a band has no releases.
+        if len(cells) == 1:
+            logger.debug(f"  No releases found for {band_data_ref.name}.")
+            continue
+
+        # TODO: Visit release page to get details like the actual release date instead of only the year.
+        album_id = cells[0].contents[0].attrs['href']
+        # We don't need the fixed part of the link (https://www.metal-archives.com/albums/).
+        album_link = album_id[len(EM_LINK_ALBUMS):]
+        # Get the ID just to be sure.
+        album_id = album_id[album_id.rfind('/') + 1:]
+
+        release = Release()
+        band_data_ref.releases[album_id] = release
+        release.emid = album_id
+        release.name = cells[0].text
+        release.release_type = get_dict_key(RELEASE_TYPES, cells[1].text)
+        release.release_date = cells[2].text
+        release.link = album_link
+
+        album_rating_raw = cells[3].text.rstrip().strip()
+        parenthesis_open = album_rating_raw.find('(')
+        # Instantiate with data for invalid review and and ratings.
+        album_rating = -1
+        review_count = 0
+
+        if parenthesis_open != -1:
+            split_rating = album_rating_raw.split('(')
+
+            # Get the average rating and review count from a string looking like this: '8 (64%)'
+            if len(split_rating) == 2:
+                review_count = int(split_rating[0].rstrip())
+                album_rating = int(split_rating[1][:-2])
+
+        release.rating = album_rating
+        release.review_count = review_count
+
+
+def get_connected_band_links(band_soup):
+    """Extracts the short links of all bands the artists of a band page played in.
+
+    :param band_soup: The cooked soup of the band page.
+    :return: A list of unique short band links.
+    """
+    band_rows = band_soup.find_all('tr', attrs={'class': 'lineupBandsRow'})
+    linked_bands = []
+
+    for band_row in band_rows:
+        actual_bands = band_row.contents[1].contents
+        for i in range(1, len(actual_bands), 2):
+            band_link = actual_bands[i].attrs['href'][len(EM_LINK_MAIN + BANDS_DASH):]
+            if band_link not in linked_bands:
+                linked_bands.append(band_link)
+
+    return linked_bands
+
+
+def report_connected_bands(linked_bands, band_errors):
+    """Notifies the user about the bands added in single mode and records the new number of
+        initial bands.
+
+    :param linked_bands: The list of connected short band links.
+    :param band_errors: The shared status dictionary of the crawl.
+    """
+    # Most of the time the crawler log is off, so this goes to the screen and the log file.
+    if len(linked_bands) == 0:
+        log_message = f'The chosen band does not have any outward connections.'
+    else:
+        log_message = f'Added {len(linked_bands)} connected bands to the crawl.'
+        band_errors[STATUS_INITIAL] = len(linked_bands) + 1
+
+    # The logger named Crawler normally is not used for console output because it interferes
+    # with the progress bar. That's why we use a different logger to notify the user about
+    # connected bands instead of the object's logger.
+    temp_logger = logging.getLogger('Connector')
+    temp_logger.info(log_message)
+
+
 def make_band_list(country_links):
     logger = logging.getLogger('Crawler')
     logger.debug('Started Band List Visitor')
@@ -576,11 +1039,13 @@ def make_band_list(country_links):
     # Used as a very crude way to see if duplicate data is sent by MA.
     json_strings = []
 
+    # The first column of every row is a link to the band page.
+    band_anchor = f"<a href='{EM_LINK_MAIN}{BANDS_DASH}"
+
     while country_links.qsize() != 0:
         link_country_temp = country_links.get_nowait()
         logger.debug(f'  Working on: {link_country_temp}')
-        http = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
-        country_json = http.request('GET', link_country_temp)
+        country_json = get_session().request(link_country_temp)
         json_data_string = country_json.data.decode('utf-8')
 
         if json_data_string not in json_strings or json_data_string != '0':
@@ -606,7 +1071,7 @@ def make_band_list(country_links):
 
         for band in json_data["aaData"]:
             # We do not need the leading "'<a href=\'https://www.metal-archives.com/bands/".
-            partial_link = band[0][46:band[0].rfind("'>")]
+            partial_link = band[0][len(band_anchor):band[0].rfind("'>")]
 
             if partial_link not in band_links:
                 band_links.append(partial_link)
@@ -614,9 +1079,6 @@ def make_band_list(country_links):
                 logger.error(f'  Found a duplicate band link in MA [{partial_link}].')
                 skipped_links += 1
 
-        # Not waiting is much faster but generates more errors.
-        time.sleep(1.0)
-
     return band_links
 
 
@@ -685,10 +1147,11 @@ def make_active_list(raw_activity):
 
 
 def apply_to_db(band: Band, db_handle, is_detailed):
-    logger = logging.getLogger('Crawler')
-    logger.debug("Apply to DB...")
+    apply_batch_to_db([band], db_handle, is_detailed)
 
-    # Serialize a Band object and massage it so that the DB model understands it.
+
+def make_band_dict(band: Band):
+    """Serializes a Band object and massages it so that the DB model understands it."""
     temp_band_dict = JSONSerializer.serialize(band)
     # TODO: Find out if these are necessary.
     del temp_band_dict['lineup']
@@ -696,62 +1159,117 @@ def apply_to_db(band: Band, db_handle, is_detailed):
     # DB expects date objects instead of strings.
     temp_band_dict['active'] = make_active_list(band.active)
     temp_band_dict['visited'] = datetime.strptime(band.visited, "%Y-%m-%d").date()
+    temp_band_dict['formed'] = make_formation_date(band.formed)
+
+    return temp_band_dict
+
 
-    if band.formed != 'N/A':
-        temp_band_dict['formed'] = date(int(band.formed), 1, 1)
+def make_formation_date(formed):
+    """Converts the formation year of a band into the date the DB expects; None if it's unknown ('N/A')."""
+    if formed != 'N/A':
+        return date(int(formed), 1, 1)
     else:
-        temp_band_dict['formed'] = None
+        return None
 
-    logger.debug(f'  Writing data for band {band.link}.')
-    db_handle.add_band(temp_band_dict)
 
-    for emid, release in band.releases.items():
-        # We need to copy the dict first because we need to make a date object for the release date.
-        release_copy = JSONSerializer.serialize(release)
-        # This is not the accurate date, only the year.
-        date_sanitized = release_copy['release_date']
+def make_release_dict(release: Release):
+    # We need to copy the dict first because we need to make a date object for the release date.
+    release_copy = JSONSerializer.serialize(release)
+    release_copy['release_date'] = make_release_date(release_copy['release_date'])
+    return release_copy
 
-        # If the date is unknown, it sometimes comes as the string "0000". In this case we use 1900
-        # as a default .
-        if date_sanitized == "0000":
-            date_sanitized = 1900
 
-        date_sanitized = int(date_sanitized)
-        date_sanitized = date(date_sanitized, 1, 1)
+def make_release_date(release_date):
+    # This is not the accurate date, only the year.
+    date_sanitized = release_date
 
-        release_copy['release_date'] = date_sanitized
-        logger.debug(f'  Writing data for release {release_copy["name"]}.')
-        db_handle.add_release(release_copy)
-        db_handle.band_recorded_release(band.emid, emid)
+    # If the date is unknown, it sometimes comes as the string "0000". In this case we use 1900
+    # as a default .
+    if date_sanitized == "0000":
+        date_sanitized = 1900
 
-    for status, members in band.lineup.items():
-        for member in members:
-            temp_member_dict = JSONSerializer.serialize(member)
-            temp_member_dict['visited'] = datetime.strptime(member.visited, "%Y-%m-%d").date()
-            logger.debug(f"  Writing data for artist {temp_member_dict['link']}.")
+    date_sanitized = int(date_sanitized)
+    return date(date_sanitized, 1, 1)
 
-            try:
-                db_handle.add_member(temp_member_dict)
-            except Exception as e:
-                logger.exception(f'Adding the band member was unsuccessful: {member.link}', e)
 
-            for instrument in member.instruments:
-                try:
-                    db_handle.member_played_in_band(
-                        member.emid,
-                        band.emid,
-                        instrument[0],
-                        member.pseudonym,
-                        make_time_spans(instrument[1]),
-                        get_dict_key(MEMBER_STATUS, status)
-                    )
-                except Exception as e:
-                    logger.exception("Making member connection failed.")
-                    logger.error(member)
-                    logger.error(band.emid)
-                    logger.error(instrument)
-                    logger.error(member.pseudonym)
-                    logger.error(get_dict_key(MEMBER_STATUS, status))
+@dataclass
+class WriteBatch:
+    """The dictionaries and relationships of bands as the bulk methods of a database handle take them."""
+    band_dicts: List = field(default_factory=list)
+    release_dicts: List = field(default_factory=list)
+    member_dicts: Dict = field(default_factory=dict)
+    recordings: List = field(default_factory=list)
+    stints: List = field(default_factory=list)
+
+
+def make_write_batch(bands) -> WriteBatch:
+    """Converts bands with all their releases and members for `write_batch_to_db`. The result does not depend on the
+        database and can be made in another process.
+
+    :param bands: A list of Band objects.
+    :return: The WriteBatch of the bands.
+    """
+    logger = logging.getLogger('Crawler')
+    write_batch = WriteBatch()
+
+    for band in bands:
+        logger.debug(f'  Writing data for band {band.link}.')
+        write_batch.band_dicts.append(make_band_dict(band))
+
+        for emid, release in band.releases.items():
+            write_batch.release_dicts.append(make_release_dict(release))
+            write_batch.recordings.append((band.emid, emid))
+
+        for status, members in band.lineup.items():
+            for member in members:
+                # An artist may appear in more than one lineup category (or band of the batch).
+                if member.emid not in write_batch.member_dicts:
+                    temp_member_dict = JSONSerializer.serialize(member)
+                    temp_member_dict['visited'] = datetime.strptime(member.visited, "%Y-%m-%d").date()
+                    write_batch.member_dicts[member.emid] = temp_member_dict
+
+                for instrument in member.instruments:
+                    write_batch.stints.append({
+                        'member_id': member.emid,
+                        'band_id': band.emid,
+                        'instrument': instrument[0],
+                        'pseudonym': member.pseudonym,
+                        'time_frame': make_time_spans(instrument[1]),
+                        'status': get_dict_key(MEMBER_STATUS, status)
+                    })
+
+    return write_batch
+
+
+def write_batch_to_db(write_batch: WriteBatch, db_handle):
+    """Writes a WriteBatch using the bulk methods of the database handle in one transaction.
+
+    :param write_batch: The batch as made by `make_write_batch`.
+    :param db_handle: The database handle.
+    """
+    def write():
+        db_handle.add_bands(write_batch.band_dicts)
+        db_handle.add_releases(write_batch.release_dicts)
+        db_handle.add_members(list(write_batch.member_dicts.values()))
+        db_handle.bands_recorded_releases(write_batch.recordings)
+        db_handle.members_played_in_bands(write_batch.stints)
+
+    # A band is never written partially; a later crawl would skip it.
+    db_handle.write_in_transaction(write)
+
+
+def apply_batch_to_db(bands, db_handle, is_detailed):
+    """Writes bands with all their releases and members using the bulk methods of the database
+        handle in one transaction. The number of round-trips does not depend on the number of bands
+        or their entities.
+
+    :param bands: A list of crawled Band objects.
+    :param db_handle: The database handle.
+    :param is_detailed: A parameter that is not used and might be useful someday.
+    """
+    logger = logging.getLogger('Crawler')
+    logger.debug(f"Apply {len(bands)} band(s) to DB...")
+    write_batch_to_db(make_write_batch(bands), db_handle)
 
     # Add labels if mode is detailed.
     if is_detailed:
@@ -768,68 +1286,148 @@ def cook_soup(link, retry_count=5):
         than 1).
     :return: Either a BeautifulSoup object of the requested page or `None` if the request failed.
     """
+    try:
+        return fetch_soup(link, retry_count)
+    except PageError:
+        return None
+
+
+def fetch_soup(link, retry_count=5):
+    """Gets a web page like `cook_soup` does but tells why it failed.
+
+    :param link: URL to get the web page from.
+    :param retry_count: Set to any number greater than 0 (will be set internally to 1 if smaller
+        than 1).
+    :return: A BeautifulSoup object of the requested page.
+    :raises PageError: If the page could not be cooked.
+    """
+    return make_soup_or_raise(link, fetch_page(link, retry_count))
+
+
+def fetch_page(link, retry_count=5):
+    """Gets the raw data of a valid web page (from the response cache if it's fresh) without parsing it.
+
+    :param link: URL to get the web page from.
+    :param retry_count: Set to any number greater than 0 (will be set internally to 1 if smaller
+        than 1).
+    :return: The raw bytes of the page.
+    :raises PageError: If the page could not be fetched.
+    """
     logger = logging.getLogger('Crawler')
     # Set to 1 if value is invalid.
     if retry_count < 1:
         retry_count = 1
 
     logger.debug(f"Cooking soup for {link}")
+    cache = get_response_cache()
+    cache_entry = cache.lookup(link)
+
+    if cache_entry is not None and cache_entry.is_fresh:
+        return cache_entry.data
+
+    if cache.is_cache_only:
+        logger.debug(f"  {link} is not cached.")
+        raise PageError(link, ERROR_NOT_FOUND)
+
+    validators = cache_entry.get_validators() if cache_entry is not None else None
 
     while retry_count > 0:
-        # Initialize the pool manager with certificates. There will be nasty warnings for every call
-        # if you don't.
-        http = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
-        web_page = None
         retry_count -= 1
 
         try:
-            web_page = http.request('GET', link, timeout=10.0)
-        except ReadTimeoutError as e:
-            logger.exception(e, exc_info=True)
-        except MaxRetryError as e:
+            web_page = get_session().request(link, headers=validators)
+        except HTTPError as e:
             logger.exception(e, exc_info=True)
-
-        if web_page is None:
             logger.error("Received no data.")
-            retry_count = 0
-        elif len(web_page.data) != 0:
-            web_page_string = web_page.data.decode("utf-8")
-
-            if "Forbidden.\n" == web_page_string:
-                time.sleep(.5)
-                logger.debug(f"  Trying again... ({retry_count} to go)")
-            elif "Error 404 -" in web_page_string:
-                retry_count = 0
-                logger.error(f'404 for link: {link}')
-            elif "not found" in web_page_string:
-                logger.info(f'Not found: {link}')
-                # Ignore use case for now but log the page string.
-                retry_count = -1
-                logger.debug(web_page_string)
-            elif 'may refer to' in web_page_string:
-                retry_count = 0
-                logger.error(f'May refer: {link}')
-            else:
-                # Breaks out of the loop.
-                retry_count = -1
-        else:
-            logger.error(f'Data Length: {str(len(web_page.data))}\n{web_page.data}')
-            logger.debug(f"  Trying again... ({retry_count} to go)")
+            raise PageError(link, ERROR_TIMEOUT)
+
+        if web_page.status == 304 and cache_entry is not None:
+            cache.refresh(cache_entry, web_page.headers)
+            return cache_entry.data
+
+        page_status = check_page(link, web_page.data)
+
+        if page_status == PAGE_VALID:
+            cache.store(link, web_page.data, web_page.headers)
+            return web_page.data
+        elif page_status == PAGE_INVALID:
+            raise PageError(link, ERROR_NOT_FOUND)
+
+        logger.debug(f"  Trying again... ({retry_count} to go)")
 
     # Error case: No web page data after n retries.
-    if retry_count == 0:
-        return None
+    raise PageError(link, ERROR_FORBIDDEN)
+
 
-    soup = BeautifulSoup(web_page.data.decode('utf-8', 'ignore'), "html.parser")
+def check_page(link, page_data):
+    """Checks the raw data of a requested page for the different answers of M-A.
+
+    :param link: URL of the web page (only used for logging).
+    :param page_data: The raw bytes of the answer.
+    :return: PAGE_VALID if the page can be cooked, PAGE_RETRY if it's worth trying again (e.g. after
+        a *Forbidden*) and PAGE_INVALID if the page does not exist.
+    """
+    logger = logging.getLogger('Crawler')
+
+    if len(page_data) == 0:
+        logger.error(f'Data Length: {str(len(page_data))}\n{page_data}')
+        return PAGE_RETRY
+
+    web_page_string = page_data.decode("utf-8")
+
+    if "Forbidden.\n" == web_page_string:
+        return PAGE_RETRY
+    elif "Error 404 -" in web_page_string:
+        logger.error(f'404 for link: {link}')
+        return PAGE_INVALID
+    elif "not found" in web_page_string:
+        logger.info(f'Not found: {link}')
+        # Ignore use case for now but log the page string.
+        logger.debug(web_page_string)
+    elif 'may refer to' in web_page_string:
+        logger.error(f'May refer: {link}')
+        return PAGE_INVALID
+
+    return PAGE_VALID
+
+
+def make_soup(link, page_data, page_type=None):
+    """Parses the raw data of a valid page.
+
+    :param link: URL of the web page (only used for logging).
+    :param page_data: The raw bytes of the page.
+    :param page_type: One of the page types of page_parser.py to parse only the regions which are scraped or `None`
+        to parse the whole page.
+    :return: Either a BeautifulSoup object of the page or `None` if it does not contain any text.
+    """
+    soup = parse_page(page_data, page_type)
+
+    # None of the regions were found. The whole page is needed to tell what's wrong with it.
+    if page_type is not None and soup.text == '':
+        soup = parse_page(page_data, is_partial=False)
 
     # Extra safeguard for extremely rare cases.
     if soup.text == '':
-        logger.error(f'Soup text is {soup.text}. Data Length: {str(len(web_page.data))}\n{web_page.data}')
+        logging.getLogger('Crawler').error(
+            f'Soup text is {soup.text}. Data Length: {str(len(page_data))}\n{page_data}')
         soup = None
 
     return soup
 
 
+def make_soup_or_raise(link, page_data, page_type=None):
+    """Parses the raw data of a valid page like `make_soup` does.
+
+    :raises PageError: If the page does not contain any text.
+    """
+    soup = make_soup(link, page_data, page_type)
+
+    if soup is None:
+        raise PageError(link, ERROR_PARSE)
+
+    return soup
+
+
 def cut_instruments_alt(instrument_string):
     instruments = []
     instrument_string = instrument_string.rstrip().lstrip().replace('\t', '').replace(' ', '')
@@ -997,16 +1595,14 @@ def crawl_country(country_short):
 
     logger = logging.getLogger('Crawler')
     logger.debug(f">>> Crawling Country: {COUNTRY_NAMES[country_short]}")
-    link_country = "https://www.metal-archives.com/browse/ajax-country/c/" + country_short
-    http = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+    link_country = f"{EM_LINK_MAIN}browse/ajax-country/c/{country_short}"
 
     while True:
-        country_json = http.request('GET', link_country)
+        country_json = get_session().request(link_country)
         json_data_string = country_json.data.decode("utf-8")
 
         if "Forbidden." in json_data_string or json_data_string == "0":
             logger.debug("  trying again...")
-            time.sleep(.5)
         else:
             break
 
@@ -1021,7 +1617,7 @@ def crawl_country(country_short):
     link_suffix = "/json/1?sEcho=1&iDisplayStart="
 
     band_links = None
-    alt_link = "https://www.metal-archives.com/browse/ajax-country/c/{0}/json/1?sEcho={1:.0f}&iDisplayStart={2}"
+    alt_link = EM_LINK_MAIN + "browse/ajax-country/c/{0}/json/1?sEcho={1:.0f}&iDisplayStart={2}"
 
     # I reworked this section multiple times but kept running into trouble infrequently. Running
     # twice (and slowly) seems to do the trick.
@@ -1055,7 +1651,7 @@ def crawl_countries():
     """
 
     country_links = []
-    country_soup = cook_soup("https://www.metal-archives.com/browse/country", retry_count=10)
+    country_soup = cook_soup(f"{EM_LINK_MAIN}browse/country", retry_count=10)
 
     if country_soup is not None:
         s = country_soup.find_all(attrs={"class": "countryCol"})
@@ -1081,25 +1677,93 @@ def read_user_input():
     print('Received request to quit. Stand by for threads to finish.')
 
 
-def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
+def load_visited_entities(db_handle):
+    """Gets all previously visited bands and artists from the database. We do it once and give the
+        collection to all workers. It was formerly done inside the thread initialization, but it
+        took longer and longer the larger the database got.
+
+    :param db_handle: The database handle.
+    :return: The dictionary with all known 'bands' and 'artists' (see `get_all_links`).
+    """
+    logger = logging.getLogger('Crawler Prep')
+    time_start = datetime.now()
+    visited_entities = db_handle.get_all_links()
+    time_delta = datetime.now() - time_start
+    amount_bands = len(visited_entities["bands"])
+    amount_artists = len(visited_entities["artists"])
+    prep_report = f'Preparing previously visited {amount_bands} bands and {amount_artists} artists took {time_delta}.'
+    logger.info(prep_report)
+
+    return visited_entities
+
+
+def make_bands_status():
+    """Creates the status dictionary shared by all workers of a crawl.
+
+    :return: A dictionary with the unrecoverable bands (and their error class), the number of unsuccessful attempts
+        per retried band, the skipped and added bands, the number of initial bands and the accumulated time in seconds
+        spent writing to the database.
+    """
+    return {
+        STATUS_ERROR: {},
+        STATUS_RETRIED: {},
+        STATUS_SKIPPED: {},
+        STATUS_ADDED: {},
+        STATUS_INITIAL: 0,
+        STATUS_DB_WRITE_TIME: 0.0
+    }
+
+
+def prepare_crawl(band_links, db_handle, is_single_mode=False, is_resume=False):
+    """Opens the crawl frontier and either records a new crawl in it or continues the recorded one.
+
+    :param band_links: A list of short band links; ignored if `is_resume` is set.
+    :param db_handle: The database handle used to load the visited entities of a new crawl.
+    :param is_single_mode: Indicates if the connected bands of the first band will be added.
+    :param is_resume: Continues the crawl recorded in the frontier.
+    :return: A tuple of the frontier, the band links to crawl, the visited entities, the status dictionary of the
+        crawl and the single mode flag.
+    """
+    logger = logging.getLogger('Crawler Prep')
+    frontier = CrawlFrontier()
+    bands_status = make_bands_status()
+
+    if is_resume:
+        band_links, visited_entities, is_single_mode = frontier.resume()
+        bands_status[STATUS_INITIAL] = frontier.get_initial_count()
+
+        # Restore the status of the links visited before the crawl stopped.
+        for link, state, status, attempts in frontier.get_link_records():
+            if attempts > 0:
+                bands_status[STATUS_RETRIED][link] = attempts
+
+            if state == STATE_DONE:
+                bands_status[status][link] = ''
+            elif state == STATE_FAILED:
+                bands_status[STATUS_ERROR][link] = status
+    else:
+        if frontier.can_resume():
+            logger.warning('Discarding the unfinished crawl of the crawl frontier.')
+
+        visited_entities = load_visited_entities(db_handle)
+        frontier.start(band_links, visited_entities, is_single_mode)
+
+    return frontier, band_links, visited_entities, bands_status, is_single_mode
+
+
+def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False, is_resume=False):
     # TODO: Add comment and parameter description.
+    # Returns the status dictionary of the crawl (see `make_bands_status`) and the request counters.
     logger = logging.getLogger('Crawler Prep')
     logger.info("Starting band crawl. All logging is diverted to file. Prepping database:")
+    frontier, band_links, visited_entities, bands_status, is_single_mode = prepare_crawl(
+        band_links, db_handle, is_single_mode, is_resume)
     local_bands_queue = queue.Queue()
 
     # Put links from list into queue.
     for link in band_links:
         local_bands_queue.put_nowait(link)
 
-    # We do it once and give the collection to all threads. It was formerly done inside the thread
-    # initialization, but it took longer and longer the larger the database got.
-    time_start = datetime.now()
-    visited_entities = db_handle.get_all_links()
-    time_delta = datetime.now() - time_start
-    amount_bands = len(visited_entities["bands"])
-    amount_artists = len(visited_entities["artists"])
-    prep_report = f'Preparing previously visited {amount_bands} bands and {amount_artists} artists took {time_delta}.'
-    logger.info(prep_report)
     band_word = 'band'
 
     if local_bands_queue.qsize() > 1:
@@ -1110,7 +1774,6 @@ def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
     visited_bands = []
 
     threads = []
-    lock = threading.Lock()
     thread_count = CRAWLER_THREAD_COUNT
 
     if len(band_links) < CRAWLER_THREAD_COUNT:
@@ -1119,20 +1782,21 @@ def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
         logger.error("Thread count is outside safe range from 1 to 8. Overriding to 4.")
         thread_count = 4
 
-    bands_status = {
-        STATUS_ERROR: {},
-        STATUS_SKIPPED: {},
-        STATUS_ADDED: {},
-        STATUS_INITIAL: 0
-    }
+    artist_registry = ArtistRegistry()
+    retry_scheduler = RetryScheduler()
+    # The workers must crawl the same site (see `set_base_url`).
+    parser_pool = ParserPool(initializer=set_base_url, initargs=(EM_LINK_MAIN,))
+    db_writer = DatabaseWriterThread(db_handle, bands_status, frontier, is_detailed, snapshot_store=SnapshotStore())
+    db_writer.start()
 
     print("\nPress Q and <ENTER> to stop crawl. All threads will finish their current work and then stop.\n")
 
     # Create threads.
     for i in range(0, thread_count):
         thread = VisitBandThread(
-            str(i), local_bands_queue, lock, db_handle, bands_status, visited_entities,
-            progress_bar, visited_bands, is_detailed, is_single_mode)
+            str(i), local_bands_queue, db_writer, bands_status, visited_entities,
+            progress_bar, visited_bands, is_detailed, is_single_mode, artist_registry, frontier, retry_scheduler,
+            parser_pool)
         threads.append(thread)
 
     # If we already start the threads in above loop, the queue count at initialization will not be the same for
@@ -1148,8 +1812,29 @@ def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
         t.join()
 
     user_input.join(1)
+    parser_pool.close()
+    db_writer.close()
 
     progress_bar.finish()
+    frontier.close()
+    print_crawl_report(band_links, bands_status, get_session().stats, artist_registry, retry_scheduler,
+                       parser_pool)
+
+    return bands_status, get_session().stats
+
+
+def print_crawl_report(band_links, bands_status, request_stats, artist_registry=None, retry_scheduler=None,
+                       parser_pool=None):
+    """Logs the results of a finished crawl and saves the short links of all bands which were not
+        added to the database into a file.
+
+    :param band_links: The list of short band links the crawl was started with.
+    :param bands_status: The status dictionary of the crawl.
+    :param request_stats: The request counters of the used HTTP session.
+    :param artist_registry: The `ArtistRegistry` of the crawl, if any.
+    :param retry_scheduler: The `RetryScheduler` of the crawl, if any.
+    :param parser_pool: The `ParserPool` of the crawl, if any.
+    """
     logger = logging.getLogger('Post-Crawler')
 
     # Print all bands which were not added to the database to the log and save the short links into
@@ -1162,7 +1847,7 @@ def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
         unrecoverable_file = open(unrecoverable_file_name, "w", encoding="utf-8")
 
         for key, value in bands_status[STATUS_ERROR].items():
-            logger.error(f'  {key}')
+            logger.error(f'  {key} ({value})' if value else f'  {key}')
             unrecoverable_file.write(f'{key}\n')
 
         unrecoverable_file.close()
@@ -1180,4 +1865,23 @@ def crawl_bands(band_links, db_handle, is_detailed=False, is_single_mode=False):
     if len(bands_status[STATUS_ADDED]) > 0:
         logger.info(f'{len(bands_status[STATUS_ADDED])} of {band_count} bands were added.')
 
+    recovered_count = len([link for link in bands_status[STATUS_RETRIED] if link in bands_status[STATUS_ADDED]])
+
+    if recovered_count > 0:
+        logger.info(f'{recovered_count} bands were added after a retry.')
+
+    logger.info(f'Writing to the database took {bands_status[STATUS_DB_WRITE_TIME]:.1f} s.')
+    logger.info(f'HTTP session: {request_stats}.')
+    logger.info(f'Response cache: {get_response_cache().stats}.')
+
+    if artist_registry is not None:
+        logger.info(f'Artist pages: {artist_registry}.')
+
+    if retry_scheduler is not None:
+        logger.info(f'Retries: {retry_scheduler}.')
+
+    if parser_pool is not None:
+        logger.info(f'Parsing: {parser_pool}.')
+
+    logger.info(f'Request rate: {get_rate_limiter()}.')
     logger.debug('Finished crawling bands,')
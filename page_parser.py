@@ -0,0 +1,120 @@
+"""Turns the raw data of M-A pages into BeautifulSoup trees. The parser backend is pluggable: lxml is a C parser and
+several times faster than Python's html.parser, which is used if lxml is not installed. For the pages of a band crawl
+only the regions the scrapers of metal_crawler.py look at are parsed (partial parsing); everything else (menus,
+scripts, comments, ...) never becomes part of the tree. A strained tree gives the scrapers the same elements in the
+same order as the full tree, so they extract the same data from both.
+"""
+
+from importlib.util import find_spec
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from settings import CRAWLER_PARSER_BACKEND, CRAWLER_PARSER_PARTIAL
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+PARSER_AUTO = 'auto'
+PARSER_HTML = 'html.parser'
+PARSER_LXML = 'lxml'
+PARSER_BACKENDS = [PARSER_AUTO, PARSER_HTML, PARSER_LXML]
+
+# Same names as the entity types of response_cache.py.
+PAGE_BAND = 'band'
+PAGE_ARTIST = 'artist'
+PAGE_DISCOGRAPHY = 'discography'
+
+
+class RegionStrainer(SoupStrainer):
+    """Keeps every element (with all its descendants) which has one of the given classes, IDs or link targets. A
+        plain `SoupStrainer` can only combine conditions on different attributes with AND.
+    """
+
+    def __init__(self, classes=(), ids=(), hrefs=()):
+        super().__init__()
+        self.classes = set(classes)
+        self.ids = set(ids)
+        self.hrefs = set(hrefs)
+
+    def is_region(self, attrs) -> bool:
+        """Checks the raw attributes of a tag which is about to be parsed.
+
+        :param attrs: A dictionary of attribute names and values; `class` may be a string or a list.
+        :return: True if the tag starts a region.
+        """
+        if attrs is None:
+            return False
+
+        class_value = attrs.get('class', ())
+
+        if isinstance(class_value, str):
+            class_value = class_value.split()
+
+        return (any(class_name in self.classes for class_name in class_value) or attrs.get('id') in self.ids
+                or attrs.get('href') in self.hrefs)
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        # Called by Beautiful Soup 4.13 and newer.
+        return self.is_region(attrs)
+
+    def search_tag(self, markup_name=None, markup_attrs=None):
+        # Called by older versions of Beautiful Soup while parsing.
+        if markup_attrs is not None and not isinstance(markup_attrs, dict):
+            markup_attrs = dict(markup_attrs)
+
+        return markup_name if self.is_region(markup_attrs) else None
+
+
+# The regions used by `metal_crawler.parse_band_page`, `parse_lineup` and `get_connected_band_links`. The lineup tabs
+# tell if a band has more than one lineup.
+BAND_PAGE_STRAINER = RegionStrainer(
+    classes=['band_name', 'float_left', 'float_right', 'clear', 'ui-tabs-panel-content'],
+    hrefs=['#band_tab_members_all', '#band_tab_members_current'])
+# The region used by `metal_crawler.parse_artist_page`.
+ARTIST_PAGE_STRAINER = RegionStrainer(ids=['member_info'])
+# The region used by `metal_crawler.parse_discography`.
+DISCOGRAPHY_PAGE_STRAINER = RegionStrainer(classes=['discog'])
+
+PAGE_STRAINERS = {
+    PAGE_BAND: BAND_PAGE_STRAINER,
+    PAGE_ARTIST: ARTIST_PAGE_STRAINER,
+    PAGE_DISCOGRAPHY: DISCOGRAPHY_PAGE_STRAINER
+}
+
+
+def is_lxml_available() -> bool:
+    return find_spec('lxml') is not None
+
+
+def get_parser_backend(backend=CRAWLER_PARSER_BACKEND) -> str:
+    """Resolves the name of a parser backend.
+
+    :param backend: One of PARSER_BACKENDS.
+    :return: The name of the Beautiful Soup parser to use ('auto' is lxml if it's installed and html.parser otherwise).
+    :raises ValueError: If the backend is unknown or lxml is requested but not installed.
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f'Unknown parser backend {backend}. Use one of {", ".join(PARSER_BACKENDS)}.')
+
+    if backend == PARSER_AUTO:
+        return PARSER_LXML if is_lxml_available() else PARSER_HTML
+
+    if backend == PARSER_LXML and not is_lxml_available():
+        raise ValueError('The parser backend lxml is not installed (pip install lxml).')
+
+    return backend
+
+
+def parse_page(page_data, page_type=None, backend=CRAWLER_PARSER_BACKEND, is_partial=CRAWLER_PARSER_PARTIAL):
+    """Parses the raw data of a page.
+
+    :param page_data: The raw bytes of the page.
+    :param page_type: One of the PAGE_* types or `None` for any other page; only the pages of a known type can be
+        parsed partially.
+    :param backend: One of PARSER_BACKENDS.
+    :param is_partial: Only parses the regions of a page the scrapers need.
+    :return: A BeautifulSoup object of the page (or of its regions).
+    """
+    strainer = PAGE_STRAINERS.get(page_type) if is_partial else None
+    return BeautifulSoup(page_data.decode('utf-8', 'ignore'), get_parser_backend(backend), parse_only=strainer)
@@ -0,0 +1,138 @@
+"""Measures how long parsing and scraping a page takes with every parser backend, with and without partial parsing (see
+page_parser.py). The pages are the synthetic ones of the stand-in (see ma_standin.py); saved pages can be added with
+--pages. Synthetic pages are much smaller than the real ones, which carry menus, scripts and ads around the scraped
+regions, so partial parsing gains more on real pages.
+
+    python parse_benchmark.py --bands 200 --pages tests/pages
+
+The file names of saved pages must start with the page type (band, artist or discography).
+"""
+
+import argparse
+from datetime import date
+from pathlib import Path
+from time import perf_counter
+
+from ma_standin import StandinCatalog
+from metal_crawler import EM_LINK_MAIN, Band, get_connected_band_links, parse_artist_page, parse_band_page, \
+    parse_discography, parse_lineup
+from page_parser import PAGE_ARTIST, PAGE_BAND, PAGE_DISCOGRAPHY, PARSER_HTML, PARSER_LXML, is_lxml_available, \
+    parse_page
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+PAGE_TYPES = [PAGE_BAND, PAGE_ARTIST, PAGE_DISCOGRAPHY]
+
+
+def scrape_band(band_soup):
+    band = parse_band_page(band_soup, 'Benchmark/1', date.today())
+
+    if band is not None:
+        parse_lineup(band_soup, band)
+        get_connected_band_links(band_soup)
+
+
+def scrape_artist(artist_soup):
+    parse_artist_page(artist_soup, 'Benchmark/1')
+
+
+def scrape_discography(disco_soup):
+    parse_discography(disco_soup, Band())
+
+
+SCRAPERS = {PAGE_BAND: scrape_band, PAGE_ARTIST: scrape_artist, PAGE_DISCOGRAPHY: scrape_discography}
+
+
+def make_pages(band_count, seed, pages_path=None):
+    """Collects the pages to parse.
+
+    :param band_count: Number of synthetic bands.
+    :param seed: Seed of the stand-in catalog.
+    :param pages_path: Directory of saved pages or `None`.
+    :return: A dictionary of page types and lists of raw pages.
+    """
+    catalog = StandinCatalog(band_count, seed)
+    pages = {
+        PAGE_BAND: [catalog.render_band(band_id, EM_LINK_MAIN).encode('utf-8') for band_id in catalog.bands],
+        PAGE_ARTIST: [catalog.render_artist(artist_id, EM_LINK_MAIN).encode('utf-8')
+                      for artist_id in list(catalog.artists.keys())[:band_count]],
+        PAGE_DISCOGRAPHY: [catalog.render_discography(band_id, EM_LINK_MAIN).encode('utf-8')
+                           for band_id in catalog.bands]
+    }
+
+    if pages_path is not None:
+        for page_file in sorted(Path(pages_path).glob('*.htm*')):
+            page_type = next((page_type for page_type in PAGE_TYPES if page_file.name.startswith(page_type)), None)
+
+            if page_type is not None:
+                pages[page_type].append(page_file.read_bytes())
+
+    return pages
+
+
+def measure(pages, page_type, backend, is_partial, repeat):
+    """Parses and scrapes all pages of a type `repeat` times.
+
+    :return: A tuple of the best parse time and the best scrape time per page in seconds.
+    """
+    scraper = SCRAPERS[page_type]
+    parse_times = []
+    scrape_times = []
+
+    for i in range(repeat):
+        parse_time = 0.0
+        scrape_time = 0.0
+
+        for page_data in pages:
+            time_start = perf_counter()
+            soup = parse_page(page_data, page_type, backend, is_partial)
+            time_parsed = perf_counter()
+            scraper(soup)
+            parse_time += time_parsed - time_start
+            scrape_time += perf_counter() - time_parsed
+
+        parse_times.append(parse_time / len(pages))
+        scrape_times.append(scrape_time / len(pages))
+
+    return min(parse_times), min(scrape_times)
+
+
+def run_benchmark(args):
+    pages = make_pages(args.bands, args.seed, args.pages)
+    backends = [PARSER_HTML] + ([PARSER_LXML] if is_lxml_available() else [])
+
+    if not is_lxml_available():
+        print('lxml is not installed; only html.parser is measured.')
+
+    print(f'\nParse benchmark (best of {args.repeat}, milliseconds per page)')
+    print(f'  {"Page type":<13}{"pages":>6}{"KiB":>7}  {"Parser":<21}{"parse":>8}{"scrape":>8}{"total":>8}'
+          f'{"speed-up":>10}')
+
+    for page_type in PAGE_TYPES:
+        page_size = sum(len(page_data) for page_data in pages[page_type]) / len(pages[page_type]) / 1024
+        reference_time = None
+
+        for backend in backends:
+            for is_partial in [False, True]:
+                parse_time, scrape_time = measure(pages[page_type], page_type, backend, is_partial, args.repeat)
+                total_time = parse_time + scrape_time
+                reference_time = total_time if reference_time is None else reference_time
+                parser_name = f'{backend} {"partial" if is_partial else "full"}'
+                print(f'  {page_type:<13}{len(pages[page_type]):6d}{page_size:7.1f}  {parser_name:<21}'
+                      f'{parse_time * 1000:8.3f}{scrape_time * 1000:8.3f}{total_time * 1000:8.3f}'
+                      f'{reference_time / total_time:9.1f}x')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmarks the parser backends with the pages of a crawl.')
+    arg_parser.add_argument('--bands', type=int, default=200, help='Number of synthetic bands (default: 200).')
+    arg_parser.add_argument('--seed', type=int, default=0, help='Seed for all generated data.')
+    arg_parser.add_argument('--pages', help='Directory of saved pages to parse as well.')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Number of runs; the best one counts (default: 3).')
+    run_benchmark(arg_parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Runs the CPU-heavy parsing of crawled pages in a pool of processes. BeautifulSoup is pure Python; parsed on the
+crawling threads it holds the GIL, so all threads together use about one core once pages arrive quickly. With the pool
+the crawling threads (or tasks) only download pages and wait for the parsed data, which comes back as plain `Band`,
+`LineupEntry` and `Release` objects.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+from time import perf_counter
+
+from settings import CRAWLER_PARSER_WORKERS
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+def get_start_context():
+    """Gets the multiprocessing context the workers are started with. The workers start with the first page, when the
+        crawling threads, the database writer and their locks (logging, SQLite, the response cache, ...) already
+        exist. A forked worker may inherit one of these locks in a locked state and wait for it forever, so the workers
+        are started by a fork server (or spawned where there is none) and get their module state from the
+        `initializer` instead.
+    """
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method)
+
+
+class ParserPool:
+    """A thin wrapper around a `ProcessPoolExecutor` which can also parse in the calling thread (without any pool) and
+        counts the parsed pages.
+    """
+
+    def __init__(self, workers=CRAWLER_PARSER_WORKERS, initializer=None, initargs=()):
+        """Starts the worker processes.
+
+        :param workers: Number of processes; None uses one per CPU and 0 parses in the calling thread.
+        :param initializer: A function called with `initargs` in every worker process before it parses, e.g. to
+            configure module state which is not inherited.
+        :param initargs: The arguments of `initializer`.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self.workers = (os.cpu_count() or 1) if workers is None else max(workers, 0)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.parse_count = 0
+        self.wait_time = 0.0
+
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_start_context(),
+                                                 initializer=initializer, initargs=initargs)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, function, *args) -> Future:
+        """Parses in the pool.
+
+        :param function: A function importable by the worker processes; it and its arguments and result must be
+            picklable.
+        :param args: The arguments of `function`.
+        :return: A future of the result of `function`. Exceptions are raised by `Future.result`.
+        """
+        with self._lock:
+            self.parse_count += 1
+
+        if self._executor is not None:
+            return self._executor.submit(function, *args)
+
+        future = Future()
+
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def parse(self, function, *args):
+        """Parses in the pool and waits for the result; see `submit`."""
+        time_start = perf_counter()
+
+        try:
+            return self.submit(function, *args).result()
+        finally:
+            with self._lock:
+                self.wait_time += perf_counter() - time_start
+
+    def __str__(self):
+        engine = f'{self.workers} processes' if self.workers > 0 else 'the crawling threads'
+        return f'{self.parse_count} pages parsed in {engine}'
@@ -0,0 +1,174 @@
+"""Implements the process-wide rate limiter for all requests to M-A. It's a token bucket whose rate follows the AIMD
+scheme (additive increase, multiplicative decrease): The rate grows slowly as long as M-A answers and is cut sharply as
+soon as "Forbidden." answers pile up.
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+
+from settings import CRAWLER_RATE_INITIAL, CRAWLER_RATE_MIN, CRAWLER_RATE_MAX, CRAWLER_RATE_INCREASE, \
+    CRAWLER_RATE_DECREASE, CRAWLER_FORBIDDEN_RATE_MAX
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+# Number of the latest responses used to calculate the forbidden rate.
+FORBIDDEN_WINDOW = 100
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+class AdaptiveRateLimiter:
+    """A thread-safe token bucket. Every request takes one token; a thread has to wait if the bucket is empty. The
+        bucket holds at most one second worth of tokens so that bursts stay small.
+    """
+
+    def __init__(self, rate=CRAWLER_RATE_INITIAL, rate_min=CRAWLER_RATE_MIN, rate_max=CRAWLER_RATE_MAX,
+                 increase=CRAWLER_RATE_INCREASE, decrease=CRAWLER_RATE_DECREASE,
+                 forbidden_rate_max=CRAWLER_FORBIDDEN_RATE_MAX, clock=time.monotonic, sleep=time.sleep):
+        """Creates a limiter with a full bucket.
+
+        :param rate: Initial rate in requests per second.
+        :param rate_min: The rate is never cut below this value.
+        :param rate_max: The rate never grows above this value.
+        :param increase: Requests per second the rate grows per second of crawling without a forbidden answer.
+        :param decrease: Factor applied to the rate for a forbidden answer.
+        :param forbidden_rate_max: The rate only grows while the share of forbidden answers in the latest responses is
+            below this value.
+        :param clock: Monotonic clock in seconds; replaceable for tests.
+        :param sleep: Sleep function; replaceable for tests.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self._rate = min(max(rate, rate_min), rate_max)
+        self._rate_min = rate_min
+        self._rate_max = rate_max
+        self._increase = increase
+        self._decrease = decrease
+        self._forbidden_rate_max = forbidden_rate_max
+        self._tokens = max(self._rate, 1.0)
+        self._last_refill = clock()
+        self._last_decrease = None
+        self._responses = deque(maxlen=FORBIDDEN_WINDOW)
+        self._forbidden_count = 0
+        self.forbidden_total = 0
+        self.requests_total = 0
+
+    @property
+    def rate(self):
+        """The current rate in requests per second."""
+        with self._lock:
+            return self._rate
+
+    @property
+    def forbidden_rate(self):
+        """The share of forbidden answers in the latest responses (0.0 to 1.0)."""
+        with self._lock:
+            return self._get_forbidden_rate()
+
+    def _get_forbidden_rate(self):
+        if len(self._responses) == 0:
+            return 0.0
+
+        return self._forbidden_count / len(self._responses)
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self._tokens + elapsed * self._rate, max(self._rate, 1.0))
+
+    def reserve(self):
+        """Takes a token from the bucket, even if it's empty.
+
+        :return: The time in seconds the caller has to wait before sending its request.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            self.requests_total += 1
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self._rate
+
+    def acquire(self):
+        """Blocks the calling thread until it is allowed to send a request."""
+        delay = self.reserve()
+
+        if delay > 0:
+            self._sleep(delay)
+
+    def _record(self, is_forbidden):
+        if len(self._responses) == self._responses.maxlen and self._responses[0]:
+            self._forbidden_count -= 1
+
+        self._responses.append(is_forbidden)
+
+        if is_forbidden:
+            self._forbidden_count += 1
+
+    def report_success(self):
+        """Increases the rate a little for every answered request. With n requests per second the rate grows by
+            `increase` per second.
+        """
+        with self._lock:
+            self._record(False)
+
+            if self._get_forbidden_rate() < self._forbidden_rate_max:
+                self._rate = min(self._rate + self._increase / self._rate, self._rate_max)
+
+    def report_forbidden(self):
+        """Cuts the rate and empties the bucket so that every thread backs off at the same time. Requests which were
+            already in flight with the old rate report their forbidden answers shortly after; only one cut per
+            interval of the new rate is done for those.
+        """
+        with self._lock:
+            self._record(True)
+            self.forbidden_total += 1
+            now = self._clock()
+            self._refill(now)
+
+            if self._last_decrease is not None and now - self._last_decrease < 1.0 / self._rate:
+                return
+
+            self._last_decrease = now
+            self._rate = max(self._rate * self._decrease, self._rate_min)
+            self._tokens = min(self._tokens, 0.0)
+            self.logger.debug(f'Received a forbidden answer. Request rate is now {self._rate:.2f}/s.')
+
+    def __str__(self):
+        with self._lock:
+            return f'{self._rate:.2f} requests/s, {self.forbidden_total} of {self.requests_total} requests forbidden ' \
+                   f'({self._get_forbidden_rate() * 100:.1f}% of the latest {len(self._responses)})'
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Gets the process-wide rate limiter and creates it on the first call.
+
+    :return: The shared `AdaptiveRateLimiter`.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = AdaptiveRateLimiter()
+
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: AdaptiveRateLimiter):
+    """Replaces the process-wide rate limiter (e.g. for a benchmark). Must be called before crawling starts.
+
+    :param limiter: The new limiter.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
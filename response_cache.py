@@ -0,0 +1,270 @@
+"""Provides the on-disk cache for pages downloaded from M-A. Entries are addressed by the SHA-256 hash of their URL and
+stored zlib-compressed below the crawler's data directory. Every entity type (band, artist, ...) has its own time to
+live; stale entries are revalidated with a conditional request if M-A sent an ETag or a Last-Modified header.
+"""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+import zlib
+
+from settings import CRAWLER_CACHE_ENABLED, CRAWLER_CACHE_PATH, CRAWLER_CACHE_TTL_DAYS
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+# Order matters: The discography link also contains "band".
+ENTITY_PATHS = [
+    ('/band/discography/', 'discography'),
+    ('/bands/', 'band'),
+    ('/artists/', 'artist'),
+    ('/labels/', 'label'),
+    ('/browse/country', 'country'),
+    ('/browse/ajax-country/', 'country')
+]
+ENTITY_OTHER = 'other'
+SECONDS_PER_DAY = 86400
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_entity_type(url):
+    """Derives the entity type used to look up the time to live of a page.
+
+    :param url: The full URL of the page.
+    :return: One of the types in `ENTITY_PATHS` or `ENTITY_OTHER`.
+    """
+    for path, entity_type in ENTITY_PATHS:
+        if path in url:
+            return entity_type
+
+    return ENTITY_OTHER
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    data: bytes
+    stored_at: float
+    etag: str = None
+    last_modified: str = None
+    is_fresh: bool = False
+
+    def get_validators(self):
+        """Gets the headers for a conditional request.
+
+        :return: A dictionary with If-None-Match and/or If-Modified-Since or None if the server sent no validators.
+        """
+        headers = {}
+
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+
+        if len(headers) == 0:
+            return None
+
+        return headers
+
+
+class CacheStats:
+    """Thread-safe counters of a `ResponseCache`. A revalidated entry was stale but the server confirmed it with a 304,
+        so its body did not need to be downloaded again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.bytes_saved = 0
+
+    def hit(self, size):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += size
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def revalidation(self, size):
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += size
+
+    def store(self):
+        with self._lock:
+            self.stored += 1
+
+    def __str__(self):
+        with self._lock:
+            return f'{self.hits} hits, {self.misses} misses, {self.revalidated} revalidated, {self.stored} stored, ' \
+                   f'{self.bytes_saved / 1048576:.1f} MiB not downloaded'
+
+
+class ResponseCache:
+    """Loads and stores cached pages. Writes go to a temporary file first and are then moved in place, so concurrent
+        crawler threads never read half-written entries.
+    """
+
+    def __init__(self, cache_path=CRAWLER_CACHE_PATH, ttl_days=None, is_enabled=CRAWLER_CACHE_ENABLED,
+                 is_cache_only=False, clock=time.time):
+        """Creates the cache; the directory is created on the first write.
+
+        :param cache_path: The directory of the cache.
+        :param ttl_days: A dictionary of time to live in days per entity type; `CRAWLER_CACHE_TTL_DAYS` if None. An
+            entity type without a value uses the one of `ENTITY_OTHER`.
+        :param is_enabled: A disabled cache neither loads nor stores anything.
+        :param is_cache_only: Every cached entry is used regardless of its age and nothing is requested from M-A.
+        :param clock: Wall clock in seconds; replaceable for tests.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self.cache_path = Path(cache_path)
+        self.ttl_days = CRAWLER_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.is_enabled = is_enabled or is_cache_only
+        self.is_cache_only = is_cache_only
+        self.stats = CacheStats()
+        self._clock = clock
+
+    def get_path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_path / digest[:2] / digest
+
+    def get_ttl(self, url):
+        entity_type = get_entity_type(url)
+        ttl = self.ttl_days.get(entity_type, self.ttl_days.get(ENTITY_OTHER, 0))
+        return ttl * SECONDS_PER_DAY
+
+    def _read(self, url):
+        try:
+            raw_entry = self.get_path(url).read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            header, data = zlib.decompress(raw_entry).split(b'\n', 1)
+            header = json.loads(header)
+        except (zlib.error, ValueError) as e:
+            self.logger.warning(f'Ignoring the broken cache entry for {url}: {e}')
+            return None
+
+        # Hash collisions are next to impossible but a wrong page would be silently crawled.
+        if header['url'] != url:
+            return None
+
+        return CacheEntry(url, data, header['stored_at'], header.get('etag'), header.get('last_modified'))
+
+    def _write(self, entry: CacheEntry):
+        header = {'url': entry.url, 'stored_at': entry.stored_at}
+
+        if entry.etag is not None:
+            header['etag'] = entry.etag
+
+        if entry.last_modified is not None:
+            header['last_modified'] = entry.last_modified
+
+        raw_entry = zlib.compress(json.dumps(header).encode('utf-8') + b'\n' + entry.data)
+        path = self.get_path(entry.url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        temp_path.write_bytes(raw_entry)
+        os.replace(temp_path, path)
+
+    def lookup(self, url):
+        """Loads the cache entry of the URL and counts a hit if it can be used without asking M-A.
+
+        :param url: The full URL of the page.
+        :return: A `CacheEntry` with `is_fresh` set if it's usable as it is, or None if the URL is not cached. A stale
+            entry is returned for revalidation.
+        """
+        entry = None
+
+        if self.is_enabled:
+            entry = self._read(url)
+
+        if entry is not None:
+            entry.is_fresh = self.is_cache_only or self._clock() - entry.stored_at < self.get_ttl(url)
+
+        if entry is not None and entry.is_fresh:
+            self.stats.hit(len(entry.data))
+        else:
+            self.stats.miss()
+
+        return entry
+
+    def store(self, url, data, headers):
+        """Saves a valid page.
+
+        :param url: The full URL of the page.
+        :param data: The (decoded) body of the page.
+        :param headers: The response headers; ETag and Last-Modified are kept for revalidation.
+        """
+        if not self.is_enabled or self.get_ttl(url) <= 0:
+            return
+
+        self._write(CacheEntry(url, data, self._clock(), headers.get('ETag'), headers.get('Last-Modified')))
+        self.stats.store()
+
+    def refresh(self, entry: CacheEntry, headers):
+        """Renews a stale entry after the server answered a conditional request with 304 Not Modified.
+
+        :param entry: The entry returned by `lookup`.
+        :param headers: The headers of the 304 answer, which may carry updated validators.
+        """
+        entry.stored_at = self._clock()
+        entry.etag = headers.get('ETag', entry.etag)
+        entry.last_modified = headers.get('Last-Modified', entry.last_modified)
+        entry.is_fresh = True
+        self._write(entry)
+        self.stats.revalidation(len(entry.data))
+
+    def invalidate(self, url):
+        """Removes the entry of a page which turned out to be unusable (e.g. it could not be parsed), so that the next
+            request downloads it again. In cache-only mode nothing could replace it, so it's kept.
+
+        :param url: The full URL of the page.
+        """
+        if not self.is_enabled or self.is_cache_only:
+            return
+
+        try:
+            self.get_path(url).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def get_response_cache() -> ResponseCache:
+    """Gets the process-wide response cache and creates it on the first call.
+
+    :return: The shared `ResponseCache`.
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+
+    return _response_cache
+
+
+def set_cache_mode(is_enabled=CRAWLER_CACHE_ENABLED, is_cache_only=False):
+    """Replaces the process-wide response cache with one using the given mode. Must be called before crawling starts.
+
+    :param is_enabled: False disables the cache; `CRAWLER_CACHE_ENABLED` by default.
+    :param is_cache_only: True only uses cached pages and never requests anything from M-A.
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        _response_cache = ResponseCache(is_enabled=is_enabled, is_cache_only=is_cache_only)
@@ -0,0 +1,120 @@
+"""Schedules failed bands for another crawl attempt. Instead of putting a failed link straight back into the queue
+(where it's retried within milliseconds on a short queue), it's kept in a heap ordered by the time it's due again. The
+delay grows exponentially with every attempt, is jittered so that retries do not come in waves and depends on why the
+crawl failed: A throttled server needs a long break, a timeout a short one and a missing page none at all.
+"""
+
+import heapq
+import logging
+import random
+import threading
+import time
+
+from settings import CRAWLER_RETRY_BACKOFF, CRAWLER_RETRY_DELAY_MAX
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+ERROR_FORBIDDEN = 'forbidden'
+ERROR_TIMEOUT = 'timeout'
+ERROR_NOT_FOUND = 'not_found'
+ERROR_PARSE = 'parse'
+
+
+class RetryScheduler:
+    """A thread-safe, time-ordered queue of band links waiting for their next attempt."""
+
+    def __init__(self, backoff=None, delay_max=CRAWLER_RETRY_DELAY_MAX, clock=time.monotonic, seed=None):
+        """Creates an empty scheduler.
+
+        :param backoff: A dictionary with a tuple of the first delay in seconds and the maximum number of attempts per
+            error class; `CRAWLER_RETRY_BACKOFF` if None.
+        :param delay_max: No delay (before jitter) is longer than this number of seconds.
+        :param clock: Monotonic clock in seconds; replaceable for tests.
+        :param seed: Seed of the jitter; replaceable for tests.
+        """
+        self.logger = logging.getLogger('Crawler')
+        self._lock = threading.Lock()
+        self._heap = []
+        self._sequence = 0
+        self._backoff = CRAWLER_RETRY_BACKOFF if backoff is None else backoff
+        self._delay_max = delay_max
+        self._clock = clock
+        self._random = random.Random(seed)
+        self.scheduled = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def get_backoff_delay(self, attempts, error_class):
+        """Calculates the delay before the next attempt.
+
+        :param attempts: The number of unsuccessful attempts so far (at least 1).
+        :param error_class: One of the ERROR_* constants.
+        :return: The delay in seconds or None if the band must not be tried again.
+        """
+        delay_first, attempts_max = self._backoff.get(error_class, self._backoff[ERROR_PARSE])
+
+        if attempts >= attempts_max:
+            return None
+
+        delay = min(delay_first * 2 ** (attempts - 1), self._delay_max)
+        # "Equal jitter": at least half of the delay, the rest is random.
+        return delay / 2 + self._random.uniform(0, delay / 2)
+
+    def schedule(self, band_link, attempts, error_class):
+        """Schedules the next attempt of a band if its error class allows another one.
+
+        :param band_link: The short band link.
+        :param attempts: The number of unsuccessful attempts so far (at least 1).
+        :param error_class: One of the ERROR_* constants.
+        :return: True if the band was scheduled, False if it's unrecoverable.
+        """
+        delay = self.get_backoff_delay(attempts, error_class)
+
+        if delay is None:
+            return False
+
+        self.logger.debug(f'  Retrying {band_link} ({error_class}) in {delay:.1f} s.')
+
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._heap, (self._clock() + delay, self._sequence, band_link))
+            self.scheduled[error_class] = self.scheduled.get(error_class, 0) + 1
+
+        return True
+
+    def get_delay(self):
+        """Gets the time until the next band is due.
+
+        :return: The delay in seconds (0.0 if a band is due already) or None if nothing is scheduled.
+        """
+        with self._lock:
+            if len(self._heap) == 0:
+                return None
+
+            return max(self._heap[0][0] - self._clock(), 0.0)
+
+    def pop_due(self):
+        """Takes all bands which are due.
+
+        :return: A list of short band links in the order they became due.
+        """
+        due_links = []
+
+        with self._lock:
+            now = self._clock()
+
+            while len(self._heap) > 0 and self._heap[0][0] <= now:
+                due_links.append(heapq.heappop(self._heap)[2])
+
+        return due_links
+
+    def __str__(self):
+        with self._lock:
+            if len(self.scheduled) == 0:
+                return 'no retries'
+
+            return ', '.join(f'{count} after {error_class}' for error_class, count in sorted(self.scheduled.items()))
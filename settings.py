@@ -5,12 +5,114 @@ __author__ = 'Martin Woelke'
 __license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
 __copyright__ = 'Copyright 2019-2022, Martin Woelke'
 
+# The database of crawls, exports and reports: 'neo4j' needs a running Neo4j server (see below), 'sqlite' is a local
+# file without any service and 'memory' keeps everything in memory until the program ends (for tests and profiling).
+# 'snapshots' exports and reports from the band snapshots of the crawls (see SNAPSHOT_PATH) without a database.
+# Can be overridden with --db.
+DATABASE_BACKEND = 'neo4j'
+SQLITE_DATABASE_PATH = 'databases/metal_mapper.sqlite'
+
 NEO4J_USERNAME = "neo4j"
 NEO4J_PASSWORD = "tst"
 NEO4J_IP_ADDRESS = "localhost"
+# A transaction failing with a transient error (e.g. a deadlock or a lost connection) is tried this many times. The delay
+# in seconds doubles with every attempt.
+NEO4J_WRITE_ATTEMPTS = 4
+NEO4J_WRITE_RETRY_DELAY = 0.5
+# Number of records fetched per round-trip for queries whose results are streamed (exports, loading known links).
+NEO4J_FETCH_SIZE = 2000
+# Independent read queries (e.g. those of an export) run at the same time on up to this many sessions.
+NEO4J_QUERY_WORKERS = 8
+
+# Address of M-A. Only change it to crawl a stand-in (see ma_standin.py).
+CRAWLER_BASE_URL = 'https://www.metal-archives.com/'
 
-# 8 might be a bit high (leaves some forbidden messages on getting the JSON data or the bands).
+# The number of threads only limits how many bands are crawled at the same time. How fast requests are sent is decided
+# by the rate limiter below.
 CRAWLER_THREAD_COUNT = 8
+# Every crawled band fetches its discography and member pages with up to this many parallel requests.
+CRAWLER_BAND_FANOUT = 4
+# Crawled bands are handed to a single database writer through a queue of this size; crawlers wait if it's full. The
+# writer takes up to CRAWLER_WRITE_BATCH_SIZE bands at once.
+CRAWLER_WRITE_QUEUE_SIZE = 64
+CRAWLER_WRITE_BATCH_SIZE = 16
+# Band, artist and discography pages are parsed by CRAWLER_PARSER_WORKERS processes while the crawling threads only
+# download them (None: one process per CPU, 0: the crawling threads parse themselves).
+CRAWLER_PARSER_WORKERS = None
+# Parser of the crawled pages: 'lxml' is much faster but must be installed (pip install lxml), 'html.parser' is part of
+# Python and 'auto' uses lxml if it's installed. With CRAWLER_PARSER_PARTIAL only the regions of band, artist and
+# discography pages which are scraped are parsed.
+CRAWLER_PARSER_BACKEND = 'auto'
+CRAWLER_PARSER_PARTIAL = True
+# Number of parsed artist pages kept in memory during a crawl. Bands sharing members use them instead of fetching the
+# same page again.
+CRAWLER_ARTIST_CACHE_SIZE = 100000
+
+# All crawler threads share one HTTP session with keep-alive connections. The pool size is the maximum number of
+# connections per host and should not be smaller than CRAWLER_THREAD_COUNT. Threads wait for a free connection if all
+# are in use.
+CRAWLER_POOL_SIZE = 16
+CRAWLER_POOL_HOSTS = 4
+CRAWLER_REQUEST_TIMEOUT = 10.0
+
+# All requests of the crawler share one rate limit (in requests per second). It grows by CRAWLER_RATE_INCREASE per second
+# as long as less than CRAWLER_FORBIDDEN_RATE_MAX of the latest answers were "Forbidden." and is multiplied with
+# CRAWLER_RATE_DECREASE for every forbidden answer.
+CRAWLER_RATE_INITIAL = 4.0
+CRAWLER_RATE_MIN = 0.5
+CRAWLER_RATE_MAX = 30.0
+CRAWLER_RATE_INCREASE = 0.2
+CRAWLER_RATE_DECREASE = 0.5
+CRAWLER_FORBIDDEN_RATE_MAX = 0.02
+
+# Maximum number of requests in flight for the asynchronous crawl engine (--async). The rate limit above still applies.
+CRAWLER_ASYNC_CONCURRENCY = 200
+
+# Pages requested with cook_soup are cached (compressed) below CRAWLER_CACHE_PATH. The time to live is given in days per
+# entity type; a stale page is revalidated with a conditional request if M-A supports it. A value of 0 disables caching
+# for the type.
+CRAWLER_CACHE_ENABLED = True
+CRAWLER_CACHE_PATH = 'databases/http_cache'
+CRAWLER_CACHE_TTL_DAYS = {
+    'artist': 90,
+    'band': 7,
+    'discography': 7,
+    'label': 30,
+    'country': 1,
+    'other': 1
+}
+
+# The state of every band crawl is kept in this SQLite database so that a stopped or crashed crawl can be resumed with
+# --resume.
+CRAWLER_FRONTIER_PATH = 'databases/crawl_frontier.sqlite'
+
+# Every crawled band is appended as compressed JSON to the segment files of its country below SNAPSHOT_PATH. A segment
+# larger than SNAPSHOT_SEGMENT_BYTES is not appended to anymore. When a crawl ends, countries whose segments consist of
+# superseded snapshots by at least SNAPSHOT_COMPACT_RATIO are compacted.
+SNAPSHOT_PATH = 'databases/snapshots'
+# Older versions saved every band as a JSON file (<SNAPSHOT_LEGACY_PATH>/<country>/<band>.json). --import-snapshots moves
+# the ones of bands without a snapshot in the segments into the store first.
+SNAPSHOT_LEGACY_PATH = 'databases'
+SNAPSHOT_SEGMENT_BYTES = 32 * 1024 * 1024
+SNAPSHOT_COMPACT_RATIO = 0.5
+# A database is rebuilt from the snapshots (--import-snapshots) in transactions of SNAPSHOT_IMPORT_BATCH_SIZE bands. The
+# snapshots are parsed by SNAPSHOT_IMPORT_WORKERS processes (None: one per CPU) while the bands are written.
+SNAPSHOT_IMPORT_BATCH_SIZE = 500
+SNAPSHOT_IMPORT_WORKERS = None
+# Exports and reports from the snapshots (--db snapshots) aggregate the countries in SNAPSHOT_EXPORT_WORKERS processes
+# (None: one per CPU).
+SNAPSHOT_EXPORT_WORKERS = None
+
+# A band which could not be crawled is tried again after a delay which doubles with every attempt (jittered, at most
+# CRAWLER_RETRY_DELAY_MAX seconds). Per error class: (first delay in seconds, maximum number of attempts). A band whose
+# page does not exist is not tried again.
+CRAWLER_RETRY_BACKOFF = {
+    'forbidden': (30.0, 5),
+    'timeout': (5.0, 4),
+    'parse': (10.0, 2),
+    'not_found': (0.0, 1)
+}
+CRAWLER_RETRY_DELAY_MAX = 600.0
 
 # Minimum values for releases to appear in the reports.
 RELEASE_REVIEW_COUNT_MIN = 3
@@ -0,0 +1,123 @@
+"""Rebuilds a database from the band snapshots of earlier crawls (see snapshot_store.py) instead of crawling M-A again.
+The compressed records are read from the store in batches and handed to a pool of processes which restore the bands
+and convert them for the bulk write path (`metal_crawler.make_write_batch`). The main process only writes the converted
+batches, one transaction per batch, while the workers already parse the next ones.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+from time import perf_counter
+
+import progressbar
+
+from metal_crawler import make_band_from_snapshot, make_write_batch, write_batch_to_db
+from settings import SNAPSHOT_IMPORT_BATCH_SIZE, SNAPSHOT_IMPORT_WORKERS
+from snapshot_store import SnapshotStore, decode_data
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+
+def parse_records(records):
+    """Restores the bands of snapshot records and converts them for the database. Runs in the worker processes.
+
+    :param records: A list of tuples of band link and compressed data as streamed by `SnapshotStore.iter_records`.
+    :return: The WriteBatch of the bands.
+    """
+    return make_write_batch([make_band_from_snapshot(decode_data(data)) for link, data in records])
+
+
+def make_record_batches(snapshot_store: SnapshotStore, country_shorts, batch_size):
+    """Streams the records of the given countries in lists of at most `batch_size` records."""
+    batch = []
+
+    for country_short in country_shorts:
+        for record in snapshot_store.iter_records(country_short):
+            batch.append(record)
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def parse_record_batches(record_batches, workers):
+    """Parses batches of records in a process pool and yields them in their original order. At most two batches per
+        worker are parsed in advance so that the memory does not depend on the size of the store.
+
+    :param record_batches: An iterable of record lists.
+    :param workers: The number of processes; with 1 everything is parsed in this process.
+    :return: A generator of tuples of the record list and a function returning its WriteBatch (or raising the error
+        of the parser).
+    """
+    if workers == 1:
+        for records in record_batches:
+            yield records, lambda records=records: parse_records(records)
+
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        for records in record_batches:
+            pending.append((records, executor.submit(parse_records, records)))
+
+            if len(pending) >= 2 * workers:
+                records, future = pending.popleft()
+                yield records, future.result
+
+        while len(pending) > 0:
+            records, future = pending.popleft()
+            yield records, future.result
+
+
+def import_snapshots(db_handle, snapshot_store: SnapshotStore, country_shorts=None,
+                     batch_size=SNAPSHOT_IMPORT_BATCH_SIZE, workers=SNAPSHOT_IMPORT_WORKERS):
+    """Writes the latest snapshot of every band into the database. Bands already in the database are updated.
+
+    :param db_handle: The database handle to write to.
+    :param snapshot_store: The store to read the snapshots from.
+    :param country_shorts: ISO country shorts of the bands to import; all countries of the store if empty or None.
+    :param batch_size: Number of bands written in one transaction.
+    :param workers: Number of parsing processes; None uses one per CPU.
+    :return: A tuple of the number of imported bands and a list of the links of bands which could not be imported.
+    """
+    logger = logging.getLogger('Crawler')
+    workers = max(workers or os.cpu_count() or 1, 1)
+    country_shorts = country_shorts or snapshot_store.get_countries()
+    band_count = sum(snapshot_store.get_band_count(country_short) for country_short in country_shorts)
+    logger.info(f'Importing {band_count} band snapshots with {workers} parsing processes.')
+    time_start = perf_counter()
+    imported_count = 0
+    failed_links = []
+    progress_bar = progressbar.ProgressBar(max_value=band_count)
+    record_batches = make_record_batches(snapshot_store, country_shorts, max(batch_size, 1))
+
+    for records, get_write_batch in parse_record_batches(record_batches, workers):
+        try:
+            write_batch_to_db(get_write_batch(), db_handle)
+            imported_count += len(records)
+        except Exception:
+            logger.exception(f'Importing a batch of {len(records)} bands failed. Importing them one by one.')
+
+            for record in records:
+                try:
+                    write_batch_to_db(parse_records([record]), db_handle)
+                    imported_count += 1
+                except Exception:
+                    logger.exception(f'Importing the snapshot of {record[0]} failed.')
+                    failed_links.append(record[0])
+
+        progress_bar.update(imported_count + len(failed_links))
+
+    progress_bar.finish()
+    import_time = perf_counter() - time_start
+    logger.info(f'Imported {imported_count} bands in {import_time:.2f} s '
+                f'({imported_count / max(import_time, 1e-9):.1f} bands/s); {len(failed_links)} failed.')
+
+    return imported_count, failed_links
@@ -0,0 +1,386 @@
+"""Keeps the JSON snapshots of crawled bands in append-only, compressed segment files instead of one file per band.
+Every country has its own directory of numbered segments; a band is appended to the newest segment of its country as
+one record:
+
+    link length (2 bytes) | data length (4 bytes) | CRC-32 of the data (4 bytes) | link (UTF-8) | data (zlib of JSON)
+
+An index in SQLite maps every band link to the segment and offset of its latest record, so a band can be read without
+scanning. A band crawled again is appended again; the superseded record stays in its segment until the country is
+compacted, which copies the latest records into new segments and deletes the old ones.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+from settings import SNAPSHOT_PATH, SNAPSHOT_SEGMENT_BYTES, SNAPSHOT_COMPACT_RATIO
+
+__author__ = 'Martin Woelke'
+__license__ = 'Licensed under the Non-Profit Open Software License version 3.0'
+__copyright__ = 'Copyright 2019-2023, Martin Woelke'
+
+RECORD_HEADER = struct.Struct('>HII')
+SEGMENT_EXTENSION = '.seg'
+INDEX_NAME = 'index.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    link TEXT PRIMARY KEY,
+    country TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_position ON snapshots (country, segment, offset);
+"""
+
+
+class SnapshotError(Exception):
+    """A record of a segment is truncated or its data does not match its checksum."""
+
+
+def encode_record(link, band_data) -> bytes:
+    """Serializes a band snapshot into a record.
+
+    :param link: The short band link.
+    :param band_data: The JSON-serializable dictionary of the band.
+    :return: The bytes of the record including its header.
+    """
+    link_bytes = link.encode('utf-8')
+    data = zlib.compress(json.dumps(band_data).encode('utf-8'))
+    return RECORD_HEADER.pack(len(link_bytes), len(data), zlib.crc32(data)) + link_bytes + data
+
+
+def read_record(segment_file):
+    """Reads the record at the current position of an open segment.
+
+    :param segment_file: A segment opened for binary reading.
+    :return: A tuple of the link and the compressed data or None at the end of the segment.
+    """
+    header = segment_file.read(RECORD_HEADER.size)
+
+    if len(header) == 0:
+        return None
+    elif len(header) < RECORD_HEADER.size:
+        raise SnapshotError(f'Truncated record header in {segment_file.name}.')
+
+    link_size, data_size, checksum = RECORD_HEADER.unpack(header)
+    link = segment_file.read(link_size)
+    data = segment_file.read(data_size)
+
+    if len(link) < link_size or len(data) < data_size or zlib.crc32(data) != checksum:
+        raise SnapshotError(f'Broken record in {segment_file.name}.')
+
+    return link.decode('utf-8'), data
+
+
+def decode_data(data) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+class SnapshotStore:
+    """The store is written by a single thread (the database writer of a crawl) but may be read from anywhere. Appended
+        records reach the index in `flush`; until then `get` and the iterators do not know them.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH, segment_bytes=SNAPSHOT_SEGMENT_BYTES):
+        """Opens (or creates) the store.
+
+        :param path: The directory of the store.
+        :param segment_bytes: A segment which grew beyond this size is not appended to anymore.
+        """
+        self.logger = logging.getLogger('Snapshots')
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self.path / INDEX_NAME), check_same_thread=False, isolation_level=None,
+                                           timeout=30)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        # The open segment per country as a tuple of number and file.
+        self._segments = {}
+        self._pending_rows = []
+
+    def close(self, compact_ratio=SNAPSHOT_COMPACT_RATIO):
+        """Flushes all appended records and compacts countries with too many superseded records.
+
+        :param compact_ratio: Countries whose segments are superseded by at least this share are compacted; None
+            skips the compaction.
+        """
+        with self._lock:
+            self.flush()
+
+            if compact_ratio is not None:
+                for country in self.get_countries():
+                    if self.get_garbage_ratio(country) >= compact_ratio:
+                        self.compact(country)
+
+            self._close_segments()
+            self._connection.close()
+
+    def _close_segments(self):
+        for number, segment_file in self._segments.values():
+            segment_file.close()
+
+        self._segments = {}
+
+    def get_segment_path(self, country, number) -> Path:
+        return self.path / country / f'{number:06d}{SEGMENT_EXTENSION}'
+
+    def get_segment_numbers(self, country) -> list:
+        country_path = self.path / country
+        return sorted(int(path.stem) for path in country_path.glob(f'*{SEGMENT_EXTENSION}'))
+
+    def _get_segment(self, country):
+        """Gets the segment new records of the country are appended to; starts a new one if it's full."""
+        if country not in self._segments:
+            numbers = self.get_segment_numbers(country)
+            number = numbers[-1] if len(numbers) > 0 else 0
+            segment_path = self.get_segment_path(country, number)
+            segment_path.parent.mkdir(parents=True, exist_ok=True)
+            self._segments[country] = (number, open(segment_path, 'ab'))
+
+        number, segment_file = self._segments[country]
+
+        if segment_file.tell() >= self.segment_bytes:
+            segment_file.close()
+            number += 1
+            self._segments[country] = (number, open(self.get_segment_path(country, number), 'ab'))
+
+        return self._segments[country]
+
+    def append(self, country, link, band_data):
+        """Appends the snapshot of a band to the newest segment of its country.
+
+        :param country: The ISO country short of the band.
+        :param link: The short band link.
+        :param band_data: The JSON-serializable dictionary of the band.
+        """
+        record = encode_record(link, band_data)
+
+        with self._lock:
+            number, segment_file = self._get_segment(country)
+            offset = segment_file.tell()
+            segment_file.write(record)
+            self._pending_rows.append((link, country, number, offset, len(record), time.time()))
+
+    def flush(self):
+        """Writes the appended records to disk and records them in the index."""
+        with self._lock:
+            if len(self._pending_rows) == 0:
+                return
+
+            # The records must be on disk before the index points to them.
+            for number, segment_file in self._segments.values():
+                segment_file.flush()
+
+            with self._connection:
+                self._connection.execute('BEGIN')
+                self._connection.executemany('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)',
+                                             self._pending_rows)
+
+            self._pending_rows = []
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0]
+
+    def get_band_count(self, country) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM snapshots WHERE country = ?',
+                                            (country,)).fetchone()[0]
+
+    def get_countries(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._connection.execute(
+                'SELECT DISTINCT country FROM snapshots ORDER BY country')]
+
+    def get(self, link):
+        """Reads the latest snapshot of a band.
+
+        :param link: The short band link.
+        :return: The dictionary of the band or None if there's no snapshot.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT country, segment, offset FROM snapshots WHERE link = ?',
+                                           (link,)).fetchone()
+
+        if row is None:
+            return None
+
+        with open(self.get_segment_path(row[0], row[1]), 'rb') as segment_file:
+            segment_file.seek(row[2])
+            return decode_data(read_record(segment_file)[1])
+
+    def _get_positions(self, country) -> list:
+        with self._lock:
+            return self._connection.execute(
+                'SELECT segment, offset FROM snapshots WHERE country = ? ORDER BY segment, offset',
+                (country,)).fetchall()
+
+    def iter_records(self, country):
+        """Streams the latest records of all bands of a country in the order they are stored.
+
+        :param country: The ISO country short.
+        :return: A generator of tuples of the link and the compressed data (see `decode_data`).
+        """
+        segment_number = None
+        segment_file = None
+
+        try:
+            for number, offset in self._get_positions(country):
+                if number != segment_number:
+                    if segment_file is not None:
+                        segment_file.close()
+
+                    segment_number = number
+                    segment_file = open(self.get_segment_path(country, number), 'rb')
+
+                segment_file.seek(offset)
+                yield read_record(segment_file)
+        finally:
+            if segment_file is not None:
+                segment_file.close()
+
+    def iter_bands(self, country):
+        """Streams the latest snapshots of all bands of a country.
+
+        :param country: The ISO country short.
+        :return: A generator of band dictionaries.
+        """
+        for link, data in self.iter_records(country):
+            yield decode_data(data)
+
+    def get_garbage_ratio(self, country) -> float:
+        """Calculates the share of a country's segments taken by superseded records.
+
+        :param country: The ISO country short.
+        :return: A number between 0.0 (nothing to compact) and 1.0.
+        """
+        total_size = sum(self.get_segment_path(country, number).stat().st_size
+                         for number in self.get_segment_numbers(country))
+
+        if total_size == 0:
+            return 0.0
+
+        with self._lock:
+            live_size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM snapshots WHERE country = ?',
+                                                 (country,)).fetchone()[0]
+
+        return max(total_size - live_size, 0) / total_size
+
+    def compact(self, country):
+        """Copies the latest record of every band of a country into new segments and deletes the old segments.
+
+        :param country: The ISO country short.
+        """
+        with self._lock:
+            self.flush()
+            old_numbers = self.get_segment_numbers(country)
+
+            if country in self._segments:
+                self._segments.pop(country)[1].close()
+
+            # New segments are numbered after the old ones; a crash before the index is updated only leaves segments
+            # nobody points to.
+            number = old_numbers[-1] + 1 if len(old_numbers) > 0 else 0
+            new_segment = open(self.get_segment_path(country, number), 'wb')
+            rows = []
+
+            for link, data in self.iter_records(country):
+                if new_segment.tell() >= self.segment_bytes:
+                    new_segment.close()
+                    number += 1
+                    new_segment = open(self.get_segment_path(country, number), 'wb')
+
+                record = RECORD_HEADER.pack(len(link.encode('utf-8')), len(data), zlib.crc32(data)) + \
+                    link.encode('utf-8') + data
+                rows.append((number, new_segment.tell(), len(record), link))
+                new_segment.write(record)
+
+            new_segment.close()
+
+            with self._connection:
+                self._connection.execute('BEGIN')
+                self._connection.executemany('UPDATE snapshots SET segment = ?, offset = ?, size = ? WHERE link = ?',
+                                             rows)
+
+            for old_number in old_numbers:
+                os.remove(self.get_segment_path(country, old_number))
+
+            self.logger.info(f'Compacted the snapshots of {country} into {len(rows)} records.')
+
+    def rebuild_index(self):
+        """Scans all segments and points the index to the last record of every band, e.g. after the index was lost.
+            Broken records at the end of a segment (from a crash while appending) are skipped.
+        """
+        with self._lock:
+            self.flush()
+            rows = {}
+
+            for country_path in sorted(path for path in self.path.iterdir() if path.is_dir()):
+                country = country_path.name
+
+                for number in self.get_segment_numbers(country):
+                    with open(self.get_segment_path(country, number), 'rb') as segment_file:
+                        while True:
+                            offset = segment_file.tell()
+
+                            try:
+                                record = read_record(segment_file)
+                            except SnapshotError as e:
+                                self.logger.warning(f'Skipping the rest of the segment: {e}')
+                                break
+
+                            if record is None:
+                                break
+
+                            rows[record[0]] = (record[0], country, number, offset, segment_file.tell() - offset,
+                                               time.time())
+
+            with self._connection:
+                self._connection.execute('BEGIN')
+                self._connection.execute('DELETE FROM snapshots')
+                self._connection.executemany('INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?)', rows.values())
+
+    def __contains__(self, link):
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM snapshots WHERE link = ?', (link,)).fetchone() is not None
+
+    def import_json_files(self, path):
+        """Appends the per-band JSON files of older crawls (`<path>/<country>/<link>.json`). These are older than any
+            record of the segments; bands which already have a snapshot are skipped, so importing the same files again
+            changes nothing.
+
+        :param path: The directory containing one directory per country.
+        :return: The number of imported bands.
+        """
+        count = 0
+
+        for json_path in sorted(Path(path).glob('*/*.json')):
+            # The directory may contain other JSON files or files of a crawl which crashed while writing them.
+            try:
+                band_data = json.loads(json_path.read_text(encoding='utf-8'))
+                link = band_data['link']
+                country = band_data['country']
+            except (ValueError, KeyError, TypeError):
+                self.logger.error(f'{json_path} is not a band snapshot; skipping it.')
+                continue
+
+            if link in self:
+                continue
+
+            self.append(country, link, band_data)
+            count += 1
+
+        self.flush()
+        return count
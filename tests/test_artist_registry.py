@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from artist_registry import ArtistRegistry
+
+ARTIST_LINK = 'https://www.metal-archives.com/artists/Fenriz/1224'
+ARTIST_DATA = {'name': 'Gylve Fenris Nagell', 'gender': 'M', 'age': '52', 'origin': 'NO'}
+
+
+class TestArtistRegistry(unittest.TestCase):
+
+    def test_single_flight(self):
+        registry = ArtistRegistry()
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+        fetched_links = []
+        results = []
+
+        def fetch(artist_link):
+            fetched_links.append(artist_link)
+            fetch_started.set()
+            release_fetch.wait(5)
+            return ARTIST_DATA
+
+        owner = threading.Thread(target=lambda: results.append(registry.get(ARTIST_LINK, fetch)))
+        owner.start()
+        fetch_started.wait(5)
+        waiters = [threading.Thread(target=lambda: results.append(registry.get(ARTIST_LINK, fetch)))
+                   for i in range(3)]
+
+        for waiter in waiters:
+            waiter.start()
+
+        release_fetch.set()
+
+        for thread in [owner] + waiters:
+            thread.join(5)
+
+        self.assertEqual([ARTIST_LINK], fetched_links)
+        self.assertEqual([ARTIST_DATA] * 4, results)
+        self.assertEqual(3, registry.duplicates_avoided)
+
+    def test_results_are_cached(self):
+        registry = ArtistRegistry()
+        registry.get(ARTIST_LINK, lambda link: ARTIST_DATA)
+        self.assertEqual(ARTIST_DATA, registry.get(ARTIST_LINK, lambda link: None))
+        self.assertEqual(1, registry.fetches)
+        self.assertEqual(1, registry.cache_hits)
+
+    def test_failures_are_not_cached(self):
+        registry = ArtistRegistry()
+        self.assertIsNone(registry.get(ARTIST_LINK, lambda link: None))
+        self.assertEqual(ARTIST_DATA, registry.get(ARTIST_LINK, lambda link: ARTIST_DATA))
+        self.assertEqual(2, registry.fetches)
+
+    def test_exception_reaches_waiters(self):
+        registry = ArtistRegistry()
+        claim_type, future = registry.claim(ARTIST_LINK)
+        waiter_type, waiter_future = registry.claim(ARTIST_LINK)
+        registry.fail(ARTIST_LINK, future, ValueError('broken page'))
+        self.assertRaises(ValueError, waiter_future.result)
+        self.assertEqual(ARTIST_DATA, registry.get(ARTIST_LINK, lambda link: ARTIST_DATA))
+
+    def test_cache_size(self):
+        registry = ArtistRegistry(cache_size=2)
+
+        for i in range(3):
+            registry.get(f'{ARTIST_LINK}{i}', lambda link: ARTIST_DATA)
+
+        registry.get(f'{ARTIST_LINK}0', lambda link: ARTIST_DATA)
+        self.assertEqual(4, registry.fetches)
+
+
+if __name__ == '__main__':
+    unittest.main()
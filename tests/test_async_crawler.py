@@ -0,0 +1,147 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import aiohttp
+
+import metal_crawler
+from async_crawler import AsyncBandCrawler, crawl_bands_async
+from graph.graph_memory_impl import MemoryStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from ma_standin import StandinCatalog, StandinServer
+from crawler_session import CrawlerSession
+from metal_crawler import PageError, crawl_bands, make_bands_status
+from rate_limiter import AdaptiveRateLimiter
+from response_cache import ResponseCache, set_cache_mode
+from retry_scheduler import ERROR_NOT_FOUND
+
+
+class ForbiddenOnceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    calls = 0
+
+    def do_GET(self):
+        ForbiddenOnceHandler.calls += 1
+
+        if self.path.startswith('/missing'):
+            body = b'Error 404 - Page not found'
+        elif ForbiddenOnceHandler.calls == 1:
+            body = b'Forbidden.\n'
+        else:
+            body = b'<html><body><h1 class="band_name">Darkthrone</h1></body></html>'
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncFetchPage(unittest.TestCase):
+
+    def setUp(self):
+        ForbiddenOnceHandler.calls = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ForbiddenOnceHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def fetch(self, link):
+        crawler = AsyncBandCrawler(None, make_bands_status(), {'bands': {}, 'artists': {}}, None, concurrency=2)
+        crawler.cache = ResponseCache(is_enabled=False)
+
+        async def run():
+            async with aiohttp.ClientSession() as crawler._http:
+                return await crawler.fetch_page(link)
+
+        return asyncio.run(run())
+
+    def test_retry_after_forbidden(self):
+        page_data = self.fetch(self.base + 'bands/Darkthrone/146')
+        self.assertEqual(b'<html><body><h1 class="band_name">Darkthrone</h1></body></html>', page_data)
+        self.assertEqual(2, ForbiddenOnceHandler.calls)
+
+    def test_missing_page(self):
+        with self.assertRaises(PageError) as context:
+            self.fetch(self.base + 'missing/Drakthrone/1')
+
+        self.assertEqual(ERROR_NOT_FOUND, context.exception.error_class)
+        self.assertEqual(1, ForbiddenOnceHandler.calls)
+
+
+class TestCrawlEngines(unittest.TestCase):
+    """Both crawl engines must write the same data of a crawl of the stand-in."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.base_url = metal_crawler.EM_LINK_MAIN
+        cls.catalog = StandinCatalog(12, seed=7, missing_rate=0.0)
+        cls.server = StandinServer(cls.catalog).start()
+        metal_crawler.set_base_url(cls.server.base_url)
+        set_cache_mode(is_enabled=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        metal_crawler.set_base_url(cls.base_url)
+        set_cache_mode()
+
+    def setUp(self):
+        # The crawl frontier, the snapshots and the file of failed bands are written below the working directory.
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.makedirs('databases')
+        # The parser processes are started fresh in the working directory and need the country data like the app.
+        os.symlink(os.path.join(self.cwd, 'data'), 'data')
+        # Nobody is there to stop the crawl.
+        patcher = mock.patch('metal_crawler.read_user_input')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('async_crawler.read_user_input')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The stand-in does not need to be spared.
+        limiter = AdaptiveRateLimiter(rate=1000.0, rate_max=1000.0)
+        patcher = mock.patch('crawler_session._session', CrawlerSession(limiter=limiter))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('async_crawler.get_rate_limiter', return_value=limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def crawl(self, crawl_function):
+        strategy = MemoryStrategy()
+        band_links = [band_entry['link'] for band_entry in self.catalog.bands.values()]
+        bands_status, request_stats = crawl_function(band_links, GraphDatabaseContext(strategy))
+        return strategy, bands_status
+
+    def test_same_data(self):
+        thread_strategy, thread_status = self.crawl(crawl_bands)
+        async_strategy, async_status = self.crawl(crawl_bands_async)
+
+        self.assertEqual(len(self.catalog.bands), len(thread_strategy.nodes['bands']))
+        # Only the time the writes took may differ.
+        del thread_status['db_write_time'], async_status['db_write_time']
+        self.assertEqual(thread_status, async_status)
+        self.assertEqual(thread_strategy.nodes, async_strategy.nodes)
+        self.assertEqual(thread_strategy.band_members, async_strategy.band_members)
+        self.assertEqual(thread_strategy.band_releases, async_strategy.band_releases)
+        self.assertEqual(thread_strategy.country_bands, async_strategy.country_bands)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import unittest
+from unittest import mock
+
+from export_data import ExportRows, make_export_data
+from graph.graph_neomodel_impl import NeoModelStrategy, run_queries_concurrently
+from graph.report import ReportMode
+
+QUERIES = {
+    'slow': ('MATCH (b:Band) RETURN b.country, count(*)', {'delay': 0.3}),
+    'fast': ('MATCH (m:Member) RETURN m.origin, count(*)', {'delay': 0.0}),
+    'medium': ('MATCH (r:Release) RETURN r.name', {'delay': 0.15})
+}
+
+
+class TestRunQueriesConcurrently(unittest.TestCase):
+
+    def test_results_keep_query_order(self):
+        # Every query waits until all of them are in flight; run one after another they would break the barrier.
+        barrier = threading.Barrier(len(QUERIES), timeout=10)
+
+        def fetch(query, parameters, consume=list):
+            barrier.wait()
+            return consume(iter([[query]])), 1, parameters['delay']
+
+        results = run_queries_concurrently(QUERIES, workers=3, fetch=fetch)
+
+        self.assertEqual(list(QUERIES.keys()), list(results.keys()))
+        self.assertEqual(([[QUERIES['medium'][0]]], 1, 0.15), results['medium'])
+
+    def test_records_are_consumed_by_the_workers(self):
+        consumers = []
+
+        def consume(records):
+            consumers.append(threading.current_thread().name)
+            return sum(record[0] for record in records)
+
+        def fetch(query, parameters, consume=list):
+            # A generator: the records are never loaded as a whole.
+            records = ([value] for value in range(parameters['count']))
+            return consume(records), parameters['count'], 0.0
+
+        queries = {'sum': ('MATCH (r:Release) RETURN r.rating', {'count': 1000}, consume)}
+        results = run_queries_concurrently(queries, workers=2, fetch=fetch)
+
+        self.assertEqual((499500, 1000, 0.0), results['sum'])
+        self.assertNotEqual(threading.current_thread().name, consumers[0])
+
+
+EXPORT_ROWS = ExportRows(
+    origins=[['NO', 3], ['SE', 1]],
+    genders=[['NO', 'M', 2], ['NO', 'F', 1]],
+    genders_country=[['NO', 'NO', 'M', 2]],
+    bands=[['NO', 2]],
+    formations=[['NO', '1986-01-01', 1], ['NO', None, 1]],
+    genres=[['NO', ['Black'], 2]],
+    releases=[['NO', 'Darkthrone', 'Transilvanian Hunger', 86, 12, 'Release/10', 'F', '1994-01-01'],
+              ['NO', 'Mayhem', 'Deathcrush', 70, 8, 'Release/11', 'E', '1987-01-01']])
+
+
+class TestNeoModelExport(unittest.TestCase):
+
+    def test_prepare_export_data(self):
+        query_rows = {
+            'RETURN m.origin, count(*)': EXPORT_ROWS.origins,
+            'RETURN m.origin, m.gender, count(*)': EXPORT_ROWS.genders,
+            'RETURN b.country, m.origin': EXPORT_ROWS.genders_country,
+            'RETURN b.country, count(*)': EXPORT_ROWS.bands,
+            'RETURN b.country, b.formed': EXPORT_ROWS.formations,
+            'RETURN b.country, b.genres': EXPORT_ROWS.genres,
+            'RETURN b.country, b.name': EXPORT_ROWS.releases
+        }
+
+        def stream_query(query, parameters=None):
+            return iter(next(rows for key, rows in query_rows.items() if key in query))
+
+        with mock.patch('graph.graph_neomodel_impl.db'), \
+                mock.patch('graph.graph_neomodel_impl.stream_query', side_effect=stream_query):
+            export_data = NeoModelStrategy().prepare_export_data(['NO'], ReportMode.CountryOff)
+
+        expected = make_export_data(EXPORT_ROWS)
+        self.assertEqual(expected.origins, export_data.origins)
+        self.assertEqual(expected.bands_total, export_data.bands_total)
+        self.assertEqual(expected.formation_year_totals, export_data.formation_year_totals)
+        self.assertEqual(expected.genres, export_data.genres)
+        self.assertEqual({year: {release_type: [release.release_name for release in releases]
+                                 for release_type, releases in release_types.items()}
+                          for year, release_types in expected.releases.items()},
+                         {year: {release_type: [release.release_name for release in releases]
+                                 for release_type, releases in release_types.items()}
+                          for year, release_types in export_data.releases.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from crawl_frontier import CrawlFrontier, STATE_PENDING, STATE_IN_FLIGHT, STATE_DONE, STATE_FAILED
+
+BAND_LINKS = ['Darkthrone/146', 'Mayhem/67', 'Burzum/88', 'Emperor/30']
+VISITED_ENTITIES = {'bands': {'Immortal/75': ''}, 'artists': {'Abbath/1460': ''}}
+
+
+class TestCrawlFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'frontier.sqlite'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resume_after_crash(self):
+        frontier = CrawlFrontier(self.path)
+        frontier.start(BAND_LINKS, VISITED_ENTITIES)
+        frontier.mark_in_flight('Darkthrone/146')
+        frontier.mark_done('Darkthrone/146', 'added', ['Fenriz/1224', 'Nocturno_Culto/1225'])
+        frontier.mark_in_flight('Mayhem/67')
+        frontier.mark_in_flight('Burzum/88')
+        frontier.mark_pending('Burzum/88', 1)
+        # The process dies without closing the frontier; Mayhem is still in flight.
+        self.assertEqual({STATE_PENDING: 2, STATE_IN_FLIGHT: 1, STATE_DONE: 1, STATE_FAILED: 0},
+                         frontier.count_states())
+
+        resumed = CrawlFrontier(self.path)
+        self.assertTrue(resumed.can_resume())
+        band_links, visited_entities, is_single_mode = resumed.resume()
+
+        self.assertEqual(['Mayhem/67', 'Burzum/88', 'Emperor/30'], band_links)
+        self.assertEqual({'Immortal/75': '', 'Darkthrone/146': ''}, visited_entities['bands'])
+        self.assertEqual({'Abbath/1460': '', 'Fenriz/1224': '', 'Nocturno_Culto/1225': ''},
+                         visited_entities['artists'])
+        self.assertFalse(is_single_mode)
+        self.assertEqual(4, resumed.get_initial_count())
+        self.assertEqual([('Darkthrone/146', STATE_DONE, 'added', 0), ('Burzum/88', STATE_PENDING, '', 1)],
+                         sorted(resumed.get_link_records(), key=lambda record: record[1]))
+        frontier.close()
+        resumed.close()
+
+    def test_finished_crawl_cannot_be_resumed(self):
+        frontier = CrawlFrontier(self.path)
+        frontier.start(BAND_LINKS[:2], VISITED_ENTITIES)
+        frontier.mark_done('Darkthrone/146', 'skipped')
+        frontier.mark_failed('Mayhem/67', 3)
+
+        self.assertFalse(frontier.can_resume())
+        frontier.close()
+
+    def test_single_mode_adds_links(self):
+        frontier = CrawlFrontier(self.path)
+        frontier.start(BAND_LINKS[:1], VISITED_ENTITIES, is_single_mode=True)
+        frontier.mark_in_flight('Darkthrone/146')
+        frontier.add_links(['Mayhem/67', 'Darkthrone/146', 'Emperor/30'])
+        frontier.close()
+
+        resumed = CrawlFrontier(self.path)
+        band_links, visited_entities, is_single_mode = resumed.resume()
+
+        self.assertEqual(BAND_LINKS[:2] + ['Emperor/30'], band_links)
+        self.assertFalse(is_single_mode)
+        self.assertEqual(4, resumed.get_initial_count())
+        resumed.close()
+
+    def test_start_discards_previous_crawl(self):
+        frontier = CrawlFrontier(self.path)
+        frontier.start(BAND_LINKS, VISITED_ENTITIES)
+        frontier.start(['Emperor/30'], {'bands': {}, 'artists': {}})
+        band_links, visited_entities, is_single_mode = frontier.resume()
+
+        self.assertEqual(['Emperor/30'], band_links)
+        self.assertEqual({'bands': {}, 'artists': {}}, visited_entities)
+        frontier.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
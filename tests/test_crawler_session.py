@@ -0,0 +1,80 @@
+import gzip
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawler_session import CrawlerSession
+from rate_limiter import AdaptiveRateLimiter
+
+PAGE = 'Darkthrone is a Norwegian black metal band.'
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = PAGE.encode('utf-8')
+
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCrawlerSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.limiter = AdaptiveRateLimiter(rate=1000.0, rate_max=1000.0)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/bands/Darkthrone/146'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reuse(self):
+        session = CrawlerSession(pool_size=1, limiter=self.limiter)
+
+        for i in range(5):
+            response = session.request(self.url)
+            self.assertEqual(PAGE, response.data.decode('utf-8'))
+
+        session.clear()
+        self.assertEqual(5, session.stats.requests)
+        self.assertEqual(1, session.stats.connections_opened)
+        self.assertEqual(4, session.stats.connections_reused)
+
+    def test_shared_by_threads(self):
+        session = CrawlerSession(pool_size=2, limiter=self.limiter)
+        results = []
+
+        def fetch():
+            for i in range(10):
+                results.append(session.request(self.url).data.decode('utf-8'))
+
+        threads = [threading.Thread(target=fetch) for i in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        session.clear()
+        self.assertEqual([PAGE] * 40, results)
+        self.assertLessEqual(session.stats.connections_opened, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
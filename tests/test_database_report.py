@@ -0,0 +1,41 @@
+import unittest
+
+from graph.report import ReportMode, ReportRows, make_database_report
+
+ROWS = ReportRows(
+    artists=[('NO', 'M', 5), ('SE', 'M', 2), ('NO', 'F', 1), ('NO', 'X', 9)],
+    bands=[('NO', 3), ('SE', 2)],
+    genres=[('NO', 'Black', 3), ('NO', 'Death', 1), ('SE', 'Death', 3)],
+    band_links=[('NO', ['Darkthrone/146', 'Mayhem/67', 'Burzum/88'])],
+    formations=[('NO', 1986, 1), ('NO', 1984, 2)],
+    members=[('NO', 'NO', 'M', 4), ('NO', 'SE', 'M', 1), ('NO', 'NO', 'F', 1)],
+    release_counts=[('NO', 'F', 20), ('NO', 'D', 7)],
+    releases=[('NO', 'Darkthrone', 'Transilvanian Hunger', 'Darkthrone/Transilvanian_Hunger/1', 'F', '1994-02-17', 86)]
+)
+
+
+class TestMakeDatabaseReport(unittest.TestCase):
+
+    def test_counts_from_rows(self):
+        db_report = make_database_report(ROWS, ['NO', 'FI'], ReportMode.CountryOn, ['F', 'E', 'D'])
+
+        self.assertEqual(5, db_report._band_count)
+        self.assertEqual(8, db_report._amount_artists)
+        self.assertEqual({'NO': 6, 'SE': 2}, db_report._artists_per_country)
+        self.assertEqual([('Death', 4), ('Black', 3)], [genre[:2] for genre in db_report._genres])
+        self.assertEqual({'Full-length': 20, 'Demo': 7}, dict(db_report.album_report.releases_total))
+        self.assertEqual(['Transilvanian Hunger'],
+                         [release[0] for release in db_report.album_report.releases_per_year['1994']['Full-length']])
+        self.assertEqual({1984: 2, 1986: 1}, db_report.bands_per_year)
+
+        self.assertEqual(1, len(db_report._country_reports))
+        country_report = db_report._country_reports[0]
+        self.assertEqual(3, country_report._number_bands)
+        self.assertEqual(5, country_report.get_gender('M'))
+        self.assertEqual(1, country_report.get_gender('F'))
+        self.assertEqual({'NO': 5, 'SE': 1}, country_report._gender_per_country)
+        self.assertEqual(('Black', 3), country_report.get_genres()[0][:2])
+
+
+if __name__ == '__main__':
+    unittest.main()
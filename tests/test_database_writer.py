@@ -0,0 +1,254 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date
+
+from bs4 import BeautifulSoup
+
+from crawl_frontier import CrawlFrontier, STATE_DONE
+from metal_crawler import Artist, Band, DatabaseWriterThread, Release, STATUS_ADDED, STATUS_ERROR, apply_batch_to_db, \
+    make_bands_status, save_band_snapshot
+from snapshot_store import SnapshotStore
+
+
+class BlockingDatabase:
+    """Records written bands and holds the writer in `add_bands` until it's released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.band_links = []
+
+    def write_in_transaction(self, write):
+        return write()
+
+    def add_bands(self, band_dicts):
+        self.release.wait(5)
+        self.band_links.extend(band_dict['link'] for band_dict in band_dicts)
+
+    def add_releases(self, release_dicts):
+        pass
+
+    def add_members(self, member_dicts):
+        pass
+
+    def bands_recorded_releases(self, recordings):
+        pass
+
+    def members_played_in_bands(self, stints):
+        pass
+
+
+class RejectingDatabase(BlockingDatabase):
+    """Rejects every write containing the band with the given link."""
+
+    def __init__(self, rejected_link):
+        super().__init__()
+        self.release.set()
+        self.rejected_link = rejected_link
+
+    def add_bands(self, band_dicts):
+        if any(band_dict['link'] == self.rejected_link for band_dict in band_dicts):
+            raise RuntimeError('Constraint violated.')
+
+        super().add_bands(band_dicts)
+
+
+class RecordingDatabase:
+    """Records the arguments of all bulk writes."""
+
+    def __init__(self):
+        self.calls = {}
+        self.transactions = 0
+
+    def write_in_transaction(self, write):
+        self.transactions += 1
+        return write()
+
+    def __getattr__(self, name):
+        return lambda entities: self.calls.setdefault(name, []).append(entities)
+
+
+class FailingSnapshotStore:
+    """Fails to save the snapshot of one band and to flush."""
+
+    def __init__(self, failing_link):
+        self.failing_link = failing_link
+        self.links = []
+
+    def append(self, country, link, band_data):
+        if link == self.failing_link:
+            raise OSError('No space left on device.')
+
+        self.links.append(link)
+
+    def flush(self):
+        raise OSError('No space left on device.')
+
+    def close(self):
+        pass
+
+
+class FailingFrontier:
+    def mark_done(self, band_link, status, artist_links):
+        if band_link == 'Band_1/1':
+            raise RuntimeError('The frontier is locked.')
+
+
+def make_band(number):
+    band = Band()
+    band.emid = number
+    band.link = f'Band_{number}/{number}'
+    band.country = 'NO'
+    band.visited = '2023-01-01'
+    band.formed = 'N/A'
+    return band
+
+
+def make_artist(emid, instruments):
+    artist = Artist()
+    artist.emid = emid
+    artist.link = f'Artist_{emid}/{emid}'
+    artist.visited = '2023-01-01'
+    artist.pseudonym = f'Pseudonym {emid}'
+    artist.instruments = instruments
+    return artist
+
+
+class TestApplyBatchToDb(unittest.TestCase):
+
+    def test_one_call_per_entity_type(self):
+        first_band = make_band(1)
+        second_band = make_band(2)
+        release = Release()
+        release.emid = 10
+        release.release_date = '0000'
+        first_band.releases[release.emid] = release
+        shared_artist = make_artist(100, [['Drums', [[1990, 1995]]]])
+        first_band.lineup['Current'] = [shared_artist, make_artist(101, [['Vocals', [[1991, 'present']]]])]
+        second_band.lineup['Past'] = [shared_artist]
+        db_handle = RecordingDatabase()
+
+        apply_batch_to_db([first_band, second_band], db_handle, False)
+
+        self.assertEqual(1, db_handle.transactions)
+        self.assertTrue(all(len(calls) == 1 for calls in db_handle.calls.values()))
+        self.assertEqual([1, 2], [band_dict['emid'] for band_dict in db_handle.calls['add_bands'][0]])
+        self.assertEqual(date(1900, 1, 1), db_handle.calls['add_releases'][0][0]['release_date'])
+        self.assertEqual([(1, 10)], db_handle.calls['bands_recorded_releases'][0])
+        self.assertEqual([100, 101], [member_dict['emid'] for member_dict in db_handle.calls['add_members'][0]])
+        stints = db_handle.calls['members_played_in_bands'][0]
+        self.assertEqual([(100, 1, 'C'), (101, 1, 'C'), (100, 2, 'P')],
+                         [(stint['member_id'], stint['band_id'], stint['status']) for stint in stints])
+        self.assertEqual([date(1990, 1, 1), date(1995, 12, 31)], stints[0]['time_frame'])
+
+
+class TestDatabaseWriterThread(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temp_dir.name, 'snapshots')
+        self.db_handle = BlockingDatabase()
+        self.bands_status = make_bands_status()
+        self.frontier = CrawlFrontier(':memory:')
+        self.band_links = [make_band(number).link for number in range(6)]
+        self.frontier.start(self.band_links, {'bands': {}, 'artists': {}})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        self.frontier.close()
+
+    def test_backpressure_and_flush(self):
+        writer = DatabaseWriterThread(self.db_handle, self.bands_status, self.frontier, queue_size=2, batch_size=4,
+                                      snapshot_store=SnapshotStore(self.snapshot_path))
+        writer.start()
+        submitted = threading.Event()
+
+        def submit_all():
+            for number in range(6):
+                writer.submit(make_band(number))
+
+            submitted.set()
+
+        crawler = threading.Thread(target=submit_all)
+        crawler.start()
+        # The writer is stuck in the first band; one more band and a full queue make the crawler wait.
+        self.assertFalse(submitted.wait(0.3))
+
+        self.db_handle.release.set()
+        crawler.join(5)
+        writer.close()
+
+        self.assertEqual(self.band_links, self.db_handle.band_links)
+        self.assertEqual(set(self.band_links), set(self.bands_status[STATUS_ADDED]))
+        self.assertEqual(6, self.frontier.count_states()[STATE_DONE])
+        self.assertLess(writer.batch_count, 6)
+        snapshot_store = SnapshotStore(self.snapshot_path)
+        self.assertEqual(6, len(snapshot_store))
+        self.assertEqual('Band_5/5', snapshot_store.get('Band_5/5')['link'])
+        snapshot_store.close()
+
+    def test_errors_after_writing(self):
+        self.db_handle.release.set()
+        snapshot_store = FailingSnapshotStore('Band_3/3')
+        writer = DatabaseWriterThread(self.db_handle, self.bands_status, FailingFrontier(), queue_size=1,
+                                      batch_size=2, snapshot_store=snapshot_store)
+        writer.start()
+
+        for number in range(6):
+            writer.submit(make_band(number))
+
+        writer.close()
+
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(self.band_links, self.db_handle.band_links)
+        self.assertEqual({'Band_1/1': 'frontier', 'Band_3/3': 'snapshot'}, self.bands_status[STATUS_ERROR])
+        self.assertEqual(5, len(snapshot_store.links))
+
+    def test_snapshots_of_written_bands_only(self):
+        writer = DatabaseWriterThread(RejectingDatabase('Band_2/2'), self.bands_status, self.frontier, batch_size=6,
+                                      snapshot_store=SnapshotStore(self.snapshot_path))
+        writer.start()
+
+        for number in range(6):
+            writer.submit(make_band(number))
+
+        writer.close()
+
+        self.assertEqual({'Band_2/2': 'database'}, self.bands_status[STATUS_ERROR])
+        snapshot_store = SnapshotStore(self.snapshot_path)
+        self.assertEqual(5, len(snapshot_store))
+        self.assertIsNone(snapshot_store.get('Band_2/2'))
+        snapshot_store.close()
+
+    def test_unserializable_snapshot(self):
+        band = make_band(1)
+        band.name = BeautifulSoup('<h1 class="band_name">Darkthrone</h1>', 'html.parser').h1
+        snapshot_store = SnapshotStore(self.snapshot_path)
+
+        with self.assertLogs('Crawler', 'ERROR'):
+            self.assertFalse(save_band_snapshot(band, snapshot_store))
+
+        self.assertTrue(save_band_snapshot(make_band(2), snapshot_store))
+        snapshot_store.close()
+        snapshot_store = SnapshotStore(self.snapshot_path)
+        self.assertEqual(1, len(snapshot_store))
+        snapshot_store.close()
+
+    def test_writer_survives_failed_batches(self):
+        writer = DatabaseWriterThread(self.db_handle, self.bands_status, self.frontier, queue_size=1, batch_size=2)
+        # Something unexpected fails for every batch.
+        writer.write_batch = lambda bands: 1 / 0
+        writer.start()
+
+        for number in range(6):
+            writer.submit(make_band(number))
+
+        writer.close()
+
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(set(self.band_links), set(self.bands_status[STATUS_ERROR]))
+
+
+if __name__ == '__main__':
+    unittest.main()
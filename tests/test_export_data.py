@@ -79,6 +79,18 @@ class TestGenderLoading(unittest.TestCase):
         self.assertEqual(expected_data, data.genders_country)
 
 
+class TestGenderOrigins(unittest.TestCase):
+
+    def test_aggregated_counts(self):
+        data = ExportData()
+        self.assertTrue(data.add_gender_country(band_origin='NO', artist_origin='SE', gender='M', count=12))
+        self.assertTrue(data.add_gender_country(band_origin='NO', artist_origin='SE', gender='F', count=3))
+        self.assertTrue(data.add_gender_country(band_origin='NO', artist_origin='SE', gender='M', count=1))
+        self.assertFalse(data.add_gender_country(band_origin='NO', artist_origin='0', gender='M', count=5))
+        self.assertEqual({'M': 13, 'F': 3}, data.genders_origins['NO']['SE'].genders)
+        self.assertEqual(16, data.genders_origins['NO']['SE'].totals)
+
+
 class TestGenreLoading(unittest.TestCase):
 
     def test_valid_entry(self):
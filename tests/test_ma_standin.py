@@ -0,0 +1,66 @@
+import unittest
+from datetime import date
+
+import metal_crawler
+from ma_standin import StandinCatalog, StandinServer
+from response_cache import set_cache_mode
+from retry_scheduler import ERROR_NOT_FOUND
+
+
+class TestStandin(unittest.TestCase):
+    """Crawls the stand-in with the parsers of the crawler. If these tests fail, the synthetic pages and the parsers
+        went apart.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.base_url = metal_crawler.EM_LINK_MAIN
+        cls.catalog = StandinCatalog(40, seed=3, missing_rate=0.1)
+        cls.server = StandinServer(cls.catalog).start()
+        metal_crawler.set_base_url(cls.server.base_url)
+        set_cache_mode(is_enabled=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        metal_crawler.set_base_url(cls.base_url)
+        set_cache_mode()
+
+    def test_country_list(self):
+        self.assertEqual(list(self.catalog.countries.keys()), metal_crawler.crawl_countries())
+        band_links = metal_crawler.crawl_country('NO')
+        self.assertEqual([self.catalog.bands[band_id]['link'] for band_id in self.catalog.countries['NO']],
+                         band_links)
+
+    def test_band(self):
+        band_entry = next(band for band in self.catalog.bands.values() if not band['is_missing'])
+        band_soup = metal_crawler.cook_soup(metal_crawler.get_band_link(band_entry['link']))
+        band = metal_crawler.parse_band_page(band_soup, band_entry['link'], date.today())
+        self.assertEqual(band_entry['name'], band.name)
+        self.assertEqual(band_entry['country'], band.country)
+        self.assertEqual(str(band_entry['formed']), band.formed)
+
+        lineup_entries = metal_crawler.parse_lineup(band_soup, band)
+        self.assertEqual([str(member[1]) for member in band_entry['members']],
+                         [entry.emid for entry in lineup_entries])
+
+        for entry in lineup_entries:
+            artist_data = metal_crawler.parse_artist_page(metal_crawler.fetch_soup(entry.full_link), entry.full_link)
+            self.assertIsNotNone(metal_crawler.add_artist(band, entry, artist_data, date.today()))
+
+        disco_soup = metal_crawler.cook_soup(metal_crawler.get_discography_link(band.emid))
+        metal_crawler.parse_discography(disco_soup, band)
+        self.assertEqual(disco_soup.find('tbody').text.count('Release'), len(band.releases))
+
+    def test_missing_band(self):
+        band_entry = next(band for band in self.catalog.bands.values() if band['is_missing'])
+        self.assertIsNone(metal_crawler.cook_soup(metal_crawler.get_band_link(band_entry['link'])))
+
+        with self.assertRaises(metal_crawler.PageError) as context:
+            metal_crawler.fetch_soup(metal_crawler.get_band_link(band_entry['link']))
+
+        self.assertEqual(ERROR_NOT_FOUND, context.exception.error_class)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import copy
+import unittest
+
+import test_sqlite_strategy
+from graph.graph_memory_impl import MemoryStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from metal_crawler import apply_batch_to_db
+
+
+class TestMemoryStrategy(test_sqlite_strategy.TestSqliteStrategy):
+    """Runs the tests of the SQLite strategy against the in-memory strategy; both must give the same answers."""
+
+    def make_strategy(self):
+        return MemoryStrategy()
+
+
+class TestMemoryIndexes(unittest.TestCase):
+    """The reverse indexes (bands per country, members per band and bands per member) must follow the nodes."""
+
+    def setUp(self):
+        self.strategy = MemoryStrategy()
+        self.db_handle = GraphDatabaseContext(self.strategy)
+        apply_batch_to_db(test_sqlite_strategy.make_bands(), self.db_handle, False)
+
+    def test_band_moves_country(self):
+        darkthrone = dict(self.strategy.nodes['bands'][1], country='SE')
+        self.strategy._upsert_nodes('bands', [darkthrone])
+
+        self.assertEqual({2}, self.strategy.country_bands['NO'])
+        self.assertEqual({1, 3}, self.strategy.country_bands['SE'])
+        self.assertEqual('SE', self.strategy.nodes['bands'][1]['country'])
+        self.assertEqual([2], self.strategy._get_band_ids(['NO']))
+
+    def test_upsert_band_twice(self):
+        self.strategy._upsert_nodes('bands', [{'emid': 4, 'link': 'Burzum/4', 'country': 'NO'}] * 2)
+
+        self.assertEqual({1, 2, 4}, self.strategy.country_bands['NO'])
+        # Properties which are not given are stored as None.
+        self.assertIsNone(self.strategy.nodes['bands'][4]['name'])
+
+    def test_failed_transaction_keeps_indexes(self):
+        band_members = copy.deepcopy(self.strategy.band_members)
+        member_bands = copy.deepcopy(self.strategy.member_bands)
+        country_bands = copy.deepcopy(self.strategy.country_bands)
+
+        def write():
+            self.db_handle.add_bands([{'emid': 4, 'link': 'Burzum/4', 'country': 'NO'}])
+            self.db_handle.members_played_in_bands([
+                {'member_id': 100, 'band_id': 4, 'instrument': 'Drums', 'pseudonym': 'Fenriz',
+                 'time_frame': [], 'status': 'P'},
+                {'member_id': 101, 'band_id': 1, 'instrument': 'Drums', 'pseudonym': 'Hellhammer',
+                 'time_frame': [], 'status': 'C'}])
+            raise RuntimeError('Lost the connection.')
+
+        with self.assertRaises(RuntimeError):
+            self.db_handle.write_in_transaction(write)
+
+        self.assertEqual(band_members, self.strategy.band_members)
+        self.assertEqual(member_bands, self.strategy.member_bands)
+        self.assertEqual(country_bands, self.strategy.country_bands)
+        self.assertNotIn(4, self.strategy.nodes['bands'])
+
+    def test_stints(self):
+        self.db_handle.members_played_in_bands([
+            # Bathory is connected a second time; the last stint wins.
+            {'member_id': 101, 'band_id': 3, 'instrument': 'Bass', 'pseudonym': 'Hellhammer', 'time_frame': [],
+             'status': 'C'},
+            {'member_id': 101, 'band_id': 3, 'instrument': 'Drums', 'pseudonym': 'Hellhammer', 'time_frame': [],
+             'status': 'P'},
+            # Neither the band nor the member exist; nothing is connected.
+            {'member_id': 101, 'band_id': 4, 'instrument': 'Drums', 'pseudonym': None, 'time_frame': [],
+             'status': 'P'},
+            {'member_id': 103, 'band_id': 1, 'instrument': 'Drums', 'pseudonym': None, 'time_frame': [],
+             'status': 'P'}])
+
+        self.assertEqual('Drums', self.strategy.band_members[3][101]['instrument'])
+        self.assertEqual({101, 102}, set(self.strategy.band_members[3].keys()))
+        self.assertEqual({2, 3}, self.strategy.member_bands[101])
+        self.assertNotIn(4, self.strategy.band_members)
+        self.assertNotIn(103, self.strategy.member_bands)
+
+    def test_stints_after_band_update(self):
+        # Updating a band node must not disconnect its members.
+        self.strategy._upsert_nodes('bands', [dict(self.strategy.nodes['bands'][2], name='Mayhem (NO)')])
+
+        self.assertEqual({100, 101}, set(self.strategy.band_members[2].keys()))
+        self.assertEqual({1, 2}, self.strategy.member_bands[100])
+
+
+if __name__ == '__main__':
+    unittest.main()
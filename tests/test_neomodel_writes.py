@@ -0,0 +1,91 @@
+import re
+import unittest
+from collections import Counter
+from unittest import mock
+
+from graph.graph_memory_impl import MemoryStrategy
+from graph.graph_neomodel_impl import NeoModelStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from metal_crawler import apply_batch_to_db
+from test_sqlite_strategy import make_bands
+
+
+class FakeGraph:
+    """Answers the bulk write statements of `NeoModelStrategy` like Neo4j does: MATCH compares the emids with their
+        type, so '1' does not match a node stored with 1. The aggregations of `calc_bands_per_pop_interface` are
+        answered as well.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.recorded = set()
+        self.played_in = set()
+
+    def cypher_query(self, query, params=None):
+        merged_label = re.search(r'MERGE \(n:(\w+)', query)
+
+        if merged_label is not None:
+            for row in params['rows']:
+                self.nodes.setdefault(merged_label.group(1), {})[row['emid']] = row
+        elif 'RETURN m.gender' in query:
+            member_ids = {member_id for member_id, band_id in self.played_in if band_id in params['emids']}
+            genders = Counter(self.nodes['Member'][member_id]['gender'] for member_id in member_ids)
+            return [list(item) for item in genders.items()], None
+        elif 'UNWIND b.genres' in query:
+            genres = Counter(genre for emid in params['emids'] for genre in self.nodes['Band'][emid]['genres'])
+            return [list(item) for item in genres.items()], None
+        elif 'RECORDED' in query:
+            self.recorded |= {(band_id, release_id) for band_id, release_id in params['rows']
+                              if band_id in self.nodes['Band'] and release_id in self.nodes['Release']}
+        elif 'PLAYED_IN' in query:
+            self.played_in |= {(row['member_id'], row['band_id']) for row in params['rows']
+                               if row['member_id'] in self.nodes['Member'] and row['band_id'] in self.nodes['Band']}
+
+        return [[1]], None
+
+
+class TestNeoModelBulkWrites(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = FakeGraph()
+        patcher = mock.patch('graph.graph_neomodel_impl.db')
+        db = patcher.start()
+        self.addCleanup(patcher.stop)
+        db.cypher_query.side_effect = self.graph.cypher_query
+        self.db_handle = GraphDatabaseContext(NeoModelStrategy())
+
+    def test_string_emids(self):
+        # The crawler delivers all emids as strings (see `get_band_id`).
+        bands = make_bands()
+
+        for band in bands:
+            band.emid = str(band.emid)
+            band.releases = {str(emid): release for emid, release in band.releases.items()}
+
+            for release in band.releases.values():
+                release.emid = str(release.emid)
+
+            for members in band.lineup.values():
+                for member in members:
+                    member.emid = str(member.emid)
+
+        apply_batch_to_db(bands, self.db_handle, False)
+
+        self.assertEqual({1, 2, 3}, set(self.graph.nodes['Band'].keys()))
+        self.assertEqual({(1, 10), (2, 11), (2, 12)}, self.graph.recorded)
+        self.assertEqual({(100, 1), (102, 1), (101, 2), (100, 2), (101, 3), (102, 3)}, self.graph.played_in)
+
+    def test_calc_bands_per_pop(self):
+        # All strategies get the band emids and deliver the same data.
+        memory_handle = GraphDatabaseContext(MemoryStrategy())
+        apply_batch_to_db(make_bands(), memory_handle, False)
+        apply_batch_to_db(make_bands(), self.db_handle, False)
+
+        for bands in [['1', '2'], [1, 2], []]:
+            with self.subTest(bands=bands):
+                self.assertEqual(memory_handle.calc_bands_per_pop('NO', [int(emid) for emid in bands]),
+                                 self.db_handle.calc_bands_per_pop('NO', bands))
+
+
+if __name__ == '__main__':
+    unittest.main()
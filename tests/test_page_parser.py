@@ -0,0 +1,154 @@
+import unittest
+from datetime import date
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from dataclasses_serialization.json import JSONSerializer
+
+from ma_standin import StandinCatalog
+from metal_crawler import EM_LINK_MAIN, Band, add_artist, get_connected_band_links, make_soup, parse_artist_data, \
+    parse_artist_page, parse_band_data, parse_band_page, parse_discography, parse_discography_data, parse_lineup
+from page_parser import PAGE_ARTIST, PAGE_BAND, PAGE_DISCOGRAPHY, PARSER_HTML, PARSER_LXML, get_parser_backend, \
+    is_lxml_available, parse_page
+
+PAGES_PATH = Path(__file__).parent / 'pages'
+TODAY = date(2023, 5, 1)
+FIXTURE_ARTIST_LINK = 'https://www.metal-archives.com/artists/Fenriz/1035'
+
+
+def read_page(file_name):
+    return (PAGES_PATH / file_name).read_bytes()
+
+
+def cook_reference_soup(page_data):
+    # The parser of the crawler before parser backends existed.
+    return BeautifulSoup(page_data.decode('utf-8', 'ignore'), 'html.parser')
+
+
+def scrape_band(band_soup, band_short_link):
+    band = parse_band_page(band_soup, band_short_link, TODAY)
+
+    if band is None:
+        return None
+
+    lineup_entries = parse_lineup(band_soup, band)
+    return (JSONSerializer.serialize(band), [lineup_entry.__dict__ for lineup_entry in lineup_entries],
+            get_connected_band_links(band_soup))
+
+
+def scrape_discography(disco_soup):
+    band = Band()
+    parse_discography(disco_soup, band)
+    return JSONSerializer.serialize(band)['releases']
+
+
+def make_pages():
+    """Creates the band, artist and discography pages of the fixtures and of a stand-in catalog.
+
+    :return: A tuple of three lists: the band pages as tuples of short link and page, the artist pages as tuples of
+        link and page and the discography pages.
+    """
+    catalog = StandinCatalog(30, seed=11)
+    band_pages = [('Fixture_Band/146', read_page('band.html')),
+                  ('Single_Fixture/2000', read_page('band_single_lineup.html'))]
+    band_pages += [(band['link'], catalog.render_band(band['id'], EM_LINK_MAIN).encode('utf-8'))
+                   for band in catalog.bands.values()]
+    artist_pages = [(FIXTURE_ARTIST_LINK, read_page('artist.html'))]
+    artist_pages += [(f'{EM_LINK_MAIN}artists/Standin_Artist_{artist_id}/{artist_id}',
+                      catalog.render_artist(artist_id, EM_LINK_MAIN).encode('utf-8'))
+                     for artist_id in list(catalog.artists.keys())[:30]]
+    disco_pages = [read_page('discography.html')]
+    disco_pages += [catalog.render_discography(band_id, EM_LINK_MAIN).encode('utf-8') for band_id in catalog.bands]
+    return band_pages, artist_pages, disco_pages
+
+
+class TestPageParserEquivalence(unittest.TestCase):
+    """Every parser backend, with or without partial parsing, must give the scrapers the same data as the full tree of
+        html.parser.
+    """
+    backend = PARSER_HTML
+
+    @classmethod
+    def setUpClass(cls):
+        cls.band_pages, cls.artist_pages, cls.disco_pages = make_pages()
+
+    def test_band_pages(self):
+        for band_short_link, page_data in self.band_pages:
+            expected = scrape_band(cook_reference_soup(page_data), band_short_link)
+            self.assertIsNotNone(expected)
+
+            for is_partial in [False, True]:
+                with self.subTest(band=band_short_link, is_partial=is_partial):
+                    band_soup = parse_page(page_data, PAGE_BAND, self.backend, is_partial)
+                    self.assertEqual(expected, scrape_band(band_soup, band_short_link))
+
+    def test_artist_pages(self):
+        for artist_link, page_data in self.artist_pages:
+            expected = parse_artist_page(cook_reference_soup(page_data), artist_link)
+
+            for is_partial in [False, True]:
+                with self.subTest(artist=artist_link, is_partial=is_partial):
+                    artist_soup = parse_page(page_data, PAGE_ARTIST, self.backend, is_partial)
+                    self.assertEqual(expected, parse_artist_page(artist_soup, artist_link))
+
+    def test_discography_pages(self):
+        for page_data in self.disco_pages:
+            expected = scrape_discography(cook_reference_soup(page_data))
+
+            for is_partial in [False, True]:
+                with self.subTest(page=page_data[:80], is_partial=is_partial):
+                    disco_soup = parse_page(page_data, PAGE_DISCOGRAPHY, self.backend, is_partial)
+                    self.assertEqual(expected, scrape_discography(disco_soup))
+
+    def test_partial_tree(self):
+        band_soup = parse_page(read_page('band.html'), PAGE_BAND, self.backend, is_partial=True)
+        self.assertIsNone(band_soup.find('div', attrs={'id': 'header'}))
+        self.assertIsNone(band_soup.find('script'))
+        self.assertEqual('Fixture Band', band_soup.find(attrs={'class': 'band_name'}).text)
+
+
+@unittest.skipUnless(is_lxml_available(), 'lxml is not installed.')
+class TestPageParserEquivalenceLxml(TestPageParserEquivalence):
+    backend = PARSER_LXML
+
+
+class TestCrawlParsing(unittest.TestCase):
+    """The parse_*_data functions of the crawl (with the configured backend) must build the same bands as before."""
+
+    def test_band(self):
+        band_soup = cook_reference_soup(read_page('band.html'))
+        expected = parse_band_page(band_soup, 'Fixture_Band/146', TODAY)
+        artist_data = parse_artist_page(cook_reference_soup(read_page('artist.html')), FIXTURE_ARTIST_LINK)
+
+        for lineup_entry in parse_lineup(band_soup, expected):
+            add_artist(expected, lineup_entry, artist_data, TODAY)
+
+        parse_discography(cook_reference_soup(read_page('discography.html')), expected)
+
+        band, lineup_entries, linked_bands = parse_band_data(read_page('band.html'), 'Fixture_Band/146', TODAY, True)
+        artist_data = parse_artist_data(read_page('artist.html'), FIXTURE_ARTIST_LINK)
+
+        for lineup_entry in lineup_entries:
+            add_artist(band, lineup_entry, artist_data, TODAY)
+
+        band.releases = parse_discography_data(read_page('discography.html'), 'discography/146')
+
+        self.assertEqual(JSONSerializer.serialize(expected), JSONSerializer.serialize(band))
+        self.assertEqual(['Isengard/147', 'Valhall/148'], linked_bands)
+        self.assertEqual(['Current', 'Past (Live)'], list(band.lineup.keys()))
+        self.assertEqual(['1002', '1003'], [release_id for release_id, release in band.releases.items()
+                                            if release.review_count > 0])
+
+    def test_not_a_band_page(self):
+        # None of the regions exists; the whole page is parsed and the band scraper rejects it.
+        page_data = read_page('not_a_band.html')
+        self.assertIn('No band with this name', make_soup('Fixture_Band/146', page_data, PAGE_BAND).text)
+        self.assertEqual((None, [], []), parse_band_data(page_data, 'Fixture_Band/146', TODAY))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_parser_backend('html5lib')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import pickle
+import queue
+import unittest
+from datetime import date
+
+import metal_crawler
+from ma_standin import StandinCatalog, StandinServer
+from parser_pool import ParserPool, get_start_context
+from response_cache import set_cache_mode
+from retry_scheduler import ERROR_NOT_FOUND
+
+
+def fail_with_page_error(link):
+    raise metal_crawler.PageError(link, ERROR_NOT_FOUND)
+
+
+class TestParserPool(unittest.TestCase):
+    """Pages parsed in worker processes must give the same bands as pages parsed by the crawling threads."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.base_url = metal_crawler.EM_LINK_MAIN
+        cls.catalog = StandinCatalog(20, seed=5, missing_rate=0.0)
+        cls.server = StandinServer(cls.catalog).start()
+        metal_crawler.set_base_url(cls.server.base_url)
+        set_cache_mode(is_enabled=False)
+        cls.parser_pool = ParserPool(2, initializer=metal_crawler.set_base_url, initargs=(cls.server.base_url,))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parser_pool.close()
+        cls.server.stop()
+        metal_crawler.set_base_url(cls.base_url)
+        set_cache_mode()
+
+    def crawl_band(self, band_short_link, parser_pool):
+        thread = metal_crawler.VisitBandThread('0', queue.Queue(), None, metal_crawler.make_bands_status(),
+                                               {'bands': {}, 'artists': {}}, None, [], is_single_mode=False,
+                                               parser_pool=parser_pool)
+        return thread.crawl_band(band_short_link)
+
+    def test_same_bands(self):
+        for band_entry in list(self.catalog.bands.values())[:5]:
+            with self.subTest(band=band_entry['link']):
+                expected = self.crawl_band(band_entry['link'], ParserPool(0))
+                actual = self.crawl_band(band_entry['link'], self.parser_pool)
+                self.assertIsNotNone(expected)
+                self.assertEqual(expected, actual)
+                self.assertEqual(expected.releases, actual.releases)
+                self.assertEqual({lineup_type: [artist.__dict__ for artist in artists]
+                                  for lineup_type, artists in expected.lineup.items()},
+                                 {lineup_type: [artist.__dict__ for artist in artists]
+                                  for lineup_type, artists in actual.lineup.items()})
+
+    def test_connected_bands(self):
+        band_entry = next(iter(self.catalog.bands.values()))
+        band_page = metal_crawler.fetch_page(metal_crawler.get_band_link(band_entry['link']))
+        band, lineup_entries, linked_bands = self.parser_pool.parse(
+            metal_crawler.parse_band_data, band_page, band_entry['link'], date.today(), True)
+        self.assertEqual(metal_crawler.get_connected_band_links(metal_crawler.make_soup_or_raise('', band_page)),
+                         linked_bands)
+
+    def test_workers_are_not_forked(self):
+        # The crawl's threads exist when the workers start; a forked worker could inherit one of their locks.
+        self.assertIn(get_start_context().get_start_method(), ['forkserver', 'spawn'])
+
+    def test_page_error(self):
+        error = pickle.loads(pickle.dumps(metal_crawler.PageError('bands/Darkthrone/146', ERROR_NOT_FOUND)))
+        self.assertEqual(('bands/Darkthrone/146', ERROR_NOT_FOUND), (error.link, error.error_class))
+
+        for parser_pool in [ParserPool(0), self.parser_pool]:
+            with self.assertRaises(metal_crawler.PageError) as context:
+                parser_pool.parse(fail_with_page_error, 'bands/Darkthrone/146')
+
+            self.assertEqual(ERROR_NOT_FOUND, context.exception.error_class)
+
+
+if __name__ == '__main__':
+    unittest.main()
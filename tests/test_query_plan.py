@@ -0,0 +1,32 @@
+import unittest
+
+from graph.graph_neomodel_impl import SCAN_OPERATORS, get_plan_operators
+
+INDEX_PLAN = {
+    'operatorType': 'ProduceResults@neo4j',
+    'children': [{'operatorType': 'Projection@neo4j',
+                  'children': [{'operatorType': 'NodeIndexSeek@neo4j', 'children': []}]}]
+}
+SCAN_PLAN = {
+    'operatorType': 'ProduceResults@neo4j',
+    'children': [{'operatorType': 'Filter@neo4j',
+                  'children': [{'operatorType': 'NodeByLabelScan@neo4j', 'children': []}]}]
+}
+
+
+class TestQueryPlan(unittest.TestCase):
+
+    def test_index_seek(self):
+        operators = get_plan_operators(INDEX_PLAN)
+        self.assertEqual(['ProduceResults', 'Projection', 'NodeIndexSeek'], operators)
+        self.assertFalse(any(operator in SCAN_OPERATORS for operator in operators))
+
+    def test_label_scan(self):
+        self.assertIn('NodeByLabelScan', get_plan_operators(SCAN_PLAN))
+
+    def test_no_plan(self):
+        self.assertEqual([], get_plan_operators(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
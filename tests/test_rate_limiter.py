@@ -0,0 +1,74 @@
+import unittest
+
+from rate_limiter import AdaptiveRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = AdaptiveRateLimiter(rate=2.0, rate_min=0.5, rate_max=10.0, increase=1.0, decrease=0.5,
+                                           forbidden_rate_max=0.1, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_bucket_limits_rate(self):
+        # The bucket starts full with two tokens; afterwards every request has to wait half a second.
+        for i in range(6):
+            self.limiter.acquire()
+
+        self.assertAlmostEqual(2.0, self.clock.now)
+
+    def test_additive_increase(self):
+        for i in range(10):
+            self.limiter.report_success()
+
+        self.assertGreater(self.limiter.rate, 2.0)
+        self.assertLessEqual(self.limiter.rate, 10.0)
+
+        for i in range(1000):
+            self.limiter.report_success()
+
+        self.assertEqual(10.0, self.limiter.rate)
+
+    def test_multiplicative_decrease(self):
+        self.limiter.report_forbidden()
+        self.assertEqual(1.0, self.limiter.rate)
+        # Answers of requests still in flight with the old rate do not cut again.
+        self.limiter.report_forbidden()
+        self.assertEqual(1.0, self.limiter.rate)
+        self.clock.now += 1.0
+        self.limiter.report_forbidden()
+        self.assertEqual(0.5, self.limiter.rate)
+        self.clock.now += 2.0
+        self.limiter.report_forbidden()
+        self.assertEqual(0.5, self.limiter.rate)
+
+    def test_forbidden_answers_stop_growth(self):
+        self.limiter.report_forbidden()
+        rate = self.limiter.rate
+
+        # One forbidden in five answers is above the allowed share of 10%.
+        for i in range(4):
+            self.limiter.report_success()
+
+        self.assertEqual(rate, self.limiter.rate)
+        self.assertAlmostEqual(0.2, self.limiter.forbidden_rate)
+
+    def test_forbidden_empties_bucket(self):
+        self.limiter.report_forbidden()
+        self.limiter.acquire()
+        self.assertAlmostEqual(1.0, self.clock.now)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import metal_crawler
+from response_cache import ResponseCache, get_entity_type, get_response_cache, set_cache_mode
+from settings import CRAWLER_CACHE_ENABLED
+
+ARTIST_LINK = 'https://www.metal-archives.com/artists/Fenriz/1224'
+BAND_LINK = 'https://www.metal-archives.com/bands/Darkthrone/146'
+PAGE = b'<html><body><h1 class="band_name">Darkthrone</h1></body></html>'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.cache = ResponseCache(self.temp_dir.name, {'artist': 10, 'band': 1, 'other': 0}, clock=self.clock)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_entity_type(self):
+        self.assertEqual('artist', get_entity_type(ARTIST_LINK))
+        self.assertEqual('band', get_entity_type(BAND_LINK))
+        self.assertEqual('discography',
+                         get_entity_type('https://www.metal-archives.com/band/discography/id/146/tab/all'))
+        self.assertEqual('other', get_entity_type('https://www.metal-archives.com/albums/Darkthrone/Panzerfaust/71'))
+
+    def test_miss_store_hit(self):
+        self.assertIsNone(self.cache.lookup(BAND_LINK))
+        self.cache.store(BAND_LINK, PAGE, {})
+        entry = self.cache.lookup(BAND_LINK)
+        self.assertTrue(entry.is_fresh)
+        self.assertEqual(PAGE, entry.data)
+        self.assertEqual(1, self.cache.stats.hits)
+        self.assertEqual(1, self.cache.stats.misses)
+        self.assertEqual(len(PAGE), self.cache.stats.bytes_saved)
+
+    def test_ttl_per_entity_type(self):
+        self.cache.store(BAND_LINK, PAGE, {})
+        self.cache.store(ARTIST_LINK, PAGE, {})
+        self.clock.now += 2 * 86400
+        self.assertFalse(self.cache.lookup(BAND_LINK).is_fresh)
+        self.assertTrue(self.cache.lookup(ARTIST_LINK).is_fresh)
+
+    def test_zero_ttl_is_not_stored(self):
+        link = 'https://www.metal-archives.com/albums/Darkthrone/Panzerfaust/71'
+        self.cache.store(link, PAGE, {})
+        self.assertIsNone(self.cache.lookup(link))
+
+    def test_revalidation(self):
+        self.cache.store(BAND_LINK, PAGE, {'ETag': '"abc"', 'Last-Modified': 'Sat, 01 Jan 2022 00:00:00 GMT'})
+        self.clock.now += 2 * 86400
+        entry = self.cache.lookup(BAND_LINK)
+        self.assertFalse(entry.is_fresh)
+        self.assertEqual({'If-None-Match': '"abc"', 'If-Modified-Since': 'Sat, 01 Jan 2022 00:00:00 GMT'},
+                         entry.get_validators())
+        self.cache.refresh(entry, {'ETag': '"def"'})
+        entry = self.cache.lookup(BAND_LINK)
+        self.assertTrue(entry.is_fresh)
+        self.assertEqual('"def"', entry.etag)
+        self.assertEqual(1, self.cache.stats.revalidated)
+
+    def test_no_validators(self):
+        self.cache.store(BAND_LINK, PAGE, {})
+        self.assertIsNone(self.cache.lookup(BAND_LINK).get_validators())
+
+    def test_cache_only_ignores_age(self):
+        self.cache.store(BAND_LINK, PAGE, {})
+        self.clock.now += 100 * 86400
+        cache_only = ResponseCache(self.temp_dir.name, {'band': 1}, is_enabled=False, is_cache_only=True,
+                                   clock=self.clock)
+        self.assertTrue(cache_only.lookup(BAND_LINK).is_fresh)
+
+    def test_disabled(self):
+        cache = ResponseCache(self.temp_dir.name, {'band': 1}, is_enabled=False, clock=self.clock)
+        cache.store(BAND_LINK, PAGE, {})
+        self.assertIsNone(cache.lookup(BAND_LINK))
+        self.assertIsNone(self.cache.lookup(BAND_LINK))
+
+    def test_cache_mode_follows_settings(self):
+        self.addCleanup(set_cache_mode)
+        set_cache_mode(is_cache_only=True)
+        self.assertEqual(CRAWLER_CACHE_ENABLED, get_response_cache().is_enabled)
+        self.assertTrue(get_response_cache().is_cache_only)
+
+    def test_invalidate(self):
+        self.cache.store(BAND_LINK, PAGE, {})
+        self.cache.invalidate(BAND_LINK)
+        self.assertIsNone(self.cache.lookup(BAND_LINK))
+        # Nothing to remove anymore.
+        self.cache.invalidate(BAND_LINK)
+
+    def test_cache_only_keeps_invalid_pages(self):
+        self.cache.store(BAND_LINK, PAGE, {})
+        cache_only = ResponseCache(self.temp_dir.name, {'band': 1}, is_enabled=False, is_cache_only=True,
+                                   clock=self.clock)
+        cache_only.invalidate(BAND_LINK)
+        self.assertIsNotNone(cache_only.lookup(BAND_LINK))
+
+
+class InlinePool:
+    def parse(self, function, *args):
+        return function(*args)
+
+
+def fail_parsing(page_data, link):
+    raise ValueError(f'Cannot parse {link}.')
+
+
+class TestParseFetchedPage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.temp_dir.name, {'artist': 10, 'band': 1})
+        self.cache.store(ARTIST_LINK, PAGE, {})
+        patcher = mock.patch('metal_crawler.get_response_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parsed_page_stays(self):
+        result = metal_crawler.parse_fetched_page(InlinePool(), ARTIST_LINK, PAGE, lambda data, link: link,
+                                                  ARTIST_LINK)
+        self.assertEqual(ARTIST_LINK, result)
+        self.assertIsNotNone(self.cache.lookup(ARTIST_LINK))
+
+    def test_unparsable_page_is_removed(self):
+        with self.assertRaises(ValueError):
+            metal_crawler.parse_fetched_page(InlinePool(), ARTIST_LINK, PAGE, fail_parsing, ARTIST_LINK)
+
+        self.assertIsNone(self.cache.lookup(ARTIST_LINK))
+
+    def test_empty_result_removes_page(self):
+        self.assertIsNone(metal_crawler.parse_fetched_page(InlinePool(), ARTIST_LINK, PAGE, lambda data: None))
+        self.assertIsNone(self.cache.lookup(ARTIST_LINK))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from retry_scheduler import RetryScheduler, ERROR_FORBIDDEN, ERROR_TIMEOUT, ERROR_NOT_FOUND, ERROR_PARSE
+
+BACKOFF = {ERROR_FORBIDDEN: (30.0, 4), ERROR_TIMEOUT: (2.0, 3), ERROR_PARSE: (10.0, 2), ERROR_NOT_FOUND: (0.0, 1)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = RetryScheduler(BACKOFF, delay_max=100.0, clock=self.clock, seed=1)
+
+    def test_exponential_backoff_with_jitter(self):
+        for attempts, delay in [(1, 30.0), (2, 60.0), (3, 100.0)]:
+            backoff_delay = self.scheduler.get_backoff_delay(attempts, ERROR_FORBIDDEN)
+            self.assertGreaterEqual(backoff_delay, delay / 2)
+            self.assertLessEqual(backoff_delay, delay)
+
+        self.assertIsNone(self.scheduler.get_backoff_delay(4, ERROR_FORBIDDEN))
+
+    def test_error_classes(self):
+        self.assertFalse(self.scheduler.schedule('Mayhem/67', 1, ERROR_NOT_FOUND))
+        self.assertTrue(self.scheduler.schedule('Darkthrone/146', 1, ERROR_PARSE))
+        self.assertFalse(self.scheduler.schedule('Darkthrone/146', 2, ERROR_PARSE))
+        self.assertEqual(1, len(self.scheduler))
+
+    def test_pop_due_in_time_order(self):
+        self.assertIsNone(self.scheduler.get_delay())
+        self.scheduler.schedule('Burzum/88', 1, ERROR_FORBIDDEN)
+        self.scheduler.schedule('Darkthrone/146', 1, ERROR_TIMEOUT)
+        self.scheduler.schedule('Emperor/30', 2, ERROR_TIMEOUT)
+
+        self.assertLessEqual(self.scheduler.get_delay(), 2.0)
+        self.assertEqual([], self.scheduler.pop_due())
+
+        self.clock.now = 4.0
+        self.assertEqual(['Darkthrone/146', 'Emperor/30'], self.scheduler.pop_due())
+        self.assertGreater(self.scheduler.get_delay(), 10.0)
+
+        self.clock.now = 30.0
+        self.assertEqual(['Burzum/88'], self.scheduler.pop_due())
+        self.assertEqual(0, len(self.scheduler))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+
+from dataclasses_serialization.json import JSONSerializer
+
+from graph.graph_memory_impl import MemoryStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from metal_crawler import apply_batch_to_db, make_band_from_snapshot, save_band_snapshot
+from snapshot_import import import_snapshots
+from snapshot_store import SnapshotStore
+from test_sqlite_strategy import make_bands
+
+
+class TestSnapshotImport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_store = SnapshotStore(self.temp_dir.name)
+
+        for band in make_bands():
+            save_band_snapshot(band, self.snapshot_store)
+
+        self.snapshot_store.flush()
+        self.expected = MemoryStrategy()
+        apply_batch_to_db(make_bands(), GraphDatabaseContext(self.expected), False)
+
+    def tearDown(self):
+        self.snapshot_store.close(compact_ratio=None)
+        self.temp_dir.cleanup()
+
+    def test_band_from_snapshot(self):
+        band = make_bands()[1]
+        restored_band = make_band_from_snapshot(JSONSerializer.serialize(band))
+
+        self.assertEqual(band, restored_band)
+        self.assertEqual(['Pseudonym 101'], [artist.pseudonym for artist in restored_band.lineup['Current']])
+        self.assertEqual([11, 12], list(restored_band.releases.keys()))
+
+    def assert_imported(self, strategy):
+        self.assertEqual(self.expected.nodes, strategy.nodes)
+        self.assertEqual(self.expected.band_members, strategy.band_members)
+        self.assertEqual(self.expected.band_releases, strategy.band_releases)
+
+    def test_import_in_process(self):
+        strategy = MemoryStrategy()
+        imported_count, failed_links = import_snapshots(GraphDatabaseContext(strategy), self.snapshot_store,
+                                                        batch_size=2, workers=1)
+
+        self.assertEqual((3, []), (imported_count, failed_links))
+        self.assert_imported(strategy)
+
+    def test_import_with_workers(self):
+        strategy = MemoryStrategy()
+        imported_count, failed_links = import_snapshots(GraphDatabaseContext(strategy), self.snapshot_store,
+                                                        batch_size=1, workers=2)
+
+        self.assertEqual((3, []), (imported_count, failed_links))
+        self.assert_imported(strategy)
+
+    def test_import_countries(self):
+        strategy = MemoryStrategy()
+        imported_count, failed_links = import_snapshots(GraphDatabaseContext(strategy), self.snapshot_store, ['SE'],
+                                                        workers=1)
+
+        self.assertEqual(1, imported_count)
+        self.assertEqual({3}, set(strategy.nodes['bands'].keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import unittest
+
+from snapshot_store import SnapshotStore, INDEX_NAME
+
+
+def make_band_data(number, country='NO', name=None):
+    return {'emid': number, 'link': f'Band_{number}/{number}', 'country': country, 'name': name or f'Band {number}'}
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'snapshots')
+        self.store = SnapshotStore(self.path, segment_bytes=200)
+
+    def tearDown(self):
+        self.store.close(compact_ratio=None)
+        self.temp_dir.cleanup()
+
+    def append_bands(self, numbers, country='NO'):
+        for number in numbers:
+            band_data = make_band_data(number, country)
+            self.store.append(country, band_data['link'], band_data)
+
+        self.store.flush()
+
+    def test_get_and_iterate(self):
+        self.append_bands(range(10))
+        self.append_bands([20, 21], 'SE')
+
+        self.assertEqual(12, len(self.store))
+        self.assertEqual(['NO', 'SE'], self.store.get_countries())
+        self.assertEqual(make_band_data(7), self.store.get('Band_7/7'))
+        self.assertIsNone(self.store.get('Band_99/99'))
+        self.assertEqual(list(range(10)), [band['emid'] for band in self.store.iter_bands('NO')])
+        # The small segment size forces the records into several segments.
+        self.assertGreater(len(self.store.get_segment_numbers('NO')), 1)
+
+    def test_records_are_indexed_on_flush(self):
+        band_data = make_band_data(1)
+        self.store.append('NO', band_data['link'], band_data)
+        self.assertIsNone(self.store.get(band_data['link']))
+
+        self.store.flush()
+        self.assertEqual(band_data, self.store.get(band_data['link']))
+
+    def test_superseded_snapshots_are_compacted(self):
+        self.append_bands(range(5))
+        band_data = make_band_data(2, name='Renamed')
+        self.store.append('NO', band_data['link'], band_data)
+        self.store.flush()
+        self.assertEqual('Renamed', self.store.get('Band_2/2')['name'])
+        self.assertGreater(self.store.get_garbage_ratio('NO'), 0.0)
+
+        old_numbers = self.store.get_segment_numbers('NO')
+        self.store.compact('NO')
+
+        self.assertEqual(0.0, self.store.get_garbage_ratio('NO'))
+        self.assertTrue(set(old_numbers).isdisjoint(self.store.get_segment_numbers('NO')))
+        self.assertEqual([0, 1, 3, 4, 2], [band['emid'] for band in self.store.iter_bands('NO')])
+        self.assertEqual('Renamed', self.store.get('Band_2/2')['name'])
+
+        # Appending continues after the compacted segments.
+        self.append_bands([5])
+        self.assertEqual(6, len(list(self.store.iter_bands('NO'))))
+
+    def test_rebuild_index(self):
+        self.append_bands(range(4))
+        self.append_bands([1])
+        self.store.close(compact_ratio=None)
+        os.remove(os.path.join(self.path, INDEX_NAME))
+
+        self.store = SnapshotStore(self.path, segment_bytes=200)
+        self.assertEqual(0, len(self.store))
+        self.store.rebuild_index()
+
+        self.assertEqual(4, len(self.store))
+        self.assertEqual([0, 2, 3, 1], [band['emid'] for band in self.store.iter_bands('NO')])
+
+    def test_broken_tail_is_skipped(self):
+        self.append_bands(range(2))
+        segment_path = self.store.get_segment_path('NO', self.store.get_segment_numbers('NO')[-1])
+        self.store.close(compact_ratio=None)
+
+        with open(segment_path, 'ab') as segment_file:
+            segment_file.write(b'\x00\x05\x00')
+
+        self.store = SnapshotStore(self.path, segment_bytes=200)
+        self.store.rebuild_index()
+        self.assertEqual(2, len(self.store))
+
+    def test_import_json_files(self):
+        legacy_path = os.path.join(self.temp_dir.name, 'legacy', 'SE')
+        os.makedirs(legacy_path)
+
+        with open(os.path.join(legacy_path, 'Band_3_3.json'), 'w', encoding='utf-8') as band_file:
+            json.dump(make_band_data(3, 'SE'), band_file)
+
+        self.assertEqual(1, self.store.import_json_files(os.path.dirname(legacy_path)))
+        self.assertEqual(make_band_data(3, 'SE'), self.store.get('Band_3/3'))
+
+    def test_import_json_files_skips_other_files(self):
+        legacy_path = os.path.join(self.temp_dir.name, 'legacy', 'NO')
+        os.makedirs(legacy_path)
+        files = {
+            'Band_1_1.json': json.dumps(make_band_data(1)),
+            'Band_2_2.json': json.dumps(make_band_data(2))[:20],
+            'genres.json': json.dumps({'Black': 2}),
+            'list.json': json.dumps(['Band_3/3'])
+        }
+
+        for file_name, content in files.items():
+            with open(os.path.join(legacy_path, file_name), 'w', encoding='utf-8') as json_file:
+                json_file.write(content)
+
+        with self.assertLogs('Snapshots', 'ERROR') as logs:
+            self.assertEqual(1, self.store.import_json_files(os.path.dirname(legacy_path)))
+
+        self.assertEqual(3, len(logs.records))
+        self.assertEqual(make_band_data(1), self.store.get('Band_1/1'))
+
+    def test_import_json_files_keeps_newer_snapshots(self):
+        legacy_path = os.path.join(self.temp_dir.name, 'legacy', 'NO')
+        os.makedirs(legacy_path)
+
+        for number in [1, 2]:
+            with open(os.path.join(legacy_path, f'Band_{number}_{number}.json'), 'w', encoding='utf-8') as band_file:
+                json.dump(make_band_data(number, name='Legacy'), band_file)
+
+        crawled_band = make_band_data(1, name='Crawled')
+        self.store.append('NO', crawled_band['link'], crawled_band)
+        self.store.flush()
+
+        self.assertEqual(1, self.store.import_json_files(os.path.dirname(legacy_path)))
+        self.assertEqual(crawled_band, self.store.get('Band_1/1'))
+        self.assertEqual(make_band_data(2, name='Legacy'), self.store.get('Band_2/2'))
+        # A second import finds nothing new.
+        self.assertEqual(0, self.store.import_json_files(os.path.dirname(legacy_path)))
+        self.assertEqual(2, len(self.store))
+
+
+if __name__ == '__main__':
+    unittest.main()
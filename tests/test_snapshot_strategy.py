@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+import settings
+from export_data import ExportData
+from graph.graph_memory_impl import MemoryStrategy
+from graph.graph_snapshot_impl import SnapshotStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from graph.report import ReportMode
+from metal_crawler import apply_batch_to_db, save_band_snapshot
+from snapshot_store import SnapshotStore
+from test_sqlite_strategy import make_bands
+
+
+def get_genders(export_genders) -> dict:
+    return {key: export_gender.genders for key, export_gender in export_genders.items()}
+
+
+def get_releases(export_data) -> dict:
+    return {year: {release_type: sorted(release.release_name for release in releases)
+                   for release_type, releases in release_types.items()}
+            for year, release_types in export_data.releases.items()}
+
+
+class TestSnapshotStrategy(unittest.TestCase):
+    """The snapshot strategy must deliver what a database filled with the same bands delivers."""
+
+    def setUp(self):
+        # Country reports look for link files below the working directory.
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        snapshot_store = SnapshotStore('snapshots')
+
+        for band in make_bands():
+            save_band_snapshot(band, snapshot_store)
+
+        snapshot_store.close()
+        self.snapshot_handle = GraphDatabaseContext(self.make_strategy())
+        self.memory_handle = GraphDatabaseContext(MemoryStrategy())
+        apply_batch_to_db(make_bands(), self.memory_handle, False)
+
+    def make_strategy(self):
+        self.strategy = SnapshotStrategy('snapshots', workers=1)
+        return self.strategy
+
+    def tearDown(self):
+        self.strategy.close()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def assert_export_data_equal(self, expected, actual):
+        self.assertEqual(expected.origins, actual.origins)
+        self.assertEqual(get_genders(expected.genders_country), get_genders(actual.genders_country))
+        self.assertEqual({country: get_genders(origins) for country, origins in expected.genders_origins.items()},
+                         {country: get_genders(origins) for country, origins in actual.genders_origins.items()})
+        self.assertEqual(expected.genres, actual.genres)
+        self.assertEqual(expected.formation_year_totals, actual.formation_year_totals)
+        self.assertEqual(expected.bands_total, actual.bands_total)
+        self.assertEqual({country: (data.number_bands, data.formation_years)
+                          for country, data in expected.country_data.items()},
+                         {country: (data.number_bands, data.formation_years)
+                          for country, data in actual.country_data.items()})
+        self.assertEqual(get_releases(expected), get_releases(actual))
+
+    def test_prepare_export_data(self):
+        for country_shorts in [['NO'], ['SE'], []]:
+            with self.subTest(country_shorts=country_shorts):
+                self.assert_export_data_equal(self.memory_handle.prepare_export_data(country_shorts,
+                                                                                     ReportMode.CountryOff),
+                                              self.snapshot_handle.prepare_export_data(country_shorts,
+                                                                                       ReportMode.CountryOff))
+
+    def test_generate_report(self):
+        for country_shorts in [['NO'], []]:
+            with self.subTest(country_shorts=country_shorts):
+                self.assertEqual(str(self.memory_handle.generate_report(country_shorts, ReportMode.CountryOn)),
+                                 str(self.snapshot_handle.generate_report(country_shorts, ReportMode.CountryOn)))
+
+    def test_band_network(self):
+        self.addCleanup(setattr, settings, 'IS_LIVE_MEMBER_IN_BAND', settings.IS_LIVE_MEMBER_IN_BAND)
+
+        for is_live_member_in_band in [True, False]:
+            settings.IS_LIVE_MEMBER_IN_BAND = is_live_member_in_band
+
+            for country_shorts in [['NO'], []]:
+                with self.subTest(is_live_member_in_band=is_live_member_in_band, country_shorts=country_shorts):
+                    self.assertEqual(self.memory_handle.export_bands_network(country_shorts),
+                                     self.snapshot_handle.export_bands_network(country_shorts))
+
+    def test_get_all_links(self):
+        self.assertEqual(self.memory_handle.get_all_links(), self.snapshot_handle.get_all_links())
+
+    def test_calc_bands_per_pop(self):
+        self.assertEqual(self.memory_handle.calc_bands_per_pop('NO', [1, 2]),
+                         self.snapshot_handle.calc_bands_per_pop('NO', [1, 2]))
+
+    def test_snapshots_are_read_only(self):
+        with self.assertRaises(NotImplementedError):
+            self.snapshot_handle.add_bands([{'emid': 4, 'link': 'Burzum/4', 'country': 'NO'}])
+
+
+class TestSnapshotStrategyWithWorkers(TestSnapshotStrategy):
+
+    def make_strategy(self):
+        self.strategy = SnapshotStrategy('snapshots', workers=2)
+        return self.strategy
+
+
+class TestExportDataMerge(unittest.TestCase):
+
+    def test_merge_partial_export_data(self):
+        memory_strategy = MemoryStrategy()
+        apply_batch_to_db(make_bands(), GraphDatabaseContext(memory_strategy), False)
+        norway = memory_strategy.prepare_export_data(['NO'], ReportMode.CountryOff)
+        sweden = memory_strategy.prepare_export_data(['SE'], ReportMode.CountryOff)
+        merged = ExportData().merge(norway).merge(sweden)
+
+        self.assertEqual(3, merged.bands_total)
+        self.assertEqual({'Black': 3, 'Death': 1, 'Viking': 1}, merged.genres['Total'])
+        self.assertEqual({'NO', 'SE'}, set(merged.country_data.keys()))
+        self.assertEqual({1984: 1, 1986: 1}, {year: count for year, count in merged.formation_year_totals.items()})
+        self.assertEqual({1994, 1987, 1986}, set(merged.releases.keys()))
+        # Origins of all artists are part of both; they are summed up.
+        self.assertEqual({'NO': 4, 'SE': 2}, merged.origins)
+        # The partial data is not changed.
+        self.assertEqual(2, norway.bands_total)
+        self.assertEqual({}, ExportData().band_network)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+
+import settings
+from graph.graph_sqlite_impl import SqliteStrategy
+from graph.metal_graph_context import GraphDatabaseContext
+from graph.report import ReportMode
+from metal_crawler import Artist, Band, Release, apply_batch_to_db
+
+
+def make_band(emid, name, country, genres, formed):
+    band = Band()
+    band.emid = emid
+    band.name = name
+    band.link = f'{name}/{emid}'
+    band.country = country
+    band.genres = genres
+    band.visited = '2023-01-01'
+    band.formed = formed
+    return band
+
+
+def make_artist(emid, gender, origin):
+    artist = Artist()
+    artist.emid = emid
+    artist.link = f'Artist_{emid}/{emid}'
+    artist.visited = '2023-01-02'
+    artist.gender = gender
+    artist.origin = origin
+    artist.pseudonym = f'Pseudonym {emid}'
+    artist.instruments = [['Guitars', [[1990, 'present']]]]
+    return artist
+
+
+def make_release(emid, name, release_type, year, rating, review_count):
+    release = Release()
+    release.emid = emid
+    release.name = name
+    release.link = f'Release/{emid}'
+    release.release_type = release_type
+    release.release_date = year
+    release.rating = rating
+    release.review_count = review_count
+    return release
+
+
+def make_bands():
+    darkthrone = make_band(1, 'Darkthrone', 'NO', ['Black'], '1986')
+    mayhem = make_band(2, 'Mayhem', 'NO', ['Black', 'Death'], '1984')
+    bathory = make_band(3, 'Bathory', 'SE', ['Black', 'Viking'], 'N/A')
+    fenriz = make_artist(100, 'M', 'NO')
+    hellhammer = make_artist(101, 'M', 'NO')
+    guest = make_artist(102, 'F', 'SE')
+    darkthrone.lineup = {'Current': [fenriz], 'Current (Live)': [guest]}
+    mayhem.lineup = {'Current': [hellhammer], 'Past': [fenriz]}
+    bathory.lineup = {'Past': [hellhammer, guest]}
+    darkthrone.releases = {10: make_release(10, 'Transilvanian Hunger', 'F', '1994', 86, 12)}
+    mayhem.releases = {11: make_release(11, 'Deathcrush', 'E', '1987', 70, 8),
+                       12: make_release(12, 'Pure Fucking Armageddon', 'D', '1986', 90, 1)}
+    return [darkthrone, mayhem, bathory]
+
+
+class TestSqliteStrategy(unittest.TestCase):
+
+    def setUp(self):
+        # Country reports look for link files below the working directory.
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.strategy = self.make_strategy()
+        self.db_handle = GraphDatabaseContext(self.strategy)
+        apply_batch_to_db(make_bands(), self.db_handle, False)
+
+    def make_strategy(self):
+        return SqliteStrategy(':memory:')
+
+    def tearDown(self):
+        self.strategy.close()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_get_all_links(self):
+        all_links = self.db_handle.get_all_links()
+
+        self.assertEqual({'Darkthrone/1': '2023-01-01', 'Mayhem/2': '2023-01-01', 'Bathory/3': '2023-01-01'},
+                         all_links['bands'])
+        self.assertEqual(3, len(all_links['artists']))
+
+    def test_failed_transaction_is_rolled_back(self):
+        def write():
+            self.db_handle.add_bands([{'emid': 4, 'link': 'Burzum/4', 'country': 'NO'}])
+            raise RuntimeError('Lost the connection.')
+
+        with self.assertRaises(RuntimeError):
+            self.db_handle.write_in_transaction(write)
+
+        self.assertNotIn('Burzum/4', self.db_handle.get_all_links()['bands'])
+
+    def test_band_network(self):
+        self.addCleanup(setattr, settings, 'IS_LIVE_MEMBER_IN_BAND', settings.IS_LIVE_MEMBER_IN_BAND)
+        settings.IS_LIVE_MEMBER_IN_BAND = True
+        network = self.db_handle.export_bands_network([])
+        self.assertEqual({1: [2, 3], 2: [1, 3], 3: [1, 2]}, {emid: band['relations'] for emid, band in network.items()})
+        self.assertEqual('Norway', network[1]['country'])
+
+        settings.IS_LIVE_MEMBER_IN_BAND = False
+        network = self.db_handle.export_bands_network([])
+        self.assertEqual({1: [2], 2: [1, 3], 3: [2]}, {emid: band['relations'] for emid, band in network.items()})
+        network = self.db_handle.export_bands_network(['NO'])
+        # Relations to bands of other countries are kept; the exporters drop them.
+        self.assertEqual({1: [2], 2: [1, 3]}, {emid: band['relations'] for emid, band in network.items()})
+
+    def test_prepare_export_data(self):
+        export_data = self.db_handle.prepare_export_data(['NO'], ReportMode.CountryOff)
+
+        self.assertEqual({'NO': 2, 'SE': 1}, export_data.origins)
+        self.assertEqual(2, export_data.bands_total)
+        self.assertEqual({'M': 2}, export_data.genders_origins['NO']['NO'].genders)
+        self.assertEqual({'F': 1}, export_data.genders_origins['NO']['SE'].genders)
+        self.assertEqual({'Black': 2, 'Death': 1}, export_data.genres['NO'])
+        self.assertEqual({1994, 1987, 1986}, set(export_data.releases.keys()))
+
+    def test_generate_report(self):
+        db_report = self.db_handle.generate_report(['NO'], ReportMode.CountryOn)
+
+        self.assertEqual(3, db_report._band_count)
+        self.assertEqual(3, db_report._amount_artists)
+        self.assertEqual({'Full-length': 1, 'EP': 1, 'Demo': 1}, dict(db_report.album_report.releases_total))
+        self.assertEqual(['Transilvanian Hunger'],
+                         [release[0] for release in db_report.album_report.releases_per_year['1994']['Full-length']])
+        country_report = db_report._country_reports[0]
+        self.assertEqual(2, country_report._number_bands)
+        self.assertEqual(2, country_report.get_gender('M'))
+        self.assertEqual({1984: 1, 1986: 1}, dict(country_report.bands_per_year))
+
+
+if __name__ == '__main__':
+    unittest.main()